@@ -1,8 +1,25 @@
+import csv
 import hashlib
 import os
+import sys
 from openpyxl import Workbook
 import time
 
+# 依赖：哈希清单模块 hash_manifest.py 与目录对比工具（hash_comparer 正确.py）共用一份，不在本目录
+#   默认位置：../功能实现练习/加密/拆3加密 copy 3/hash_manifest.py
+#   那个文件夹改名或移动后：修改 HASH_MANIFEST_DIR，或设置环境变量 HASH_MANIFEST_DIR，或把它所在目录加入 PYTHONPATH
+HASH_MANIFEST_DIR = os.environ.get("HASH_MANIFEST_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "功能实现练习", "加密", "拆3加密 copy 3"
+)
+try:
+    from hash_manifest import HashManifest, is_manifest_file  # 已在 PYTHONPATH 中
+except ImportError:
+    sys.path.insert(0, HASH_MANIFEST_DIR)
+    try:
+        from hash_manifest import HashManifest, is_manifest_file
+    except ImportError:
+        raise ImportError(f"找不到 hash_manifest.py：请把 HASH_MANIFEST_DIR 改为它所在的目录（当前为 {HASH_MANIFEST_DIR}）")
+
 
 def calculate_sha256(file_path):
     hash_sha256 = hashlib.sha256()
@@ -16,38 +33,169 @@ def calculate_total_file_size(folder_path):
     total_size = 0
     for root, dirs, files in os.walk(folder_path):
         for file in files:
+            if is_manifest_file(file):
+                continue
             file_path = os.path.join(root, file)
             total_size += os.path.getsize(file_path)
     return total_size
 
 
-def process_folder(folder_path):
-    wb = Workbook()
-    ws = wb.active
-    ws.append(["文件名", "文件路径", "SHA256 哈希值"])
+REPORT_HEADER = ["文件名", "文件路径", "SHA256 哈希值"]
+EXCEL_MAX_ROWS = 1048576  # Excel 单个工作表的最大行数（含表头）
+
+
+def default_report_path(folder_path):
+    # 报告名按文件夹区分（目录名 + 绝对路径哈希），不同文件夹的报告不会互相续写
+    abs_folder = os.path.abspath(folder_path)
+    key = hashlib.sha256(abs_folder.encode("utf-8")).hexdigest()[:8]
+    name = "".join(c for c in os.path.basename(abs_folder.rstrip("\\/")) if c.isalnum() or c in "._-") or "root"
+    return f"file_hashes_{name}_{key}.csv"
+
+
+def load_report_paths(report_path, folder_path):
+    # 读取上次中断留下的未完成报告（.part），返回其中已有的文件路径；最后一行可能只写了一半，截掉后再续写
+    # 报告里有不在 folder_path 下的文件时返回 None（不是这个文件夹的报告，不能续写）
+    if not os.path.exists(report_path):
+        return set()
+    with open(report_path, "rb+") as f:
+        # 从文件末尾往前按块查找最后一个换行，不把整个报告读进内存
+        size = f.seek(0, os.SEEK_END)
+        complete = 0
+        pos = size
+        while pos > 0:
+            start = max(0, pos - 64 * 1024)
+            f.seek(start)
+            index = f.read(pos - start).rfind(b"\n")
+            if index != -1:
+                complete = start + index + 1
+                break
+            pos = start
+        if complete < size:
+            f.truncate(complete)
+    done_paths = set()
+    with open(report_path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) == len(REPORT_HEADER) and row != REPORT_HEADER:
+                done_paths.add(row[1])
+    prefix = os.path.join(folder_path, "")
+    if any(not path.startswith(prefix) for path in done_paths):
+        return None
+    return done_paths
+
+
+def export_xlsx(report_path, xlsx_path):
+    # CSV 报告转成 Excel；write_only 模式逐行写出，不在内存中保留整个表格
+    # 行数超过 Excel 单表上限（EXCEL_MAX_ROWS）时不导出，返回 False，只保留 CSV
+    with open(report_path, "r", encoding="utf-8-sig", newline="") as f:
+        row_count = sum(1 for _ in csv.reader(f))
+    if row_count > EXCEL_MAX_ROWS:
+        print(f"⚠️ 报告共 {row_count} 行，超过 Excel 单表上限 {EXCEL_MAX_ROWS} 行，跳过导出 xlsx，请直接使用 CSV")
+        return False
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    with open(report_path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.reader(f):
+            ws.append(row)
+    wb.save(xlsx_path)
+    return True
+
+
+def process_folder(folder_path, use_manifest=True, report_path=None, resume=True,
+                   flush_every=1000, export_excel=True):
+    # use_manifest：哈希清单（存在用户缓存目录，按 folder_path 区分，不写进 folder_path），大小/mtime/inode 没变的文件直接用上次的哈希
+    # report_path：CSV 报告路径，默认按文件夹命名（default_report_path），不同文件夹的报告互不干扰
+    # 处理过程中逐行写入 <report_path>.part，每 flush_every 行落盘一次，文件再多也不占内存，中途崩溃最多丢最后一批
+    # 全部完成后 .part 才改名为 report_path，所以 report_path 存在就表示报告是完整的
+    # resume：存在未完成的 .part 时跳过其中已有的文件，接着上次的进度继续写；resume=False 则重新生成
+    # export_excel：全部完成后再把 CSV 转成同名 .xlsx，为 False 时只保留 CSV
+    report_path = report_path or default_report_path(folder_path)
+    part_path = report_path + ".part"
+    manifest = HashManifest(folder_path) if use_manifest else None
+    seen_relpaths = set()
+    cached_count = 0
+
+    done_paths = load_report_paths(part_path, folder_path) if resume else set()
+    if done_paths is None:
+        print(f"未完成的报告 {part_path} 不属于文件夹 {folder_path}, 重新生成")
+        done_paths = set()
+        resume = False
+    if done_paths:
+        print(f"发现未完成的报告 {part_path}, 已有 {len(done_paths)} 个文件, 跳过这些文件继续处理")
+    new_report = not (resume and os.path.exists(part_path) and os.path.getsize(part_path) > 0)
+    # utf-8-sig 带 BOM，Excel 直接打开中文不乱码；续写时不能再写 BOM
+    report_file = open(part_path, "w" if new_report else "a", encoding="utf-8-sig" if new_report else "utf-8", newline="")
+    writer = csv.writer(report_file)
+    if new_report:
+        writer.writerow(REPORT_HEADER)
+    pending_rows = 0
+    skipped_count = 0
 
     start_time = None
     total_size_so_far = 0
+    size_this_run = 0
     total_file_size = calculate_total_file_size(folder_path)
     elapsed_time = 0
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            file_path = os.path.join(root, file)
-            file_size = os.path.getsize(file_path)
-            if start_time is None:
-                start_time = time.time()
-            hash_value = calculate_sha256(file_path)
-            ws.append([file, file_path, hash_value])
-            total_size_so_far += file_size
-            progress_percentage = (total_size_so_far / total_file_size) * 100 if total_file_size > 0 else 0
-            elapsed_time = time.time() - start_time
-            estimated_total_time = elapsed_time / (progress_percentage / 100) if progress_percentage > 0 else 0
-            estimated_remaining_time = estimated_total_time - elapsed_time if estimated_total_time > 0 else 0
-            print(f"已处理文件: {file_path}, 已处理文件总大小: {total_size_so_far} 字节, "
-                  f"进度: {progress_percentage:.2f}%, 已用时间: {elapsed_time:.2f} 秒, "
-                  f"预计总计时间: {estimated_total_time:.2f} 秒, 预估剩余时间: {estimated_remaining_time:.2f} 秒")
-
-    wb.save("file_hashes.xlsx")
+    try:
+        for root, dirs, files in os.walk(folder_path):
+            for file in files:
+                if is_manifest_file(file):
+                    continue
+                file_path = os.path.join(root, file)
+                file_size = os.path.getsize(file_path)
+                if manifest:
+                    seen_relpaths.add(manifest.relpath(file_path))
+                if file_path in done_paths:
+                    total_size_so_far += file_size
+                    skipped_count += 1
+                    continue
+                if start_time is None:
+                    start_time = time.time()
+                if manifest:
+                    hash_value, cached = manifest.get_hash(file_path, "sha256", lambda path, algorithm: calculate_sha256(path))
+                    cached_count += cached
+                else:
+                    hash_value = calculate_sha256(file_path)
+                writer.writerow([file, file_path, hash_value])
+                pending_rows += 1
+                if pending_rows >= flush_every:
+                    report_file.flush()
+                    os.fsync(report_file.fileno())
+                    pending_rows = 0
+                total_size_so_far += file_size
+                size_this_run += file_size
+                progress_percentage = (total_size_so_far / total_file_size) * 100 if total_file_size > 0 else 0
+                elapsed_time = time.time() - start_time
+                # 预估只按本次运行的速度算，续传跳过的文件不计入
+                speed = size_this_run / elapsed_time if elapsed_time > 0 else 0
+                estimated_remaining_time = (total_file_size - total_size_so_far) / speed if speed > 0 else 0
+                estimated_total_time = elapsed_time + estimated_remaining_time
+                print(f"已处理文件: {file_path}, 已处理文件总大小: {total_size_so_far} 字节, "
+                      f"进度: {progress_percentage:.2f}%, 已用时间: {elapsed_time:.2f} 秒, "
+                      f"预计总计时间: {estimated_total_time:.2f} 秒, 预估剩余时间: {estimated_remaining_time:.2f} 秒")
+        if manifest:
+            removed = manifest.prune(seen_relpaths)
+            print(f"哈希清单: {cached_count} 个文件直接使用缓存的哈希值, 清理已删除文件记录 {removed} 条")
+    finally:
+        # 中断（Ctrl+C、异常）时也把已写的行落盘，.part 保留，下次 resume 接着处理
+        report_file.flush()
+        os.fsync(report_file.fileno())
+        report_file.close()
+        if manifest:
+            manifest.close()
+
+    # 走到这里说明整个文件夹都处理完了：.part 改名为正式报告
+    os.replace(part_path, report_path)
+    if skipped_count:
+        print(f"续传: 跳过报告中已有的 {skipped_count} 个文件")
+    if export_excel:
+        xlsx_path = os.path.splitext(report_path)[0] + ".xlsx"
+        if export_xlsx(report_path, xlsx_path):
+            print(f"报告已保存: {report_path}, {xlsx_path}")
+        else:
+            print(f"报告已保存: {report_path}")
+    else:
+        print(f"报告已保存: {report_path}")
     return total_size_so_far, elapsed_time
 
 
@@ -55,5 +203,8 @@ if __name__ == "__main__":
     folder_path = "E:\DJI_VEDIO"  # 请将此处替换为实际的文件夹路径
     total_size = calculate_total_file_size(folder_path)
     print(f"文件夹内所有文件的总大小为: {total_size} 字节")
+    # 哈希清单依赖 ../功能实现练习/加密/拆3加密 copy 3/hash_manifest.py，位置变了改文件开头的 HASH_MANIFEST_DIR
+    # 报告写到 file_hashes_<文件夹名>_<路径哈希>.csv，完成后转存同名 .xlsx
+    # 上次中断时留下 .csv.part，再次运行会跳过其中已有的文件；想从头生成：删除 .part 或传 resume=False
     size_so_far, elapsed_time = process_folder(folder_path)
     print(f"从开始到当前，计算出哈希值的所有文件总大小为: {size_so_far} 字节, 总共用时: {elapsed_time:.2f} 秒")
\ No newline at end of file
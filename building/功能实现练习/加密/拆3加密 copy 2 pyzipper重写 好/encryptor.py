@@ -1,7 +1,6 @@
 import os
 import pyzipper
-import keyboard  # 需额外安装：pip install keyboard
-import time
+from job_control import JobControl, DEFAULT_PORT, format_rate
 
 def pyzipper_recursive_single_file_encrypt(
     # ==============================================
@@ -10,17 +9,20 @@ def pyzipper_recursive_single_file_encrypt(
     encrypt_output_dir=r"E:\encryted",   # 默认加密输出目录
     password="secp256k1",                # 默认密码
     encrypt_filename=True,               # 是否加密文件名（默认开启，pyzipper默认支持）
-    pause_key='p'                        # 暂停/继续按键（默认p键）
+    control_port=DEFAULT_PORT,           # 本地控制端口（暂停/继续/限速，见 job_control.py）
+    rate_limit=0,                        # 初始限速（字节每秒，0 为不限速，运行中可随时调整）
+    chunk_size=1024 * 1024               # 每写一块检查一次暂停/限速（文件中途也能生效）
     # ==============================================
 ):
     """
     递归单文件加密（基于pyzipper，使用STORE模式-仅打包不压缩）
     功能：保持原代码的暂停/继续、失败统计、目录递归等特性
+    暂停/继续/限速改为信号或本地控制端口（不再需要 keyboard 和 root 权限），单个大文件加密中途也能暂停
     """
     total_count = 0
     success_count = 0
     failed_files = []
-    is_paused = False  # 暂停状态标记
+    control = JobControl(rate_limit)
 
     # 目录创建
     for dir_path in [source_dir, encrypt_output_dir]:
@@ -37,26 +39,22 @@ def pyzipper_recursive_single_file_encrypt(
     print(f"   加密包目录：{os.path.abspath(encrypt_output_dir)}")
     print(f"   文件名加密：{'✅ 开启' if encrypt_filename else '❌ 关闭'}")
     print(f"   压缩模式：✅ STORE模式（仅打包不压缩，速度最快）")
-    print(f"   暂停按键：'{pause_key}' 键（按此键暂停/继续）")
-    print("=" * 70 + "\n")
-
-    # 定义暂停回调函数
-    def toggle_pause():
-        nonlocal is_paused
-        is_paused = not is_paused
-        status = "暂停中" if is_paused else "继续运行"
-        print(f"\n 加密任务已{status}（按 '{pause_key}' 切换）")
+    print(f"   初始限速：{format_rate(rate_limit)}")
 
-    # 注册暂停按键监听
-    keyboard.add_hotkey(pause_key, toggle_pause)
+    # 注册暂停/限速控制（信号 + 本地控制端口）
+    if control.install_signal_handlers():
+        print(f"   信号控制：kill -USR1 {os.getpid()} 暂停/继续 | kill -USR2 {os.getpid()} 取消限速")
+    server = control.start_server(control_port)
+    if server is not None:
+        print(f"   控制端口：127.0.0.1:{control_port}（python job_control.py pause|resume|rate 50M|status --port {control_port}）")
+    print("=" * 70 + "\n")
 
     try:
         # 递归处理文件
         for root, dirs, files in os.walk(source_dir):
             for file_name in files:
                 # 检查暂停状态
-                while is_paused:
-                    time.sleep(0.1)  # 降低CPU占用
+                control.checkpoint()
 
                 total_count += 1
                 file_abs_path = os.path.join(root, file_name)
@@ -78,8 +76,16 @@ def pyzipper_recursive_single_file_encrypt(
                     ) as zf:
                         # 设置密码
                         zf.setpassword(password.encode('utf-8'))
-                        # 写入文件，arcname控制压缩包内的文件名
-                        zf.write(file_abs_path, arcname=file_name)
+                        # 分块写入（代替 zf.write），每块都检查暂停/限速；arcname控制压缩包内的文件名
+                        zinfo = zf.zipinfo_cls.from_file(file_abs_path, arcname=file_name)
+                        zinfo.compress_type = pyzipper.ZIP_STORED
+                        with open(file_abs_path, 'rb') as f_in, zf.open(zinfo, 'w') as f_out:
+                            while True:
+                                chunk = f_in.read(chunk_size)
+                                if not chunk:
+                                    break
+                                f_out.write(chunk)
+                                control.checkpoint(len(chunk))
                     
                     print(f"✅ 加密完成 | {file_abs_path} → {output_zip_path}")
                     success_count += 1
@@ -92,7 +98,7 @@ def pyzipper_recursive_single_file_encrypt(
     except KeyboardInterrupt:
         print("\n⚠️ 检测到强制退出，任务已中断")
     finally:
-        keyboard.unhook_all_hotkeys()  # 移除监听
+        control.stop_server(server)  # 关闭控制端口
 
     # 执行结果
     print("=" * 70)
@@ -114,5 +120,5 @@ if __name__ == "__main__":
     # pyzipper_recursive_single_file_encrypt(
     #     source_dir=r"E:\my_files",
     #     password="my_secure_password",
-    #     pause_key='space'
+    #     rate_limit=50 * 1024 * 1024   # 白天限速 50 MB/s，运行中可用 python job_control.py rate 0 取消
     # )
\ No newline at end of file
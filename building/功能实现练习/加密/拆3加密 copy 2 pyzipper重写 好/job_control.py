@@ -0,0 +1,247 @@
+"""
+加密任务控制：暂停 / 继续 / 限速，取代 keyboard 全局热键
+keyboard 在 Linux 上需要 root，且原来的暂停只在文件之间生效，几十 GB 的单个文件加密中途停不下来
+
+做法：加密循环每写一块调用一次 control.checkpoint(块大小)
+  暂停中 → 在这里阻塞，直到继续；设置了限速 → 按已写字节数等待，把速度压到上限以内
+所以暂停、限速在文件中途（下一块）就会生效；限速等待中改速、暂停或取消限速也会立即生效
+
+控制方式：
+  信号（仅 Unix）：kill -USR1 <pid> 暂停/继续切换；kill -USR2 <pid> 取消限速
+  本地控制端口（跨平台，只监听 127.0.0.1）：
+      python job_control.py pause          暂停
+      python job_control.py resume         继续
+      python job_control.py toggle         暂停/继续切换
+      python job_control.py rate 50M       限速 50 MB/s（支持 K/M/G 后缀，不带单位按 MB/s，0 或 off 取消限速）
+      python job_control.py status         查看状态
+  多个任务同时运行时用 --port 区分，例如：python job_control.py pause --port 47654
+"""
+
+import os
+import sys
+import time
+import signal
+import socket
+import threading
+import socketserver
+from collections import deque
+
+DEFAULT_PORT = 47653
+
+def parse_rate(text):
+    """'50M' / '512K' / '1G' → 字节每秒；不带单位的数字按 MB/s（'50' 即 50 MB/s），'1048576B' 按字节；'0' / 'off' → 0（不限速）"""
+    text = text.strip().upper()
+    if text in ("", "0", "OFF"):
+        return 0
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    unit = units["M"]
+    if text.endswith("B"):
+        text = text[:-1]
+        unit = 1
+    if text and text[-1] in units:
+        unit = units[text[-1]]
+        text = text[:-1]
+    return int(float(text) * unit)
+
+def format_rate(rate):
+    return f"{rate / 1024 / 1024:.2f} MB/s" if rate else "不限速"
+
+class JobControl:
+    """
+    协作式任务控制：状态由信号处理函数 / 控制端口线程修改，加密循环通过 checkpoint 响应
+    """
+    def __init__(self, rate_limit=0):
+        # RLock：信号处理函数在主线程执行，可能恰好打断持有锁的 checkpoint
+        self._cond = threading.Condition(threading.RLock())
+        self._paused = False
+        self.rate_limit = rate_limit  # 字节每秒，0 为不限速
+        self.processed_bytes = 0
+        # 信号处理函数里不能 print（主线程可能正在 print，会触发重入错误），提示先放进队列，由 checkpoint 输出
+        self._notices = deque()
+        self._reset_window()
+
+    def _reset_window(self):
+        # 限速按「本窗口内已处理字节数 / 上限」计算应耗时间，暂停或改速后重新计时，避免补偿性突发
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+
+    @property
+    def paused(self):
+        return self._paused
+
+    def pause(self):
+        with self._cond:
+            self._paused = True
+            self._cond.notify_all()
+
+    def resume(self):
+        with self._cond:
+            self._paused = False
+            self._reset_window()
+            self._cond.notify_all()
+
+    def toggle(self):
+        with self._cond:
+            if self._paused:
+                self.resume()
+            else:
+                self.pause()
+            return self._paused
+
+    def set_rate_limit(self, rate):
+        with self._cond:
+            self.rate_limit = max(0, int(rate))
+            self._reset_window()
+            self._cond.notify_all()
+
+    def status(self):
+        state = "暂停中" if self._paused else "运行中"
+        return f"{state} | 限速：{format_rate(self.rate_limit)} | 已处理：{self.processed_bytes / 1024 / 1024:.2f} MB"
+
+    def _print_notices(self):
+        while self._notices:
+            print(self._notices.popleft())
+
+    def checkpoint(self, nbytes=0):
+        """
+        加密循环每处理一块调用一次：暂停时阻塞，限速时等待
+        等待用条件变量而不是 sleep：期间暂停、改速或取消限速会被唤醒并按新状态重新计算
+        :param nbytes: 本块字节数（文件之间调用传 0，只响应暂停）
+        """
+        with self._cond:
+            self._print_notices()
+            self.processed_bytes += nbytes
+            counted_window = None  # 本块已计入的限速窗口
+            while True:
+                was_paused = self._paused
+                while self._paused:
+                    self._cond.wait(0.5)  # 带超时：Ctrl+C 和信号处理函数仍能及时执行
+                    self._print_notices()
+                if was_paused:
+                    print("▶️  任务继续")
+                rate = self.rate_limit
+                if not rate or not nbytes:
+                    return
+                if counted_window != self._window_start:
+                    # 本块计入当前窗口；等待期间改速或暂停后继续会重置窗口，本块按新窗口重新计入
+                    self._window_bytes += nbytes
+                    counted_window = self._window_start
+                delay = self._window_bytes / rate - (time.monotonic() - self._window_start)
+                if delay <= 0:
+                    if delay < -1:
+                        # 远低于上限（如磁盘本身慢）：重新计时，不攒额度
+                        self._reset_window()
+                    return
+                self._cond.wait(min(delay, 0.5))
+                self._print_notices()
+
+    def handle_command(self, line):
+        """执行一条文本命令，返回回复文本（控制端口使用）"""
+        parts = line.strip().split()
+        if not parts:
+            return "❌ 空命令"
+        command = parts[0].lower()
+        if command == "pause":
+            self.pause()
+            print("\n⏸️  任务已暂停（控制端口）")
+        elif command == "resume":
+            self.resume()
+        elif command == "toggle":
+            if self.toggle():
+                print("\n⏸️  任务已暂停（控制端口）")
+        elif command == "rate" and len(parts) == 2:
+            try:
+                self.set_rate_limit(parse_rate(parts[1]))
+            except ValueError:
+                return f"❌ 无法识别的速度：{parts[1]}"
+            print(f"\n🚦 限速已调整：{format_rate(self.rate_limit)}")
+        elif command != "status":
+            return f"❌ 未知命令：{line.strip()}（可用：pause / resume / toggle / rate <速度> / status）"
+        return self.status()
+
+    def install_signal_handlers(self):
+        """SIGUSR1 暂停/继续切换，SIGUSR2 取消限速；Windows 无这两个信号，直接跳过"""
+        if not hasattr(signal, "SIGUSR1"):
+            return False
+
+        # 处理函数只改状态并唤醒等待，提示由 checkpoint 在加密循环里输出
+        def on_toggle(signum, frame):
+            if self.toggle():
+                self._notices.append("\n⏸️  任务已暂停（SIGUSR1）")
+
+        def on_unthrottle(signum, frame):
+            self.set_rate_limit(0)
+            self._notices.append("\n🚦 已取消限速（SIGUSR2）")
+
+        try:
+            signal.signal(signal.SIGUSR1, on_toggle)
+            signal.signal(signal.SIGUSR2, on_unthrottle)
+        except ValueError:
+            return False  # 非主线程无法注册信号
+        return True
+
+    def start_server(self, port=DEFAULT_PORT):
+        """
+        在后台线程启动本地控制端口（只监听 127.0.0.1）
+        :return: server 对象（任务结束时调用 stop_server）；端口被占用时返回 None
+        """
+        control = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                line = self.rfile.readline().decode("utf-8", errors="replace")
+                self.wfile.write((control.handle_command(line) + "\n").encode("utf-8"))
+
+        class Server(socketserver.ThreadingTCPServer):
+            # 上一个任务刚退出时端口仍在 TIME_WAIT，允许立即复用
+            # Windows 的 SO_REUSEADDR 会让第二个任务静默绑定同一端口（命令发到哪个任务不确定），所以只在非 Windows 开启
+            allow_reuse_address = os.name != "nt"
+            daemon_threads = True
+
+            def server_bind(self):
+                if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+                    # Windows：独占端口，另一个任务再绑定同一端口会直接失败
+                    self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+                super().server_bind()
+
+        try:
+            server = Server(("127.0.0.1", port), Handler)
+        except OSError as e:
+            print(f"⚠️  控制端口 {port} 无法监听（{e}），只能用信号控制")
+            return None
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    @staticmethod
+    def stop_server(server):
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+def send_command(command, port=DEFAULT_PORT, timeout=5):
+    """向正在运行的任务发送一条控制命令，返回回复文本"""
+    with socket.create_connection(("127.0.0.1", port), timeout=timeout) as conn:
+        conn.sendall((command.strip() + "\n").encode("utf-8"))
+        reply = b""
+        while not reply.endswith(b"\n"):
+            data = conn.recv(4096)
+            if not data:
+                break
+            reply += data
+    return reply.decode("utf-8").strip()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    port = DEFAULT_PORT
+    if "--port" in args:
+        idx = args.index("--port")
+        port = int(args[idx + 1])
+        del args[idx:idx + 2]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    try:
+        print(send_command(" ".join(args), port))
+    except OSError as e:
+        print(f"❌ 无法连接控制端口 {port}（任务未运行？）：{e}")
+        sys.exit(1)
@@ -0,0 +1,139 @@
+"""
+AES-CTR 大文件断点续传：加密/解密中途中断后，从最后一次落盘（fsync）的位置继续，不再整个文件重来
+
+输出先写到 <目标>.part，旁边的 <目标>.part.ckpt 记录：源文件大小 + mtime_ns + 密钥校验值 + 已落盘的明文偏移
+每处理 checkpoint_interval 字节：先 fsync 输出文件，再原子替换检查点（保证检查点记录的偏移之前的数据都已在盘上）
+重新运行时检查点与源文件、密钥都一致 → 从该偏移继续，CTR 计数器按偏移重新计算；
+不一致或没有检查点 → 从头开始（换了密码时不会把两个密钥的输出拼进同一个文件）
+全部完成后改名为目标文件并删除检查点
+
+CTR 模式加密和解密是同一个运算（密钥流异或），加密脚本和解密脚本共用 ctr_crypt_range
+"""
+
+import os
+import hmac
+import json
+import hashlib
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+from zero_copy_io import encrypt_stream_zero_copy
+
+PART_SUFFIX = ".part"
+CHECKPOINT_SUFFIX = ".ckpt"
+
+def ctr_counter_at_offset(nonce, offset):
+    """
+    计算文件任意偏移处的 CTR 计数器块
+    cryptography 的 CTR 模式把 16 字节 nonce 当作 128 位大端整数，每 16 字节加 1
+    :param offset: 字节偏移，必须是 16 的倍数
+    """
+    if offset % 16 != 0:
+        raise ValueError(f"CTR 偏移必须按 16 字节对齐，当前为 {offset}")
+    counter = (int.from_bytes(nonce, 'big') + offset // 16) % (1 << 128)
+    return counter.to_bytes(16, 'big')
+
+def part_path(dst_path):
+    return dst_path + PART_SUFFIX
+
+def checkpoint_path(dst_path):
+    return part_path(dst_path) + CHECKPOINT_SUFFIX
+
+def checkpoint_key_check(key):
+    """密钥校验值：HMAC-SHA256(密钥, b"ckpt") 截断，检查点里只存它，不存密钥"""
+    return hmac.new(key, b"ckpt", hashlib.sha256).hexdigest()[:32]
+
+def load_checkpoint(dst_path, src_path, key):
+    """
+    读取 dst_path 对应的检查点
+    :param key: 本次运行的密钥，与检查点中的密钥校验值比对
+    :return: 可续传的明文偏移；没有检查点、源文件已变化、密钥不一致或 .part 不完整时返回 0（从头开始）
+    """
+    path = checkpoint_path(dst_path)
+    if not os.path.exists(path) or not os.path.exists(part_path(dst_path)):
+        return 0
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        offset = int(entry["offset"])
+    except (ValueError, KeyError, TypeError):
+        return 0  # 检查点损坏：从头开始
+    stat = os.stat(src_path)
+    if entry.get("source_size") != stat.st_size or entry.get("source_mtime_ns") != stat.st_mtime_ns:
+        return 0
+    if not hmac.compare_digest(str(entry.get("key_check", "")), checkpoint_key_check(key)):
+        return 0  # 密码或密钥不同（含没有校验值的旧检查点）
+    if offset % 16 != 0 or offset > stat.st_size or os.path.getsize(part_path(dst_path)) < offset:
+        return 0
+    return offset
+
+def save_checkpoint(dst_path, src_path, offset, key):
+    """记录已落盘的明文偏移（调用前输出文件必须已 fsync）；先写临时文件再原子替换"""
+    stat = os.stat(src_path)
+    entry = {
+        "source_size": stat.st_size, "source_mtime_ns": stat.st_mtime_ns,
+        "key_check": checkpoint_key_check(key), "offset": offset
+    }
+    path = checkpoint_path(dst_path)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(entry, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+def commit_part(dst_path):
+    """全部完成：.part 改名为目标文件，删除检查点"""
+    os.replace(part_path(dst_path), dst_path)
+    if os.path.exists(checkpoint_path(dst_path)):
+        os.remove(checkpoint_path(dst_path))
+
+def ctr_crypt_range(
+    src_path,
+    src_data_offset,
+    dst_path,
+    dst_data_offset,
+    key,
+    nonce,
+    start,
+    end,
+    chunk_size=1024 * 1024 * 4,
+    checkpoint=None,
+    checkpoint_interval=1024 * 1024 * 256,
+    use_mmap=True
+):
+    """
+    CTR 加/解密源文件的明文区间 [start, end)，写到输出文件对应位置（输出文件须已存在）
+    end 必须是源文件数据的结尾；读写走零拷贝循环（encrypt_stream_zero_copy）
+    :param src_data_offset: 源文件中数据起始位置（解密时为文件头长度，加密时为 0）
+    :param dst_data_offset: 输出文件中数据起始位置（加密时为文件头长度，解密时为 0）
+    :param start: 起始明文偏移（续传位置，16 字节对齐）
+    :param checkpoint: 回调 checkpoint(已落盘偏移)，每 checkpoint_interval 字节在 fsync 之后调用
+    :param use_mmap: True 用 mmap 读取源文件，False 用 readinto 复用缓冲
+    :return: 本次处理的字节数
+    """
+    cipher_ctx = Cipher(
+        algorithms.AES(key), modes.CTR(ctr_counter_at_offset(nonce, start)), backend=default_backend()
+    ).encryptor()
+
+    with open(src_path, 'rb') as f_in, open(dst_path, 'r+b') as f_out:
+        f_in.seek(src_data_offset + start)
+        f_out.seek(dst_data_offset + start)
+        last_sync = start
+
+        def on_chunk(src_pos):
+            nonlocal last_sync
+            pos = src_pos - src_data_offset
+            if pos - last_sync >= checkpoint_interval and pos % 16 == 0:
+                f_out.flush()
+                os.fsync(f_out.fileno())
+                checkpoint(pos)
+                last_sync = pos
+
+        processed = encrypt_stream_zero_copy(
+            f_in, f_out, cipher_ctx, chunk_size, use_mmap=use_mmap, progress=on_chunk if checkpoint else None
+        )
+        if processed != end - start:
+            raise IOError(f"源文件长度与预期不符：应处理 {end - start} 字节，实际 {processed} 字节")
+        f_out.flush()
+        os.fsync(f_out.fileno())
+    return processed
@@ -0,0 +1,200 @@
+"""
+.enc 自描述容器格式：加密文件开头写入版本化文件头，取代旁路的 .iv / .nonce 文件
+解密时在同一次 open 中先读文件头、再读密文，不再需要额外打开小文件
+
+文件头布局（大端）：
+  魔数 4B "AENC" | 版本 1B | 加密模式 1B | KDF 1B | 盐长度 1B | 分块大小 4B
+  KDF 参数 3×4B | 盐（盐长度字节） | nonce/IV 16B
+
+AES-256-GCM 分段格式（MODE_GCM）：文件头之后是若干段，每段 = 密文（分块大小，最后一段可更短）+ 16B 认证标签
+  每段 nonce = 文件头 nonce 前 12 字节 XOR 段序号；AAD = 文件头原始字节 + 段序号 + 是否最后一段
+  段被篡改、调换顺序、截断或文件头被改动，都会在该段解密时认证失败；各段可独立并行校验
+
+密钥派生：整批文件共用一个随机盐，密钥只派生一次；盐和 KDF 参数写进每个文件头，
+解密时按 (KDF, 参数, 盐) 缓存派生结果，同一批加密的文件也只派生一次
+"""
+
+import os
+import struct
+from collections import namedtuple
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.backends import default_backend
+
+MAGIC = b"AENC"
+VERSION = 1
+
+# 加密模式
+MODE_CBC = 1
+MODE_CTR = 2
+MODE_GCM = 3
+MODE_NAMES = {MODE_CBC: "AES-256-CBC", MODE_CTR: "AES-256-CTR", MODE_GCM: "AES-256-GCM"}
+
+GCM_TAG_SIZE = 16
+_GCM_AAD = struct.Struct(">QB")
+
+# 密钥派生方式（KDF_SHA256：密码直接 SHA-256，与旧版 .iv/.nonce 文件一致，仅用于兼容）
+KDF_SHA256 = 0
+KDF_SCRYPT = 1
+KDF_PBKDF2 = 2
+KDF_NAMES = {KDF_SHA256: "SHA-256", KDF_SCRYPT: "scrypt", KDF_PBKDF2: "PBKDF2-HMAC-SHA256"}
+
+# 默认 KDF 参数（3 个整数）：
+#   scrypt —— (log2(N), r, p)，N=2^17、r=8 约占 128MB 内存、单次派生约数百毫秒
+#   PBKDF2 —— (迭代次数, 0, 0)
+DEFAULT_KDF_PARAMS = {KDF_SHA256: (0, 0, 0), KDF_SCRYPT: (17, 8, 1), KDF_PBKDF2: (600000, 0, 0)}
+
+# KDF 成本上限：参数来自文件头，不设上限时伪造的 .enc 可以让解密端耗尽内存或 CPU
+#   scrypt 内存约 128 × r × N 字节，上限 1GB（默认参数为 128MB）；CPU 还与 p 成正比
+#   PBKDF2 迭代次数上限 1000 万（默认 60 万）
+MAX_SCRYPT_MEMORY = 1024 ** 3
+MAX_SCRYPT_LOG_N = 20
+MAX_SCRYPT_R = 32
+MAX_SCRYPT_P = 16
+MAX_PBKDF2_ITERATIONS = 10_000_000
+
+# 分块大小上限：GCM 解密按文件头里的分块大小整段读入内存，伪造的超大值会让解密端一次申请几 GB 内存
+#   上限 256MB（默认 4MB）；GCM 分段至少 1 字节
+MAX_CHUNK_SIZE = 256 * 1024 * 1024
+SALT_SIZE = 16
+KEY_SIZE = 32
+
+_FIXED = struct.Struct(">4sBBBBI3I")
+NONCE_SIZE = 16
+
+EncHeader = namedtuple(
+    "EncHeader", ["version", "mode", "kdf", "kdf_params", "salt", "nonce", "chunk_size", "header_size"]
+)
+
+def check_kdf_params(kdf, kdf_params):
+    """校验 KDF 及其参数在允许范围内，超出上限或不合法时抛 ValueError"""
+    if kdf not in KDF_NAMES:
+        raise ValueError(f"未知的密钥派生方式：{kdf}")
+    if kdf == KDF_SCRYPT:
+        log_n, r, p = kdf_params
+        if not (1 <= log_n <= MAX_SCRYPT_LOG_N and 1 <= r <= MAX_SCRYPT_R and 1 <= p <= MAX_SCRYPT_P):
+            raise ValueError(f"scrypt 参数超出允许范围：log2N={log_n}, r={r}, p={p}")
+        if 128 * r * 2 ** log_n > MAX_SCRYPT_MEMORY:
+            raise ValueError(f"scrypt 参数所需内存超过上限 {MAX_SCRYPT_MEMORY // 1024 // 1024}MB：log2N={log_n}, r={r}")
+    elif kdf == KDF_PBKDF2:
+        iterations = kdf_params[0]
+        if not 1 <= iterations <= MAX_PBKDF2_ITERATIONS:
+            raise ValueError(f"PBKDF2 迭代次数超出允许范围：{iterations}（上限 {MAX_PBKDF2_ITERATIONS}）")
+
+def check_chunk_size(mode, chunk_size):
+    """校验文件头中的分块大小，超出上限或不合法时抛 ValueError"""
+    if chunk_size > MAX_CHUNK_SIZE:
+        raise ValueError(f"分块大小超出上限：{chunk_size} 字节（上限 {MAX_CHUNK_SIZE // 1024 // 1024}MB）")
+    if mode == MODE_GCM and chunk_size < 1:
+        raise ValueError(f"GCM 分块大小不合法：{chunk_size}")
+
+def build_header(mode, nonce, chunk_size, kdf=KDF_SHA256, kdf_params=(0, 0, 0), salt=b""):
+    """
+    生成文件头字节串
+    :param mode: MODE_CBC / MODE_CTR
+    :param nonce: 16 字节 IV（CBC）或起始计数器块（CTR）
+    :param chunk_size: 加密时使用的分块大小（解密时可沿用）
+    :param kdf: 密钥派生方式
+    :param kdf_params: KDF 参数（3 个无符号整数，含义由 KDF 决定）
+    :param salt: KDF 盐
+    """
+    if len(nonce) != NONCE_SIZE:
+        raise ValueError(f"nonce/IV 长度必须为 {NONCE_SIZE} 字节，当前为 {len(nonce)} 字节")
+    check_chunk_size(mode, chunk_size)
+    return _FIXED.pack(MAGIC, VERSION, mode, kdf, len(salt), chunk_size, *kdf_params) + salt + nonce
+
+def read_header(f):
+    """
+    从文件开头读取文件头，读取后文件位置停在密文起始处
+    :param f: 以 'rb' 打开的文件对象
+    :return: EncHeader；文件不是容器格式（旧版 .enc）时返回 None，并把位置恢复到 0
+    """
+    fixed = f.read(_FIXED.size)
+    if len(fixed) < _FIXED.size or fixed[:4] != MAGIC:
+        f.seek(0)
+        return None
+    magic, version, mode, kdf, salt_len, chunk_size, *kdf_params = _FIXED.unpack(fixed)
+    if version > VERSION:
+        raise ValueError(f"不支持的文件头版本：{version}（当前程序支持到 {VERSION}）")
+    if mode not in MODE_NAMES:
+        raise ValueError(f"未知的加密模式：{mode}")
+    check_kdf_params(kdf, kdf_params)
+    check_chunk_size(mode, chunk_size)
+    salt = f.read(salt_len)
+    nonce = f.read(NONCE_SIZE)
+    if len(salt) != salt_len or len(nonce) != NONCE_SIZE:
+        raise ValueError("文件头不完整")
+    return EncHeader(
+        version, mode, kdf, tuple(kdf_params), salt, nonce, chunk_size, _FIXED.size + salt_len + NONCE_SIZE
+    )
+
+def gcm_segment_nonce(nonce, index):
+    """第 index 段的 12 字节 GCM nonce：文件头 nonce 前 12 字节与段序号异或"""
+    base = int.from_bytes(nonce[:12], 'big')
+    return (base ^ index).to_bytes(12, 'big')
+
+def gcm_segment_aad(header_bytes, index, is_last):
+    """第 index 段的附加认证数据：绑定文件头、段序号和结尾标记（防篡改、防调换、防截断）"""
+    return header_bytes + _GCM_AAD.pack(index, 1 if is_last else 0)
+
+def gcm_segment_layout(payload_size, chunk_size):
+    """
+    由文件头之后的字节数推算分段
+    :return: [(段序号, 密文偏移（相对文件头结尾）, 明文长度), ...]；长度不合法时抛 ValueError
+    """
+    stride = chunk_size + GCM_TAG_SIZE
+    full_count, remainder = divmod(payload_size, stride)
+    if payload_size == 0 or (remainder and remainder < GCM_TAG_SIZE):
+        raise ValueError(f"密文长度不合法（{payload_size} 字节），文件可能被截断")
+    segments = [(i, i * stride, chunk_size) for i in range(full_count)]
+    if remainder:
+        segments.append((full_count, full_count * stride, remainder - GCM_TAG_SIZE))
+    return segments
+
+def derive_key(password, kdf=KDF_SCRYPT, kdf_params=None, salt=b""):
+    """
+    从密码派生 32 字节 AES-256 密钥
+    :param kdf: KDF_SCRYPT / KDF_PBKDF2 / KDF_SHA256（旧格式兼容）
+    :param kdf_params: KDF 参数，默认 DEFAULT_KDF_PARAMS[kdf]
+    :param salt: 盐（SHA-256 不使用）
+    """
+    if kdf not in KDF_NAMES:
+        raise ValueError(f"未知的密钥派生方式：{kdf}")
+    kdf_params = tuple(kdf_params or DEFAULT_KDF_PARAMS[kdf])
+    check_kdf_params(kdf, kdf_params)
+    password_bytes = password.encode('utf-8')
+    if kdf == KDF_SHA256:
+        digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
+        digest.update(password_bytes)
+        return digest.finalize()
+    if kdf == KDF_SCRYPT:
+        log_n, r, p = kdf_params
+        return Scrypt(salt=salt, length=KEY_SIZE, n=2 ** log_n, r=r, p=p, backend=default_backend()).derive(password_bytes)
+    if kdf == KDF_PBKDF2:
+        iterations = kdf_params[0]
+        return PBKDF2HMAC(
+            algorithm=hashes.SHA256(), length=KEY_SIZE, salt=salt, iterations=iterations, backend=default_backend()
+        ).derive(password_bytes)
+
+def new_batch_key(password, kdf=KDF_SCRYPT, kdf_params=None):
+    """
+    为一批加密任务生成随机盐并派生密钥（整批只调用一次）
+    :return: (key, kdf_params, salt)，后两项原样传给 build_header
+    """
+    kdf_params = tuple(kdf_params or DEFAULT_KDF_PARAMS[kdf])
+    salt = os.urandom(SALT_SIZE) if kdf != KDF_SHA256 else b""
+    return derive_key(password, kdf, kdf_params, salt), kdf_params, salt
+
+def header_key(password, header, key_cache):
+    """
+    按文件头中的 KDF 参数和盐取密钥，结果缓存在 key_cache（dict）中
+    :param header: read_header 的返回值；None 表示旧版无文件头的文件（密码 SHA-256）
+    """
+    if header is None:
+        cache_key = (KDF_SHA256, (0, 0, 0), b"")
+    else:
+        cache_key = (header.kdf, header.kdf_params, header.salt)
+    if cache_key not in key_cache:
+        key_cache[cache_key] = derive_key(password, *cache_key)
+    return key_cache[cache_key]
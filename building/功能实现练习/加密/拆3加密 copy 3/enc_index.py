@@ -0,0 +1,169 @@
+"""
+增量加密索引：输出根目录下的 .enc_index.jsonl，记录 源相对路径 → (大小, mtime_ns, 可选内容哈希, 输出文件)
+再次运行时只加密新增或修改过的文件；可选删除源文件已不存在的加密输出
+
+CBC / CTR / GCM 加密脚本默认共用同一个输出目录和索引，所以每条记录还带有加密参数：
+模式 + KDF + KDF 参数 + 盐 + 密钥校验值（HMAC，不泄露密钥）；换了模式、KDF 或密码时记录不匹配，视为已变化重新加密
+
+索引为追加写入的 JSONL（每个文件加密成功后立即追加一行，中断也不丢进度），同一路径以最后一行为准；
+批量任务结束时重写为紧凑版本，避免无限增长
+需要重新加密的文件在开始加密前先追加一行删除标记（"removed": true）：重新加密中途失败或中断时，
+输出文件可能已被截断，旧记录不能再让它被当作未变化跳过
+"""
+
+import os
+import hmac
+import json
+import hashlib
+from enc_container import derive_key
+
+INDEX_NAME = ".enc_index.jsonl"
+
+def index_path(output_root):
+    return os.path.join(output_root, INDEX_NAME)
+
+def load_index(output_root):
+    """读取索引，返回 {源相对路径: 记录}"""
+    index = {}
+    path = index_path(output_root)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    if entry.get("removed"):
+                        index.pop(entry["source"], None)
+                    else:
+                        index[entry["source"]] = entry
+                except (ValueError, KeyError):
+                    continue  # 跳过中断写入产生的残缺行
+    return index
+
+def key_check_value(key):
+    """密钥校验值：HMAC-SHA256(密钥, 固定标签) 前 16 字节，只用于判断密钥是否相同"""
+    return hmac.new(key, b"enc_index key check", hashlib.sha256).hexdigest()[:32]
+
+class EncryptionProfile:
+    """
+    本批加密参数，写入每条索引记录，检查时与记录比对
+    每批的盐是随机的，旧记录的盐与本批不同：按旧盐用当前密码派生一次密钥再比对校验值（每个旧盐只派生一次）
+    """
+
+    def __init__(self, mode, password, kdf, kdf_params, salt, key, key_cache=None):
+        self.mode = mode
+        self.kdf = kdf
+        self.kdf_params = list(kdf_params)
+        self.salt = salt.hex()
+        self._password = password
+        # 与解密脚本的 header_key 相同的缓存格式：(KDF, 参数, 盐) → 密钥
+        self._key_cache = key_cache if key_cache is not None else {}
+        self._key_cache[(kdf, tuple(kdf_params), salt)] = key
+        self._checks = {self.salt: key_check_value(key)}
+
+    def fields(self):
+        """写入索引记录的字段"""
+        return {
+            "mode": self.mode, "kdf": self.kdf, "kdf_params": self.kdf_params,
+            "salt": self.salt, "key_check": self._checks[self.salt]
+        }
+
+    def matches(self, entry):
+        """记录是否由相同模式、KDF 参数和密码产生（旧版本索引没有这些字段，视为不匹配）"""
+        if (entry.get("mode"), entry.get("kdf"), entry.get("kdf_params")) != (self.mode, self.kdf, self.kdf_params):
+            return False
+        salt = entry.get("salt")
+        if salt is None or not entry.get("key_check"):
+            return False
+        if salt not in self._checks:
+            cache_key = (self.kdf, tuple(self.kdf_params), bytes.fromhex(salt))
+            if cache_key not in self._key_cache:
+                self._key_cache[cache_key] = derive_key(self._password, *cache_key)
+            self._checks[salt] = key_check_value(self._key_cache[cache_key])
+        return hmac.compare_digest(self._checks[salt], entry["key_check"])
+
+def file_sha256(file_path, chunk_size=1024 * 1024 * 4):
+    """源文件内容 SHA-256（仅在开启内容哈希时计算）"""
+    hash_obj = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hash_obj.update(chunk)
+    return hash_obj.hexdigest()
+
+def check_source(index, output_root, rel_source, file_abs_path, profile, use_hash=False):
+    """
+    判断源文件自上次加密后是否未变化
+    加密参数（profile）一致、大小 + mtime_ns 一致且输出文件仍存在即视为未变化；
+    开启 use_hash 时，大小一致但 mtime 变了（仅 touch / 复制）会再比对内容哈希
+    判定为已变化时立即从索引中删除旧记录（forget_source），加密成功后再由 record_source 写入新记录
+    :return: (是否未变化, 新指纹 dict)；指纹在加密成功后传给 record_source
+    """
+    unchanged, fingerprint = _check_entry(index, output_root, rel_source, file_abs_path, profile, use_hash)
+    if not unchanged:
+        forget_source(index, output_root, rel_source)
+    return unchanged, fingerprint
+
+def _check_entry(index, output_root, rel_source, file_abs_path, profile, use_hash):
+    stat = os.stat(file_abs_path)
+    fingerprint = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": None}
+    entry = index.get(rel_source)
+    if not entry or entry["size"] != stat.st_size:
+        return False, fingerprint
+    if not profile.matches(entry):
+        return False, fingerprint
+    if not os.path.exists(os.path.join(output_root, entry["output"])):
+        return False, fingerprint
+    if entry["mtime_ns"] == stat.st_mtime_ns:
+        return True, dict(fingerprint, hash=entry.get("hash"))
+    if use_hash and entry.get("hash"):
+        fingerprint["hash"] = file_sha256(file_abs_path)
+        if fingerprint["hash"] == entry["hash"]:
+            # 内容未变，只更新索引里的 mtime，下次直接按 mtime 命中
+            index[rel_source] = dict(entry, mtime_ns=stat.st_mtime_ns)
+            return True, fingerprint
+    return False, fingerprint
+
+def record_source(index, output_root, rel_source, file_abs_path, fingerprint, output_abs_path, profile, use_hash=False):
+    """加密成功后追加一条索引记录（含本批加密参数；use_hash 时补算源文件内容哈希）"""
+    if use_hash and not fingerprint.get("hash"):
+        fingerprint = dict(fingerprint, hash=file_sha256(file_abs_path))
+    entry = dict(fingerprint, source=rel_source, output=os.path.relpath(output_abs_path, output_root), **profile.fields())
+    index[rel_source] = entry
+    _append_entry(output_root, entry)
+
+def forget_source(index, output_root, rel_source):
+    """删除源文件的索引记录，并追加删除标记（中断后重新读取索引时旧记录也不再生效）"""
+    if index.pop(rel_source, None) is not None:
+        _append_entry(output_root, {"source": rel_source, "removed": True})
+
+def _append_entry(output_root, entry):
+    with open(index_path(output_root), 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def prune_missing_sources(index, output_root, seen_sources, delete_outputs=False):
+    """
+    找出源文件已不存在的索引记录
+    :param seen_sources: 本次遍历到的源相对路径集合
+    :param delete_outputs: True 时删除对应的加密输出并从索引移除
+    :return: 源已消失的输出文件路径列表
+    """
+    orphans = []
+    for rel_source in [rel for rel in index if rel not in seen_sources]:
+        output_abs_path = os.path.join(output_root, index[rel_source]["output"])
+        orphans.append(output_abs_path)
+        if delete_outputs:
+            if os.path.exists(output_abs_path):
+                os.remove(output_abs_path)
+            del index[rel_source]
+    return orphans
+
+def save_index(index, output_root):
+    """把索引重写为紧凑版本（每个源一行），先写临时文件再原子替换"""
+    path = index_path(output_root)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        for entry in index.values():
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    os.replace(temp_path, path)
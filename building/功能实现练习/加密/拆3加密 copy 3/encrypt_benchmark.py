@@ -0,0 +1,118 @@
+import os
+import time
+import hashlib
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import padding
+from zero_copy_io import encrypt_stream_zero_copy
+
+try:
+    import resource  # 仅 Unix：ru_maxrss 为进程峰值常驻内存
+except ImportError:
+    resource = None
+
+def read_peak_rss():
+    """当前进程峰值 RSS（字节）；Linux 的 ru_maxrss 单位是 KB，macOS 是字节；Windows 返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+def legacy_encrypt_loop(f_in, f_out, encryptor, chunk_size, padder=None):
+    """当前加密脚本的循环：每块 read 新建 bytes，update 再新建一个密文 bytes，作为对比基准"""
+    while True:
+        chunk = f_in.read(chunk_size)
+        if not chunk:
+            break
+        if padder is not None:
+            chunk = padder.update(chunk)
+        f_out.write(encryptor.update(chunk))
+    if padder is not None:
+        f_out.write(encryptor.update(padder.finalize()))
+    f_out.write(encryptor.finalize())
+
+def run_variant(args):
+    """
+    工作进程：用指定 I/O 方式加密一次，返回 (耗时, 峰值 RSS 增量)
+    每个变体在独立的新进程中运行，ru_maxrss 只会增长，同进程内无法区分各变体的峰值
+    """
+    variant, mode, src_path, dst_path, chunk_size = args
+    key, iv = b"k" * 32, b"i" * 16
+    cipher_mode = modes.CBC(iv) if mode == "CBC" else modes.CTR(iv)
+    encryptor = Cipher(algorithms.AES(key), cipher_mode, backend=default_backend()).encryptor()
+    padder = padding.PKCS7(128).padder() if mode == "CBC" else None
+
+    rss_before = read_peak_rss()
+    start_time = time.perf_counter()
+    with open(src_path, 'rb') as f_in, open(dst_path, 'wb') as f_out:
+        if variant == "legacy":
+            legacy_encrypt_loop(f_in, f_out, encryptor, chunk_size, padder)
+        else:
+            encrypt_stream_zero_copy(f_in, f_out, encryptor, chunk_size, padder, use_mmap=(variant == "mmap"))
+    elapsed = time.perf_counter() - start_time
+    rss_after = read_peak_rss()
+    return elapsed, (rss_after - rss_before if rss_before is not None else None)
+
+def best_of(variant, mode, src_path, dst_path, chunk_size, repeat):
+    """重复运行取最短耗时、最大峰值增量；每次都是新进程"""
+    best_time = float("inf")
+    peak_growth = None
+    for _ in range(repeat):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            elapsed, growth = executor.submit(run_variant, (variant, mode, src_path, dst_path, chunk_size)).result()
+        best_time = min(best_time, elapsed)
+        if growth is not None:
+            peak_growth = max(peak_growth or 0, growth)
+    return best_time, peak_growth
+
+def run_benchmark(file_size_mb=512, chunk_size=1024 * 1024 * 4, repeat=3, work_dir=None):
+    """
+    对比三种 I/O 方式在 CBC/CTR 下的吞吐量和峰值 RSS 增量：
+      legacy   —— 现有循环（read + update）
+      readinto —— 复用读缓冲 + update_into 预分配输出
+      mmap     —— mmap 输入 + update_into 预分配输出
+    :param file_size_mb: 测试文件大小（MB）
+    :param work_dir: 测试文件所在目录，默认系统临时目录（建议指向实际加密用的磁盘）
+    """
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        src_path = os.path.join(temp_dir, "plain.bin")
+        with open(src_path, 'wb') as f:
+            block = os.urandom(1024 * 1024)
+            for _ in range(file_size_mb):
+                f.write(block)
+        file_size = os.path.getsize(src_path)
+
+        print("\n" + "="*70)
+        print(f"📊 加密 I/O 基准测试（{file_size_mb}MB 文件，分块 {chunk_size // 1024 // 1024}MB，取 {repeat} 次最优）")
+        print("="*70)
+        results = {}
+        for mode in ["CBC", "CTR"]:
+            outputs = {}
+            for variant in ["legacy", "readinto", "mmap"]:
+                dst_path = os.path.join(temp_dir, f"{mode}_{variant}.enc")
+                elapsed, growth = best_of(variant, mode, src_path, dst_path, chunk_size, repeat)
+                results[(mode, variant)] = (file_size / elapsed / 1024 / 1024, growth)
+                hash_obj = hashlib.sha256()
+                with open(dst_path, 'rb') as f:
+                    for chunk in iter(lambda: f.read(chunk_size), b""):
+                        hash_obj.update(chunk)
+                outputs[variant] = hash_obj.hexdigest()
+                os.remove(dst_path)
+                growth_str = f"{growth / 1024 / 1024:.1f} MB" if growth is not None else "N/A"
+                print(f"{mode} {variant:<9} {results[(mode, variant)][0]:>9.1f} MB/s | 峰值 RSS 增量 {growth_str}")
+            # 三种方式的密文必须一致
+            assert outputs["legacy"] == outputs["readinto"] == outputs["mmap"], f"{mode} 密文不一致"
+        print("="*70)
+        return results
+
+if __name__ == "__main__":
+    # -------------------------- 配置区 --------------------------
+    FILE_SIZE_MB = 512             # 测试文件大小（MB）
+    CHUNK_SIZE = 1024 * 1024 * 4   # 与加密脚本一致的 4MB 分块
+    REPEAT = 3                     # 每种方式重复次数
+    WORK_DIR = None                # 测试文件目录，None 为系统临时目录
+    # -----------------------------------------------------------
+
+    run_benchmark(FILE_SIZE_MB, CHUNK_SIZE, REPEAT, WORK_DIR)
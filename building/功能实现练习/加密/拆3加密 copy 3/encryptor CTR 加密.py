@@ -2,18 +2,133 @@ import os
 import time
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
+from concurrent.futures import ProcessPoolExecutor
+from enc_container import MODE_CTR, KDF_SCRYPT, KDF_NAMES, build_header, new_batch_key, read_header, header_key
+from enc_index import EncryptionProfile, load_index, check_source, record_source, prune_missing_sources, save_index
+from hash_manifest import is_manifest_file
+from zero_copy_io import encrypt_stream_zero_copy
+from ctr_resume import (
+    ctr_counter_at_offset, part_path, checkpoint_path, load_checkpoint, save_checkpoint, commit_part, ctr_crypt_range
+)
+
+def _pread(fd, length, offset):
+    """按偏移读取（Windows 无 os.pread 时退化为 seek + read，每个工作进程各自持有文件描述符）"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, length, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, length)
+
+def _pwrite(fd, data, offset):
+    """按偏移写入，保证写满（Windows 无 os.pwrite 时退化为 seek + write）"""
+    view = memoryview(data)
+    while view:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+def _encrypt_ctr_segment(args):
+    """
+    工作进程：加密文件中 [offset, offset + length) 这一段，写入输出文件 data_offset + offset 处
+    （data_offset 为文件头长度，计数器仍按明文偏移计算）
+    sync_output 为 True 时返回前 fsync 输出文件（断点续传：本段完成即已落盘）
+    :return: 本段加密的字节数
+    """
+    key, nonce, src_path, dst_path, offset, length, chunk_size, data_offset, sync_output = args
+    encryptor = Cipher(
+        algorithms.AES(key), modes.CTR(ctr_counter_at_offset(nonce, offset)), backend=default_backend()
+    ).encryptor()
+    binary_flag = getattr(os, 'O_BINARY', 0)
+    fd_in = os.open(src_path, os.O_RDONLY | binary_flag)
+    fd_out = os.open(dst_path, os.O_WRONLY | binary_flag)
+    # 密文写入预分配缓冲（update_into），避免每块新建一个密文 bytes
+    out_buffer = bytearray(chunk_size + 15)
+    out_view = memoryview(out_buffer)
+    try:
+        end = offset + length
+        pos = offset
+        while pos < end:
+            chunk = _pread(fd_in, min(chunk_size, end - pos), pos)
+            if not chunk:
+                raise IOError(f"读取源文件提前结束，偏移 {pos}")
+            n = encryptor.update_into(chunk, out_buffer)
+            _pwrite(fd_out, out_view[:n], data_offset + pos)
+            pos += len(chunk)
+        if sync_output:
+            os.fsync(fd_out)
+        return length
+    finally:
+        os.close(fd_in)
+        os.close(fd_out)
+
+def aes256_ctr_parallel_encrypt_file(
+    src_path,
+    dst_path,
+    key,
+    nonce,
+    executor,
+    segment_size=1024 * 1024 * 64,  # 64MB 一段，按 16 字节对齐
+    chunk_size=1024 * 1024 * 4,
+    header=None,
+    start_offset=0,
+    checkpoint=None
+):
+    """
+    多核并行 CTR 加密单个文件：文件切成若干段，每段用对应偏移的计数器独立加密
+    输出文件先写文件头并预分配到 文件头 + 原大小，各段用 pwrite 写回各自位置，结果与顺序加密逐字节一致
+    :param executor: 进程池（由批量任务复用，避免每个文件重新启动进程）
+    :param header: 已生成的文件头（含 KDF 参数和盐），默认只含 nonce 的 SHA-256 兼容头
+    :param start_offset: 续传偏移（> 0 时 dst_path 已含文件头和前面的密文，不再重写）
+    :param checkpoint: 回调 checkpoint(已落盘偏移)；传入时各段完成后 fsync，按段顺序推进已完成的连续前缀
+    """
+    file_size = os.path.getsize(src_path)
+    segment_size -= segment_size % 16
+
+    # 写文件头并预分配输出文件
+    header = header or build_header(MODE_CTR, nonce, chunk_size)
+    if start_offset == 0:
+        with open(dst_path, 'wb') as f_out:
+            f_out.write(header)
+            f_out.truncate(len(header) + file_size)
+
+    offsets = range(start_offset, file_size, segment_size)
+    tasks = [
+        (key, nonce, src_path, dst_path, offset, min(segment_size, file_size - offset), chunk_size, len(header),
+         checkpoint is not None)
+        for offset in offsets
+    ]
+    total = 0
+    # executor.map 按提交顺序返回结果：每拿到一个结果，之前的段都已完成并落盘
+    for offset, length in zip(offsets, executor.map(_encrypt_ctr_segment, tasks)):
+        total += length
+        if checkpoint:
+            checkpoint(offset + length)
+    return total
 
 def aes256_ctr_file_encrypt(
     source_dir=r"E:\无耻之徒字幕重置",
     encrypt_output_dir=r"E:\encryted",
     password="secp256k1",
     chunk_size=1024 * 1024 * 4,  # 4MB
-    output_suffix=".enc"
+    output_suffix=".enc",
+    parallel_workers=os.cpu_count(),  # 并行加密进程数，1 为单核顺序加密
+    segment_size=1024 * 1024 * 64,    # 并行时每段大小，小于该值的文件仍顺序加密
+    zero_copy=True,                   # 零拷贝 I/O（mmap + update_into 预分配缓冲），False 为逐块 read/update 循环
+    kdf=KDF_SCRYPT,                   # 密钥派生：KDF_SCRYPT / KDF_PBKDF2
+    kdf_params=None,                  # KDF 成本参数，None 为默认（scrypt: (log2N, r, p)；PBKDF2: (迭代次数, 0, 0)）
+    incremental=True,                 # 增量加密：按输出目录下的索引跳过未变化的源文件
+    hash_check=False,                 # 索引同时记录内容哈希；mtime 变了但内容没变（touch/复制）也跳过
+    delete_orphans=False,             # 删除源文件已不存在的加密输出
+    resumable=True,                   # 断点续传：先写 .part，定期 fsync 并记录检查点，中断后从检查点继续
+    checkpoint_interval=1024 * 1024 * 256  # 顺序加密时每 256MB 记录一次检查点（并行时按段记录）
 ):
     total_count = 0
     success_count = 0
     failed_files = []
+    skipped_count = 0
 
     for dir_path in [source_dir, encrypt_output_dir]:
         os.makedirs(dir_path, exist_ok=True)
@@ -26,8 +141,11 @@ def aes256_ctr_file_encrypt(
     print(f"📌 AES-256-CTR 加密配置（流式加密，适合视频边读边解密）")
     print(f"   源目录：{os.path.abspath(source_dir)}")
     print(f"   输出目录：{os.path.abspath(encrypt_output_dir)}")
-    print(f"   分块大小：{chunk_size // 1024 // 1024}MB | 输出后缀：{output_suffix}")
-    print("   加密模式：AES-256-CTR | 密钥来源：密码 SHA-256 哈希")
+    print(f"   分块大小：{chunk_size // 1024 // 1024}MB | 输出后缀：{output_suffix} | 零拷贝 I/O：{'开' if zero_copy else '关'}")
+    print(f"   并行进程：{parallel_workers} | 分段大小：{segment_size // 1024 // 1024}MB")
+    if resumable:
+        print(f"   断点续传：开 | 检查点间隔：{checkpoint_interval // 1024 // 1024}MB（并行时每段）")
+    print(f"   加密模式：AES-256-CTR | 密钥派生：{KDF_NAMES[kdf]}（本批随机盐，写入文件头）")
     print("=" * 90 + "\n")
 
     def format_size(bytes_size):
@@ -38,51 +156,119 @@ def aes256_ctr_file_encrypt(
             unit_idx += 1
         return f"{bytes_size:.2f} {units[unit_idx]}"
 
-    # 从密码生成 32 字节密钥
-    def generate_key(password_str):
-        digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
-        digest.update(password_str.encode('utf-8'))
-        return digest.finalize()
+    # 从密码派生 32 字节密钥：整批共用一个随机盐，只派生一次
+    key, kdf_params, salt = new_batch_key(password, kdf, kdf_params)
+    # 续传的 .part 文件头里是上次运行的盐，按文件头取密钥（本批的密钥先放进缓存）
+    key_cache = {(kdf, kdf_params, salt): key}
+    # 索引记录带上模式、KDF 和密钥校验值：换模式、KDF 或密码后不会误跳过
+    profile = EncryptionProfile(MODE_CTR, password, kdf, kdf_params, salt, key, key_cache)
+    resumed_count = 0
+    executor = ProcessPoolExecutor(max_workers=parallel_workers) if parallel_workers and parallel_workers > 1 else None
 
-    key = generate_key(password)
+    # 增量索引：源相对路径 → 上次加密时的指纹和输出文件
+    index = load_index(encrypt_output_dir) if incremental else {}
+    seen_sources = set()
+    orphans = []
 
     try:
         for root, dirs, files in os.walk(source_dir):
             for file_name in files:
+                if is_manifest_file(file_name):
+                    continue  # 源目录下旧版的哈希清单不加密
                 total_count += 1
                 file_abs_path = os.path.join(root, file_name)
                 rel_dir = os.path.relpath(root, source_dir)
                 encrypt_subdir = os.path.join(encrypt_output_dir, rel_dir)
                 os.makedirs(encrypt_subdir, exist_ok=True)
                 output_enc_path = os.path.join(encrypt_subdir, file_name + output_suffix)
-                nonce_path = output_enc_path + ".nonce"
 
                 file_total_size = os.path.getsize(file_abs_path)
                 if file_total_size == 0:
                     print(f"⚠️  跳过空文件 | 文件名：{file_name}")
                     continue
 
+                rel_source = os.path.relpath(file_abs_path, source_dir)
+                seen_sources.add(rel_source)
+                if incremental:
+                    unchanged, fingerprint = check_source(index, encrypt_output_dir, rel_source, file_abs_path, profile, hash_check)
+                    if unchanged:
+                        skipped_count += 1
+                        continue
+
                 try:
                     file_start_time = time.time()
 
-                    # CTR 模式：通常 nonce 长度为 16 字节（和块大小相同）
-                    # 这里用 16 字节随机 nonce，保存到 .nonce 文件
-                    nonce = os.urandom(16)
-                    with open(nonce_path, 'wb') as f:
-                        f.write(nonce)
-
-                    cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
-                    encryptor = cipher.encryptor()
-
-                    with open(file_abs_path, 'rb') as f_in, open(output_enc_path, 'wb') as f_out:
-                        while True:
-                            chunk = f_in.read(chunk_size)
-                            if not chunk:
-                                break
-                            encrypted_chunk = encryptor.update(chunk)
-                            f_out.write(encrypted_chunk)
-                        # 收尾（CTR 一般没有 finalize 数据，但接口还是要调用）
-                        f_out.write(encryptor.finalize())
+                    resume_offset = 0
+                    if resumable and os.path.exists(checkpoint_path(output_enc_path)):
+                        # 按 .part 文件头（上次运行的盐和 KDF 参数）用本次密码取密钥，再与检查点的密钥校验值比对
+                        # 密码变了 → 校验值不一致 → 从头开始；.part 文件头损坏同样从头开始
+                        try:
+                            with open(part_path(output_enc_path), 'rb') as f:
+                                part_header = read_header(f)
+                                f.seek(0)
+                                part_header_bytes = f.read(part_header.header_size) if part_header else b""
+                            if part_header and part_header.mode == MODE_CTR:
+                                part_key = header_key(password, part_header, key_cache)
+                                resume_offset = load_checkpoint(output_enc_path, file_abs_path, part_key)
+                        except (OSError, ValueError):
+                            resume_offset = 0
+                    if resume_offset:
+                        # 断点续传：沿用 .part 文件头中的 nonce、盐和 KDF 参数
+                        header = part_header_bytes
+                        nonce = part_header.nonce
+                        file_key = part_key
+                        resumed_count += 1
+                        print(f"🔁 断点续传 | 文件名：{file_name} | 从 {format_size(resume_offset)} / {format_size(file_total_size)} 处继续")
+                    else:
+                        # CTR 模式：通常 nonce 长度为 16 字节（和块大小相同）
+                        # 这里用 16 字节随机 nonce，写入 .enc 文件头（不再生成 .nonce 文件）
+                        nonce = os.urandom(16)
+                        header = build_header(MODE_CTR, nonce, chunk_size, kdf, kdf_params, salt)
+                        file_key = key
+
+                    if resumable:
+                        # 写入 .part，定期落盘并记录检查点；完成后改名为 .enc
+                        def checkpoint(offset):
+                            save_checkpoint(output_enc_path, file_abs_path, offset, file_key)
+
+                        enc_part_path = part_path(output_enc_path)
+                        if executor and file_total_size - resume_offset > segment_size:
+                            aes256_ctr_parallel_encrypt_file(
+                                file_abs_path, enc_part_path, file_key, nonce, executor, segment_size, chunk_size,
+                                header, resume_offset, checkpoint
+                            )
+                        else:
+                            if resume_offset == 0:
+                                with open(enc_part_path, 'wb') as f_out:
+                                    f_out.write(header)
+                            # 顺序续传同样走零拷贝循环（zero_copy=False 时用 readinto 复用缓冲）
+                            ctr_crypt_range(
+                                file_abs_path, 0, enc_part_path, len(header), file_key, nonce,
+                                resume_offset, file_total_size, chunk_size, checkpoint, checkpoint_interval, zero_copy
+                            )
+                        commit_part(output_enc_path)
+                    elif executor and file_total_size > segment_size:
+                        # 大文件：多进程分段并行加密
+                        aes256_ctr_parallel_encrypt_file(
+                            file_abs_path, output_enc_path, key, nonce, executor, segment_size, chunk_size, header
+                        )
+                    else:
+                        cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
+                        encryptor = cipher.encryptor()
+
+                        with open(file_abs_path, 'rb') as f_in, open(output_enc_path, 'wb') as f_out:
+                            f_out.write(header)
+                            if zero_copy:
+                                encrypt_stream_zero_copy(f_in, f_out, encryptor, chunk_size)
+                            else:
+                                while True:
+                                    chunk = f_in.read(chunk_size)
+                                    if not chunk:
+                                        break
+                                    encrypted_chunk = encryptor.update(chunk)
+                                    f_out.write(encrypted_chunk)
+                                # 收尾（CTR 一般没有 finalize 数据，但接口还是要调用）
+                                f_out.write(encryptor.finalize())
 
                     file_elapsed_time = time.time() - file_start_time
                     file_avg_speed = file_total_size / file_elapsed_time / 1024 / 1024
@@ -90,20 +276,39 @@ def aes256_ctr_file_encrypt(
 
                     print(f"✅ 加密完成 | 文件名：{file_name} | 大小：{file_size_str} | 耗时：{file_elapsed_time:.2f}s | 平均速度：{file_avg_speed:.2f} MB/s | 保存至：{output_enc_path}")
                     success_count += 1
+                    if incremental:
+                        record_source(index, encrypt_output_dir, rel_source, file_abs_path, fingerprint, output_enc_path, profile, hash_check)
 
                 except Exception as e:
                     print(f"❌ 加密失败 | 文件名：{file_name} | 错误信息：{str(e)}")
                     failed_files.append((file_name, str(e)))
                     continue
 
+        # 完整遍历后才能判断哪些源文件已被删除（中断时跳过）
+        if incremental:
+            orphans = prune_missing_sources(index, encrypt_output_dir, seen_sources, delete_orphans)
+
     except KeyboardInterrupt:
         print("\n\n⚠️  检测到强制退出，任务已中断")
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    if incremental:
+        save_index(index, encrypt_output_dir)
 
     print("\n" + "=" * 90)
     print(f"🎉 AES-256-CTR 加密任务结束！ | 总文件数：{total_count} | 成功数：{success_count} | 失败数：{len(failed_files)}")
-    print(f"💡 注意：解密时需要 密码 + 对应 .nonce 文件 | 输出目录：{os.path.abspath(encrypt_output_dir)}")
+    if incremental:
+        print(f"♻️  增量加密：跳过未变化 {skipped_count} 个 | 源文件已删除的输出 {len(orphans)} 个{'（已删除）' if delete_orphans and orphans else ''}")
+        if not delete_orphans:
+            for orphan in orphans:
+                print(f"   - {orphan}")
+    if resumable:
+        print(f"🔁 断点续传：本次续传 {resumed_count} 个文件（中断的文件保留 .part 和检查点，重新运行即可继续）")
+    print(f"💡 注意：解密时只需要密码（nonce 已写入 .enc 文件头） | 输出目录：{os.path.abspath(encrypt_output_dir)}")
     print("=" * 90)
-    return success_count > 0
+    return success_count > 0 or skipped_count > 0
 
 if __name__ == "__main__":
     aes256_ctr_file_encrypt()
\ No newline at end of file
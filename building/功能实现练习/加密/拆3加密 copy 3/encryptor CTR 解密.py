@@ -1,19 +1,138 @@
+import io
 import os
 import time
+import hashlib
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
+from enc_container import MODE_CTR, MODE_NAMES, read_header, header_key
+from ctr_resume import (
+    ctr_counter_at_offset, part_path, load_checkpoint, save_checkpoint, commit_part, ctr_crypt_range
+)
+
+class CtrDecryptReader(io.RawIOBase):
+    """
+    .enc 文件的可随机访问解密读取器（类文件对象，支持 read/readinto/seek/tell）
+    nonce 取自文件头；旧版无文件头的 .enc 回退到配套 .nonce 文件
+    只解密实际读取的字节范围，不生成明文副本，可直接用于哈希、探测、边读边播放
+    顺序读取时复用同一个解密器；seek 到其他位置时按偏移重新计算计数器
+    """
+
+    def __init__(self, enc_path, key, nonce_path=None):
+        super().__init__()
+        self._file = open(enc_path, 'rb')
+        try:
+            self.header = header = read_header(self._file)
+            if header:
+                if header.mode != MODE_CTR:
+                    raise ValueError(f"加密模式不匹配：文件为 {MODE_NAMES[header.mode]}，不是 AES-256-CTR")
+                self._nonce = header.nonce
+                self._data_offset = header.header_size
+            else:
+                with open(nonce_path or enc_path + ".nonce", 'rb') as f:
+                    self._nonce = f.read()
+                self._data_offset = 0
+            if len(self._nonce) != 16:
+                raise ValueError(f"nonce 长度错误，必须为 16 字节，当前为 {len(self._nonce)} 字节")
+        except Exception:
+            self._file.close()
+            raise
+        self._key = key
+        # 明文大小 = 文件大小 - 文件头；seek/tell 都按明文偏移计算
+        self._size = os.fstat(self._file.fileno()).st_size - self._data_offset
+        self._pos = 0
+        self._decryptor = None   # 当前解密器，对应密文位置 self._decryptor_pos
+        self._decryptor_pos = -1
+
+    @classmethod
+    def open(cls, enc_path, password, nonce_path=None, key_cache=None):
+        """
+        用密码打开：按文件头的 KDF 参数和盐派生密钥（旧版文件为密码 SHA-256）
+        :param key_cache: 派生密钥缓存（dict），打开同一批的多个文件时传入同一个 dict
+        """
+        reader = cls(enc_path, None, nonce_path)
+        reader._key = header_key(password, reader.header, key_cache if key_cache is not None else {})
+        return reader
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            new_pos = offset
+        elif whence == io.SEEK_CUR:
+            new_pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            new_pos = self._size + offset
+        else:
+            raise ValueError(f"不支持的 whence：{whence}")
+        if new_pos < 0:
+            raise ValueError(f"seek 位置不能为负数：{new_pos}")
+        self._pos = new_pos
+        return self._pos
+
+    def readinto(self, buffer):
+        view = memoryview(buffer).cast('B')
+        length = min(len(view), self._size - self._pos)
+        if length <= 0:
+            return 0
+
+        if self._decryptor is None or self._decryptor_pos != self._pos:
+            # 非顺序读取：从所在 16 字节块的开头重建解密器，丢弃块内多余的前缀
+            aligned = self._pos - self._pos % 16
+            self._decryptor = Cipher(
+                algorithms.AES(self._key), modes.CTR(ctr_counter_at_offset(self._nonce, aligned)),
+                backend=default_backend()
+            ).decryptor()
+            self._file.seek(self._data_offset + aligned)
+            skip = self._pos - aligned
+            if skip:
+                self._decryptor.update(self._file.read(skip))
+        else:
+            self._file.seek(self._data_offset + self._pos)
+
+        data = self._file.read(length)
+        plain = self._decryptor.update(data)
+        view[:len(plain)] = plain
+        self._pos += len(plain)
+        self._decryptor_pos = self._pos
+        return len(plain)
+
+    def close(self):
+        if not self.closed:
+            self._file.close()
+        super().close()
+
+def calculate_decrypted_hash(enc_path, password, algorithm="sha256", chunk_size=1024 * 1024 * 4, key_cache=None):
+    """不落盘解密，直接计算 .enc 对应明文的哈希值（可与原文件哈希对比）"""
+    hash_obj = hashlib.new(algorithm)
+    buffer = bytearray(chunk_size)
+    with CtrDecryptReader.open(enc_path, password, key_cache=key_cache) as reader:
+        while True:
+            n = reader.readinto(buffer)
+            if not n:
+                break
+            hash_obj.update(memoryview(buffer)[:n])
+    return hash_obj.hexdigest()
 
 def aes256_ctr_file_batch_decrypt(
     source_enc_dir=r"E:\encryted",
     decrypt_output_dir=r"E:\decrypted",
     password="secp256k1",
     chunk_size=1024 * 1024 * 4,
-    enc_suffix=".enc"
+    enc_suffix=".enc",
+    resumable=True,                        # 断点续传：先写 .part，定期 fsync 并记录检查点，中断后从检查点继续
+    checkpoint_interval=1024 * 1024 * 256  # 每 256MB 记录一次检查点
 ):
     total_count = 0
     success_count = 0
     failed_files = []
+    resumed_count = 0
 
     os.makedirs(decrypt_output_dir, exist_ok=True)
 
@@ -26,7 +145,9 @@ def aes256_ctr_file_batch_decrypt(
     print(f"   加密文件目录：{os.path.abspath(source_enc_dir)}")
     print(f"   解密输出目录：{os.path.abspath(decrypt_output_dir)}")
     print(f"   分块大小：{chunk_size // 1024 // 1024}MB | 加密文件后缀：{enc_suffix}")
-    print("   解密模式：AES-256-CTR | 密钥来源：密码 SHA-256 哈希")
+    if resumable:
+        print(f"   断点续传：开 | 检查点间隔：{checkpoint_interval // 1024 // 1024}MB")
+    print("   解密模式：AES-256-CTR | 密钥派生：按文件头（同一批文件只派生一次）")
     print("=" * 90 + "\n")
 
     def format_size(bytes_size):
@@ -37,12 +158,8 @@ def aes256_ctr_file_batch_decrypt(
             unit_idx += 1
         return f"{bytes_size:.2f} {units[unit_idx]}"
 
-    def generate_key(password_str):
-        digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
-        digest.update(password_str.encode('utf-8'))
-        return digest.finalize()
-
-    key = generate_key(password)
+    # 派生密钥缓存：键为 (KDF, 参数, 盐)，同一批加密的文件共用一个密钥
+    key_cache = {}
 
     try:
         for root, dirs, files in os.walk(source_enc_dir):
@@ -52,13 +169,9 @@ def aes256_ctr_file_batch_decrypt(
 
                 total_count += 1
                 enc_file_abs_path = os.path.join(root, file_name)
+                # 旧版文件的 nonce 在配套 .nonce 文件中；新版文件的 nonce 在文件头里
                 nonce_path = enc_file_abs_path + ".nonce"
 
-                if not os.path.exists(nonce_path):
-                    print(f"❌ 解密失败 | 文件名：{file_name} | 错误：缺少配套 nonce 文件 {nonce_path}")
-                    failed_files.append((file_name, "缺少 nonce 文件"))
-                    continue
-
                 rel_dir = os.path.relpath(root, source_enc_dir)
                 output_subdir = os.path.join(decrypt_output_dir, rel_dir)
                 os.makedirs(output_subdir, exist_ok=True)
@@ -70,22 +183,56 @@ def aes256_ctr_file_batch_decrypt(
                 try:
                     file_start_time = time.time()
 
-                    with open(nonce_path, 'rb') as f:
-                        nonce = f.read()
-                    if len(nonce) != 16:
-                        raise ValueError(f"nonce 长度错误，必须为 16 字节，当前为 {len(nonce)} 字节")
+                    with open(enc_file_abs_path, 'rb') as f_in:
+                        # 读取文件头中的 nonce；旧版文件回退到 .nonce 文件
+                        header = read_header(f_in)
+                        if header:
+                            if header.mode != MODE_CTR:
+                                raise ValueError(f"加密模式不匹配：文件为 {MODE_NAMES[header.mode]}，本脚本只解密 AES-256-CTR")
+                            nonce = header.nonce
+                        elif os.path.exists(nonce_path):
+                            with open(nonce_path, 'rb') as f:
+                                nonce = f.read()
+                        else:
+                            raise FileNotFoundError(f"缺少文件头且无配套 nonce 文件 {nonce_path}")
+                        if len(nonce) != 16:
+                            raise ValueError(f"nonce 长度错误，必须为 16 字节，当前为 {len(nonce)} 字节")
+                        key = header_key(password, header, key_cache)
+
+                    if resumable:
+                        # 写入 .part，定期落盘并记录检查点；检查点与 .enc 文件、密钥都一致时从记录的偏移继续
+                        data_offset = header.header_size if header else 0
+                        resume_offset = load_checkpoint(output_file_path, enc_file_abs_path, key)
+                        out_part_path = part_path(output_file_path)
+                        if resume_offset:
+                            resumed_count += 1
+                            print(f"🔁 断点续传 | 文件名：{file_name} | 从 {format_size(resume_offset)} / {format_size(enc_file_size - data_offset)} 处继续")
+                        else:
+                            open(out_part_path, 'wb').close()
 
-                    cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
-                    decryptor = cipher.decryptor()
+                        def checkpoint(offset):
+                            save_checkpoint(output_file_path, enc_file_abs_path, offset, key)
 
-                    with open(enc_file_abs_path, 'rb') as f_in, open(output_file_path, 'wb') as f_out:
-                        while True:
-                            chunk = f_in.read(chunk_size)
-                            if not chunk:
-                                break
-                            decrypted_chunk = decryptor.update(chunk)
-                            f_out.write(decrypted_chunk)
-                        f_out.write(decryptor.finalize())
+                        ctr_crypt_range(
+                            enc_file_abs_path, data_offset, out_part_path, 0, key, nonce,
+                            resume_offset, enc_file_size - data_offset, chunk_size, checkpoint, checkpoint_interval
+                        )
+                        commit_part(output_file_path)
+                    else:
+                        # 不续传：直接写目标文件
+                        with open(enc_file_abs_path, 'rb') as f_in:
+                            f_in.seek(header.header_size if header else 0)
+                            cipher = Cipher(algorithms.AES(key), modes.CTR(nonce), backend=default_backend())
+                            decryptor = cipher.decryptor()
+
+                            with open(output_file_path, 'wb') as f_out:
+                                while True:
+                                    chunk = f_in.read(chunk_size)
+                                    if not chunk:
+                                        break
+                                    decrypted_chunk = decryptor.update(chunk)
+                                    f_out.write(decrypted_chunk)
+                                f_out.write(decryptor.finalize())
 
                     file_elapsed_time = time.time() - file_start_time
                     file_avg_speed = enc_file_size / file_elapsed_time / 1024 / 1024
@@ -105,6 +252,8 @@ def aes256_ctr_file_batch_decrypt(
 
     print("\n" + "=" * 90)
     print(f"🎉 AES-256-CTR 批量解密任务结束！ | 总加密文件数：{total_count} | 成功数：{success_count} | 失败数：{len(failed_files)}")
+    if resumable:
+        print(f"🔁 断点续传：本次续传 {resumed_count} 个文件（中断的文件保留 .part 和检查点，重新运行即可继续）")
     print(f"💡 解密文件存放位置：{os.path.abspath(decrypt_output_dir)}")
     if failed_files:
         print("\n❌ 失败文件列表：")
@@ -114,4 +263,10 @@ def aes256_ctr_file_batch_decrypt(
     return success_count > 0
 
 if __name__ == "__main__":
-    aes256_ctr_file_batch_decrypt()
\ No newline at end of file
+    aes256_ctr_file_batch_decrypt()
+
+    # 随机访问示例：不生成明文副本，直接读取/哈希加密文件
+    # with CtrDecryptReader.open(r"E:\encryted\test.mkv.enc", "secp256k1") as reader:
+    #     reader.seek(1024 * 1024 * 1024)
+    #     data = reader.read(4096)
+    # print(calculate_decrypted_hash(r"E:\encryted\test.mkv.enc", "secp256k1"))
\ No newline at end of file
@@ -0,0 +1,150 @@
+import os
+import time
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from enc_container import (
+    MODE_GCM, KDF_SCRYPT, KDF_NAMES, build_header, new_batch_key, gcm_segment_nonce, gcm_segment_aad
+)
+from enc_index import EncryptionProfile, load_index, check_source, record_source, prune_missing_sources, save_index
+from hash_manifest import is_manifest_file
+
+def aes256_gcm_encrypt_file(src_path, dst_path, aesgcm, header, nonce, chunk_size=1024 * 1024 * 4):
+    """
+    按段认证加密单个文件：文件头 + 每段（密文 + 16 字节标签）
+    每段 nonce/AAD 由段序号决定，解密时各段可独立、并行校验
+    :param aesgcm: AESGCM 实例（整批复用）
+    :param header: build_header 生成的文件头（AAD 绑定其原始字节）
+    :param nonce: 文件头中的 16 字节 nonce
+    :return: 段数
+    """
+    file_size = os.path.getsize(src_path)
+    segment_count = max(1, -(-file_size // chunk_size))  # 空文件也写一段空密文，保证可认证
+
+    with open(src_path, 'rb') as f_in, open(dst_path, 'wb') as f_out:
+        f_out.write(header)
+        for index in range(segment_count):
+            chunk = f_in.read(chunk_size)
+            aad = gcm_segment_aad(header, index, index == segment_count - 1)
+            f_out.write(aesgcm.encrypt(gcm_segment_nonce(nonce, index), chunk, aad))
+    return segment_count
+
+def aes256_gcm_file_encrypt(
+    source_dir=r"E:\无耻之徒字幕重置",
+    encrypt_output_dir=r"E:\encryted",
+    password="secp256k1",
+    chunk_size=1024 * 1024 * 4,  # 4MB 一段，每段独立认证
+    output_suffix=".enc",
+    kdf=KDF_SCRYPT,              # 密钥派生：KDF_SCRYPT / KDF_PBKDF2
+    kdf_params=None,             # KDF 成本参数，None 为默认（scrypt: (log2N, r, p)；PBKDF2: (迭代次数, 0, 0)）
+    incremental=True,            # 增量加密：按输出目录下的索引跳过未变化的源文件
+    hash_check=False,            # 索引同时记录内容哈希；mtime 变了但内容没变（touch/复制）也跳过
+    delete_orphans=False         # 删除源文件已不存在的加密输出
+):
+    total_count = 0
+    success_count = 0
+    failed_files = []
+    skipped_count = 0
+
+    for dir_path in [source_dir, encrypt_output_dir]:
+        os.makedirs(dir_path, exist_ok=True)
+
+    if not os.listdir(source_dir):
+        print(f"❌ 源文件夹 {source_dir} 为空")
+        return False
+
+    print("=" * 90)
+    print(f"📌 AES-256-GCM 分段认证加密配置（密文自带完整性校验，无需单独哈希比对）")
+    print(f"   源目录：{os.path.abspath(source_dir)}")
+    print(f"   输出目录：{os.path.abspath(encrypt_output_dir)}")
+    print(f"   分段大小：{chunk_size // 1024 // 1024}MB | 输出后缀：{output_suffix}")
+    print(f"   加密模式：AES-256-GCM | 密钥派生：{KDF_NAMES[kdf]}（本批随机盐，写入文件头）")
+    print("=" * 90 + "\n")
+
+    def format_size(bytes_size):
+        units = ['B', 'KB', 'MB', 'GB']
+        unit_idx = 0
+        while bytes_size >= 1024 and unit_idx < len(units)-1:
+            bytes_size /= 1024
+            unit_idx += 1
+        return f"{bytes_size:.2f} {units[unit_idx]}"
+
+    # 从密码派生 32 字节密钥：整批共用一个随机盐，只派生一次
+    key, kdf_params, salt = new_batch_key(password, kdf, kdf_params)
+    aesgcm = AESGCM(key)
+
+    # 增量索引：源相对路径 → 上次加密时的指纹和输出文件
+    index = load_index(encrypt_output_dir) if incremental else {}
+    # 索引记录带上模式、KDF 和密钥校验值：换模式、KDF 或密码后不会误跳过
+    profile = EncryptionProfile(MODE_GCM, password, kdf, kdf_params, salt, key)
+    seen_sources = set()
+    orphans = []
+
+    try:
+        for root, dirs, files in os.walk(source_dir):
+            for file_name in files:
+                if is_manifest_file(file_name):
+                    continue  # 源目录下旧版的哈希清单不加密
+                total_count += 1
+                file_abs_path = os.path.join(root, file_name)
+                rel_dir = os.path.relpath(root, source_dir)
+                encrypt_subdir = os.path.join(encrypt_output_dir, rel_dir)
+                os.makedirs(encrypt_subdir, exist_ok=True)
+                output_enc_path = os.path.join(encrypt_subdir, file_name + output_suffix)
+
+                file_total_size = os.path.getsize(file_abs_path)
+                if file_total_size == 0:
+                    print(f"⚠️  跳过空文件 | 文件名：{file_name}")
+                    continue
+
+                rel_source = os.path.relpath(file_abs_path, source_dir)
+                seen_sources.add(rel_source)
+                if incremental:
+                    unchanged, fingerprint = check_source(index, encrypt_output_dir, rel_source, file_abs_path, profile, hash_check)
+                    if unchanged:
+                        skipped_count += 1
+                        continue
+
+                try:
+                    file_start_time = time.time()
+
+                    # 每个文件 16 字节随机 nonce（写入文件头），各段 nonce 由它和段序号推出
+                    nonce = os.urandom(16)
+                    header = build_header(MODE_GCM, nonce, chunk_size, kdf, kdf_params, salt)
+                    segment_count = aes256_gcm_encrypt_file(file_abs_path, output_enc_path, aesgcm, header, nonce, chunk_size)
+
+                    file_elapsed_time = time.time() - file_start_time
+                    file_avg_speed = file_total_size / file_elapsed_time / 1024 / 1024
+                    file_size_str = format_size(file_total_size)
+
+                    print(f"✅ 加密完成 | 文件名：{file_name} | 大小：{file_size_str} | 段数：{segment_count} | 耗时：{file_elapsed_time:.2f}s | 平均速度：{file_avg_speed:.2f} MB/s | 保存至：{output_enc_path}")
+                    success_count += 1
+                    if incremental:
+                        record_source(index, encrypt_output_dir, rel_source, file_abs_path, fingerprint, output_enc_path, profile, hash_check)
+
+                except Exception as e:
+                    print(f"❌ 加密失败 | 文件名：{file_name} | 错误信息：{str(e)}")
+                    failed_files.append((file_name, str(e)))
+                    continue
+
+        # 完整遍历后才能判断哪些源文件已被删除（中断时跳过）
+        if incremental:
+            orphans = prune_missing_sources(index, encrypt_output_dir, seen_sources, delete_orphans)
+
+    except KeyboardInterrupt:
+        print("\n\n⚠️  检测到强制退出，任务已中断")
+
+    if incremental:
+        save_index(index, encrypt_output_dir)
+
+    print("\n" + "=" * 90)
+    print(f"🎉 AES-256-GCM 加密任务结束！ | 总文件数：{total_count} | 成功数：{success_count} | 失败数：{len(failed_files)}")
+    if incremental:
+        print(f"♻️  增量加密：跳过未变化 {skipped_count} 个 | 源文件已删除的输出 {len(orphans)} 个{'（已删除）' if delete_orphans and orphans else ''}")
+        if not delete_orphans:
+            for orphan in orphans:
+                print(f"   - {orphan}")
+    print(f"💡 注意：解密/校验时只需要密码 | 输出目录：{os.path.abspath(encrypt_output_dir)}")
+    print("=" * 90)
+    return success_count > 0 or skipped_count > 0
+
+if __name__ == "__main__":
+    aes256_gcm_file_encrypt()
@@ -0,0 +1,204 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from enc_container import (
+    MODE_GCM, MODE_NAMES, GCM_TAG_SIZE, read_header, header_key,
+    gcm_segment_nonce, gcm_segment_aad, gcm_segment_layout
+)
+
+def _pread(fd, length, offset):
+    """按偏移读取（Windows 无 os.pread 时退化为 seek + read，每个工作进程各自持有文件描述符）"""
+    if hasattr(os, 'pread'):
+        return os.pread(fd, length, offset)
+    os.lseek(fd, offset, os.SEEK_SET)
+    return os.read(fd, length)
+
+def _pwrite(fd, data, offset):
+    """按偏移写入，保证写满（Windows 无 os.pwrite 时退化为 seek + write）"""
+    view = memoryview(data)
+    while view:
+        if hasattr(os, 'pwrite'):
+            written = os.pwrite(fd, view, offset)
+        else:
+            os.lseek(fd, offset, os.SEEK_SET)
+            written = os.write(fd, view)
+        view = view[written:]
+        offset += written
+
+def _open_gcm_segments(args):
+    """
+    工作进程：校验并解密一组段；dst_path 为 None 时只校验不写明文
+    任一段认证失败立即抛出 ValueError（说明段序号）
+    :return: 本组明文字节数
+    """
+    key, enc_path, dst_path, header_size, nonce, chunk_size, last_index, segments = args
+    aesgcm = AESGCM(key)
+    binary_flag = getattr(os, 'O_BINARY', 0)
+    fd_in = os.open(enc_path, os.O_RDONLY | binary_flag)
+    fd_out = os.open(dst_path, os.O_WRONLY | binary_flag) if dst_path else None
+    try:
+        header_bytes = _pread(fd_in, header_size, 0)
+        total = 0
+        for index, offset, length in segments:
+            data = _pread(fd_in, length + GCM_TAG_SIZE, header_size + offset)
+            aad = gcm_segment_aad(header_bytes, index, index == last_index)
+            try:
+                plain = aesgcm.decrypt(gcm_segment_nonce(nonce, index), data, aad)
+            except InvalidTag:
+                raise ValueError(f"第 {index} 段认证失败（密文被篡改/损坏、密码错误或文件被截断）") from None
+            if fd_out is not None:
+                _pwrite(fd_out, plain, index * chunk_size)
+            total += len(plain)
+        return total
+    finally:
+        os.close(fd_in)
+        if fd_out is not None:
+            os.close(fd_out)
+
+def aes256_gcm_open_file(enc_path, dst_path, key, header, executor=None, segments_per_task=4):
+    """
+    分段并行校验（并解密）单个 GCM 文件
+    明文先写入 dst_path + ".part"，所有段认证通过后才改名为 dst_path，校验失败不会留下未认证的明文
+    :param dst_path: 解密输出路径；None 为仅校验模式（不写任何明文）
+    :param executor: 进程池（批量任务复用）；None 时在当前进程顺序处理
+    :param segments_per_task: 每个任务处理的段数（减少进程间调度开销）
+    :return: 明文字节数
+    """
+    payload_size = os.path.getsize(enc_path) - header.header_size
+    segments = gcm_segment_layout(payload_size, header.chunk_size)
+    last_index = segments[-1][0]
+    plain_size = sum(length for _, _, length in segments)
+
+    part_path = dst_path + ".part" if dst_path else None
+    if part_path:
+        with open(part_path, 'wb') as f_out:
+            f_out.truncate(plain_size)
+
+    tasks = [
+        (key, enc_path, part_path, header.header_size, header.nonce, header.chunk_size, last_index,
+         segments[i:i + segments_per_task])
+        for i in range(0, len(segments), segments_per_task)
+    ]
+    try:
+        results = executor.map(_open_gcm_segments, tasks) if executor else map(_open_gcm_segments, tasks)
+        total = sum(results)
+    except Exception:
+        if part_path and os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+    if part_path:
+        os.replace(part_path, dst_path)
+    return total
+
+def aes256_gcm_file_batch_decrypt(
+    source_enc_dir=r"E:\encryted",
+    decrypt_output_dir=r"E:\decrypted",
+    password="secp256k1",
+    enc_suffix=".enc",
+    verify_only=False,                # True：只校验完整性，不写明文（替代单独的哈希比对）
+    parallel_workers=os.cpu_count(),  # 并行校验进程数，1 为单核顺序处理
+    segments_per_task=4               # 每个并行任务处理的段数
+):
+    total_count = 0
+    success_count = 0
+    failed_files = []
+
+    if not verify_only:
+        os.makedirs(decrypt_output_dir, exist_ok=True)
+
+    if not os.listdir(source_enc_dir):
+        print(f"❌ 加密文件目录 {source_enc_dir} 为空")
+        return False
+
+    print("=" * 90)
+    print(f"📌 AES-256-GCM 批量{'校验' if verify_only else '解密'}配置")
+    print(f"   加密文件目录：{os.path.abspath(source_enc_dir)}")
+    if not verify_only:
+        print(f"   解密输出目录：{os.path.abspath(decrypt_output_dir)}")
+    print(f"   加密文件后缀：{enc_suffix} | 并行进程：{parallel_workers} | 每任务段数：{segments_per_task}")
+    print("   解密模式：AES-256-GCM（逐段认证） | 密钥派生：按文件头（同一批文件只派生一次）")
+    print("=" * 90 + "\n")
+
+    def format_size(bytes_size):
+        units = ['B', 'KB', 'MB', 'GB']
+        unit_idx = 0
+        while bytes_size >= 1024 and unit_idx < len(units)-1:
+            bytes_size /= 1024
+            unit_idx += 1
+        return f"{bytes_size:.2f} {units[unit_idx]}"
+
+    # 派生密钥缓存：键为 (KDF, 参数, 盐)，同一批加密的文件共用一个密钥
+    key_cache = {}
+    executor = ProcessPoolExecutor(max_workers=parallel_workers) if parallel_workers and parallel_workers > 1 else None
+
+    try:
+        for root, dirs, files in os.walk(source_enc_dir):
+            for file_name in files:
+                if not file_name.endswith(enc_suffix):
+                    continue
+
+                total_count += 1
+                enc_file_abs_path = os.path.join(root, file_name)
+                decrypted_file_name = file_name[:-len(enc_suffix)]
+                output_file_path = None
+                if not verify_only:
+                    rel_dir = os.path.relpath(root, source_enc_dir)
+                    output_subdir = os.path.join(decrypt_output_dir, rel_dir)
+                    os.makedirs(output_subdir, exist_ok=True)
+                    output_file_path = os.path.join(output_subdir, decrypted_file_name)
+
+                try:
+                    file_start_time = time.time()
+
+                    with open(enc_file_abs_path, 'rb') as f:
+                        header = read_header(f)
+                    if header is None:
+                        raise ValueError("缺少文件头，不是 GCM 分段格式")
+                    if header.mode != MODE_GCM:
+                        raise ValueError(f"加密模式不匹配：文件为 {MODE_NAMES[header.mode]}，本脚本只处理 AES-256-GCM")
+                    key = header_key(password, header, key_cache)
+
+                    plain_size = aes256_gcm_open_file(
+                        enc_file_abs_path, output_file_path, key, header, executor, segments_per_task
+                    )
+
+                    file_elapsed_time = time.time() - file_start_time
+                    file_avg_speed = plain_size / file_elapsed_time / 1024 / 1024
+                    file_size_str = format_size(plain_size)
+
+                    if verify_only:
+                        print(f"✅ 校验通过 | 文件名：{file_name} | 大小：{file_size_str} | 耗时：{file_elapsed_time:.2f}s | 平均速度：{file_avg_speed:.2f} MB/s")
+                    else:
+                        print(f"✅ 解密完成 | 文件名：{decrypted_file_name} | 大小：{file_size_str} | 耗时：{file_elapsed_time:.2f}s | 平均速度：{file_avg_speed:.2f} MB/s | 保存至：{output_file_path}")
+                    success_count += 1
+
+                except Exception as e:
+                    error_msg = str(e)
+                    print(f"❌ {'校验' if verify_only else '解密'}失败 | 文件名：{file_name} | 错误信息：{error_msg}")
+                    failed_files.append((file_name, error_msg))
+                    continue
+
+    except KeyboardInterrupt:
+        print("\n\n⚠️  检测到强制退出，任务已中断")
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    print("\n" + "=" * 90)
+    print(f"🎉 AES-256-GCM 批量{'校验' if verify_only else '解密'}任务结束！ | 总加密文件数：{total_count} | 成功数：{success_count} | 失败数：{len(failed_files)}")
+    if not verify_only:
+        print(f"💡 解密文件存放位置：{os.path.abspath(decrypt_output_dir)}")
+    if failed_files:
+        print("\n❌ 失败文件列表：")
+        for idx, (name, err) in enumerate(failed_files, 1):
+            print(f"   {idx}. {name} | 错误：{err}")
+    print("=" * 90)
+    return success_count > 0 and not failed_files
+
+if __name__ == "__main__":
+    aes256_gcm_file_batch_decrypt()
+
+    # 仅校验（不写明文，替代解密后再跑 hash_comparer 的整遍哈希比对）
+    # aes256_gcm_file_batch_decrypt(r"E:\encryted", verify_only=True)
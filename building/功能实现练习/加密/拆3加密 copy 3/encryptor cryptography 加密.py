@@ -4,17 +4,28 @@ from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import padding
 import base64
+from enc_container import MODE_CBC, MODE_NAMES, KDF_SCRYPT, KDF_NAMES, build_header, read_header, new_batch_key, header_key
+from enc_index import EncryptionProfile, load_index, check_source, record_source, prune_missing_sources, save_index
+from hash_manifest import is_manifest_file
+from zero_copy_io import encrypt_stream_zero_copy
 
 def aes256_file_encrypt(
     source_dir=r"E:\temp",
     encrypt_output_dir=r"E:\encryted",
-    password="secp256k1",  # 密码会被 SHA-256 处理为 32 字节密钥
+    password="secp256k1",  # 密码经 KDF 派生为 32 字节密钥（整批只派生一次）
     chunk_size=1024 * 1024 * 4,  # 4MB 分块，平衡速度和内存
-    output_suffix=".enc"  # 加密文件后缀
+    output_suffix=".enc",  # 加密文件后缀
+    zero_copy=True,  # 零拷贝 I/O（mmap + update_into 预分配缓冲），False 为逐块 read/update 循环
+    kdf=KDF_SCRYPT,  # 密钥派生：KDF_SCRYPT / KDF_PBKDF2
+    kdf_params=None,  # KDF 成本参数，None 为默认（scrypt: (log2N, r, p)；PBKDF2: (迭代次数, 0, 0)）
+    incremental=True,  # 增量加密：按输出目录下的索引跳过未变化的源文件
+    hash_check=False,  # 索引同时记录内容哈希；mtime 变了但内容没变（touch/复制）也跳过
+    delete_orphans=False  # 删除源文件已不存在的加密输出
 ):
     total_count = 0
     success_count = 0
     failed_files = []
+    skipped_count = 0
 
     # 创建目录
     for dir_path in [source_dir, encrypt_output_dir]:
@@ -29,8 +40,8 @@ def aes256_file_encrypt(
     print(f"📌 AES-256 加密配置（无压缩，直接加密文件）")
     print(f"   源目录：{os.path.abspath(source_dir)}")
     print(f"   输出目录：{os.path.abspath(encrypt_output_dir)}")
-    print(f"   分块大小：{chunk_size // 1024 // 1024}MB | 输出后缀：{output_suffix}")
-    print("   加密模式：AES-256-CBC | 密钥来源：密码 SHA-256 哈希")
+    print(f"   分块大小：{chunk_size // 1024 // 1024}MB | 输出后缀：{output_suffix} | 零拷贝 I/O：{'开' if zero_copy else '关'}")
+    print(f"   加密模式：AES-256-CBC | 密钥派生：{KDF_NAMES[kdf]}（本批随机盐，写入文件头）")
     print("=" * 90 + "\n")
 
     # 格式化文件大小
@@ -42,43 +53,48 @@ def aes256_file_encrypt(
             unit_idx += 1
         return f"{bytes_size:.2f} {units[unit_idx]}"
 
-    # 生成 AES-256 密钥和 IV
-    def generate_key_iv(password_str):
-        # 密码 SHA-256 哈希 → 32 字节密钥（AES-256 要求密钥长度 32B）
-        from cryptography.hazmat.primitives import hashes
-        digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
-        digest.update(password_str.encode('utf-8'))
-        key = digest.finalize()  # 32 字节密钥
-        iv = os.urandom(16)  # 16 字节随机 IV（CBC 模式必须）
-        return key, iv
+    # 派生 AES-256 密钥：整批共用一个随机盐，只派生一次（KDF 故意很慢，不能每个文件算一遍）
+    key, kdf_params, salt = new_batch_key(password, kdf, kdf_params)
+
+    # 增量索引：源相对路径 → 上次加密时的指纹和输出文件
+    index = load_index(encrypt_output_dir) if incremental else {}
+    # 索引记录带上模式、KDF 和密钥校验值：换模式、KDF 或密码后不会误跳过
+    profile = EncryptionProfile(MODE_CBC, password, kdf, kdf_params, salt, key)
+    seen_sources = set()
+    orphans = []
 
     try:
         for root, dirs, files in os.walk(source_dir):
             for file_name in files:
+                if is_manifest_file(file_name):
+                    continue  # 源目录下旧版的哈希清单不加密
                 total_count += 1
                 file_abs_path = os.path.join(root, file_name)
                 rel_dir = os.path.relpath(root, source_dir)
                 encrypt_subdir = os.path.join(encrypt_output_dir, rel_dir)
                 os.makedirs(encrypt_subdir, exist_ok=True)
-                # 加密后文件名：原文件名 + .enc
+                # 加密后文件名：原文件名 + .enc（IV 写在文件头里，不再生成 .iv 文件）
                 output_enc_path = os.path.join(encrypt_subdir, file_name + output_suffix)
-                # IV 存储路径：加密文件同目录 + .iv（解密时必须）
-                iv_path = output_enc_path + ".iv"
 
                 file_total_size = os.path.getsize(file_abs_path)
                 if file_total_size == 0:
                     print(f"⚠️  跳过空文件 | 文件名：{file_name}")
                     continue
 
+                rel_source = os.path.relpath(file_abs_path, source_dir)
+                seen_sources.add(rel_source)
+                if incremental:
+                    unchanged, fingerprint = check_source(index, encrypt_output_dir, rel_source, file_abs_path, profile, hash_check)
+                    if unchanged:
+                        skipped_count += 1
+                        continue
+
                 try:
                     # 记录单个文件加密开始时间
                     file_start_time = time.time()
 
-                    # 生成密钥和 IV
-                    key, iv = generate_key_iv(password)
-                    # 保存 IV 到文件（解密时需要读取此文件）
-                    with open(iv_path, 'wb') as iv_f:
-                        iv_f.write(iv)
+                    # 每个文件独立的 16 字节随机 IV（CBC 模式必须）
+                    iv = os.urandom(16)
 
                     # 初始化 AES-256 CBC 加密器
                     cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
@@ -88,17 +104,22 @@ def aes256_file_encrypt(
 
                     # 分块读取源文件 → 加密 → 写入目标文件
                     with open(file_abs_path, 'rb') as f_in, open(output_enc_path, 'wb') as f_out:
-                        while True:
-                            chunk = f_in.read(chunk_size)
-                            if not chunk:
-                                break
-                            # 填充 + 加密
-                            padded_chunk = padder.update(chunk)
-                            encrypted_chunk = encryptor.update(padded_chunk)
-                            f_out.write(encrypted_chunk)
-                        # 处理最后一块的填充和加密
-                        f_out.write(encryptor.update(padder.finalize()))
-                        f_out.write(encryptor.finalize())
+                        # 先写文件头（魔数、版本、模式、IV、分块大小），解密时同一次打开即可读取
+                        f_out.write(build_header(MODE_CBC, iv, chunk_size, kdf, kdf_params, salt))
+                        if zero_copy:
+                            encrypt_stream_zero_copy(f_in, f_out, encryptor, chunk_size, padder)
+                        else:
+                            while True:
+                                chunk = f_in.read(chunk_size)
+                                if not chunk:
+                                    break
+                                # 填充 + 加密
+                                padded_chunk = padder.update(chunk)
+                                encrypted_chunk = encryptor.update(padded_chunk)
+                                f_out.write(encrypted_chunk)
+                            # 处理最后一块的填充和加密
+                            f_out.write(encryptor.update(padder.finalize()))
+                            f_out.write(encryptor.finalize())
 
                     # 计算耗时和平均速度
                     file_elapsed_time = time.time() - file_start_time
@@ -108,69 +129,88 @@ def aes256_file_encrypt(
                     # 即时输出单文件统计
                     print(f"✅ 加密完成 | 文件名：{file_name} | 大小：{file_size_str} | 耗时：{file_elapsed_time:.2f}s | 平均速度：{file_avg_speed:.2f} MB/s | 保存至：{output_enc_path}")
                     success_count += 1
+                    if incremental:
+                        record_source(index, encrypt_output_dir, rel_source, file_abs_path, fingerprint, output_enc_path, profile, hash_check)
 
                 except Exception as e:
                     print(f"❌ 加密失败 | 文件名：{file_name} | 错误信息：{str(e)}")
                     failed_files.append((file_name, str(e)))
                     continue
 
+        # 完整遍历后才能判断哪些源文件已被删除（中断时跳过）
+        if incremental:
+            orphans = prune_missing_sources(index, encrypt_output_dir, seen_sources, delete_orphans)
+
     except KeyboardInterrupt:
         print("\n\n⚠️  检测到强制退出，任务已中断")
 
     # 最终极简统计
+    if incremental:
+        save_index(index, encrypt_output_dir)
+
     print("\n" + "=" * 90)
     print(f"🎉 AES-256 加密任务结束！ | 总文件数：{total_count} | 成功数：{success_count} | 失败数：{len(failed_files)}")
-    print(f"💡 注意：解密时需要 密码 + 对应 .iv 文件 | 输出目录：{os.path.abspath(encrypt_output_dir)}")
+    if incremental:
+        print(f"♻️  增量加密：跳过未变化 {skipped_count} 个 | 源文件已删除的输出 {len(orphans)} 个{'（已删除）' if delete_orphans and orphans else ''}")
+        if not delete_orphans:
+            for orphan in orphans:
+                print(f"   - {orphan}")
+    print(f"💡 注意：解密时只需要密码（IV 已写入 .enc 文件头） | 输出目录：{os.path.abspath(encrypt_output_dir)}")
     print("=" * 90)
-    return success_count > 0
+    return success_count > 0 or skipped_count > 0
 
 # 配套解密函数（可选，用于验证加密结果）
 def aes256_file_decrypt(
     enc_file_path,
     password="secp256k1",
     output_path=None,
-    chunk_size=1024 * 1024 * 4
+    chunk_size=1024 * 1024 * 4,
+    key_cache=None
 ):
     """
-    解密 .enc 文件
+    解密 .enc 文件（优先读取文件头中的 IV，旧版文件回退到 .iv 旁路文件）
     :param enc_file_path: 加密文件路径
     :param password: 加密密码
     :param output_path: 解密后文件路径，默认同目录去掉 .enc 后缀
+    :param key_cache: 派生密钥缓存（dict），连续解密同一批文件时传入同一个 dict 可避免重复派生
     """
-    iv_path = enc_file_path + ".iv"
-    if not os.path.exists(iv_path):
-        raise FileNotFoundError(f"IV 文件不存在：{iv_path}")
-    
     if output_path is None:
         output_path = enc_file_path.replace(".enc", "")
 
-    # 读取 IV
-    with open(iv_path, 'rb') as iv_f:
-        iv = iv_f.read()
-    
-    # 生成密钥
-    from cryptography.hazmat.primitives import hashes
-    digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
-    digest.update(password.encode('utf-8'))
-    key = digest.finalize()
-
-    # 初始化解密器
-    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-    decryptor = cipher.decryptor()
-    unpadder = padding.PKCS7(128).unpadder()
-
-    # 分块解密
-    with open(enc_file_path, 'rb') as f_in, open(output_path, 'wb') as f_out:
-        while True:
-            chunk = f_in.read(chunk_size)
-            if not chunk:
-                break
-            decrypted_chunk = decryptor.update(chunk)
-            unpadded_chunk = unpadder.update(decrypted_chunk)
-            f_out.write(unpadded_chunk)
-        f_out.write(unpadder.finalize())
-        f_out.write(decryptor.finalize())
-    
+    with open(enc_file_path, 'rb') as f_in:
+        header = read_header(f_in)
+        if header:
+            # 先核对模式再打开输出文件：CTR/GCM 文件按 CBC 解密只会留下一个垃圾文件
+            if header.mode != MODE_CBC:
+                raise ValueError(f"加密模式不匹配：文件为 {MODE_NAMES[header.mode]}，本函数只解密 AES-256-CBC")
+            iv = header.nonce
+        else:
+            iv_path = enc_file_path + ".iv"
+            if not os.path.exists(iv_path):
+                raise FileNotFoundError(f"IV 文件不存在：{iv_path}")
+            with open(iv_path, 'rb') as iv_f:
+                iv = iv_f.read()
+
+        # 按文件头的 KDF 参数和盐派生密钥（旧版文件为密码 SHA-256）
+        key = header_key(password, header, key_cache if key_cache is not None else {})
+
+        # 初始化解密器
+        cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+        decryptor = cipher.decryptor()
+        unpadder = padding.PKCS7(128).unpadder()
+
+        # 分块解密（f_in 已位于密文起始处）
+        with open(output_path, 'wb') as f_out:
+            while True:
+                chunk = f_in.read(chunk_size)
+                if not chunk:
+                    break
+                decrypted_chunk = decryptor.update(chunk)
+                unpadded_chunk = unpadder.update(decrypted_chunk)
+                f_out.write(unpadded_chunk)
+            f_out.write(unpadder.finalize())
+            f_out.write(decryptor.finalize())
+
     print(f"✅ 解密完成：{output_path}")
 
 if __name__ == "__main__":
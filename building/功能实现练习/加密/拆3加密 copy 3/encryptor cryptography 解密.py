@@ -3,7 +3,7 @@ import time
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import padding
-from cryptography.hazmat.primitives import hashes
+from enc_container import MODE_CBC, MODE_NAMES, read_header, header_key
 
 def aes256_file_batch_decrypt(
     source_enc_dir=r"E:\encryted\无耻之徒S03.Shameless.US.2013.1080p.Blu-ray.x265.AC3￡cXcY@FRDS",    # 加密文件所在目录
@@ -29,7 +29,7 @@ def aes256_file_batch_decrypt(
     print(f"   加密文件目录：{os.path.abspath(source_enc_dir)}")
     print(f"   解密输出目录：{os.path.abspath(decrypt_output_dir)}")
     print(f"   分块大小：{chunk_size // 1024 // 1024}MB | 加密文件后缀：{enc_suffix}")
-    print(f"   解密模式：AES-256-CBC | 密钥来源：密码 SHA-256 哈希")
+    print(f"   解密模式：AES-256-CBC | 密钥派生：按文件头（同一批文件只派生一次）")
     print("=" * 90 + "\n")
 
     # 格式化文件大小
@@ -41,13 +41,8 @@ def aes256_file_batch_decrypt(
             unit_idx += 1
         return f"{bytes_size:.2f} {units[unit_idx]}"
 
-    # 生成 AES-256 密钥（与加密逻辑一致）
-    def generate_key(password_str):
-        digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
-        digest.update(password_str.encode('utf-8'))
-        return digest.finalize()  # 32 字节密钥
-
-    key = generate_key(password)
+    # 派生密钥缓存：键为 (KDF, 参数, 盐)，同一批加密的文件共用一个密钥
+    key_cache = {}
 
     try:
         # 递归遍历加密目录下的所有 .enc 文件
@@ -59,12 +54,8 @@ def aes256_file_batch_decrypt(
 
                 total_count += 1
                 enc_file_abs_path = os.path.join(root, file_name)
-                # 匹配对应的 .iv 文件（加密时生成的）
+                # 旧版文件的 IV 在配套 .iv 文件中；新版文件的 IV 在文件头里
                 iv_file_path = enc_file_abs_path + ".iv"
-                if not os.path.exists(iv_file_path):
-                    print(f"❌ 解密失败 | 文件名：{file_name} | 错误：缺少配套 IV 文件 {iv_file_path}")
-                    failed_files.append((file_name, "缺少IV文件"))
-                    continue
 
                 # 构建解密后文件路径（去掉 .enc 后缀，保持原目录结构）
                 rel_dir = os.path.relpath(root, source_enc_dir)
@@ -80,30 +71,40 @@ def aes256_file_batch_decrypt(
                     # 记录单个文件解密开始时间
                     file_start_time = time.time()
 
-                    # 读取 IV 向量
-                    with open(iv_file_path, 'rb') as iv_f:
-                        iv = iv_f.read()
-                    if len(iv) != 16:
-                        raise ValueError(f"IV 文件长度错误，必须为16字节")
-
-                    # 初始化 AES-256 CBC 解密器
-                    cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
-                    decryptor = cipher.decryptor()
-                    unpadder = padding.PKCS7(128).unpadder()  # 对应加密时的填充方式
-
-                    # 分块解密
-                    with open(enc_file_abs_path, 'rb') as f_in, open(output_file_path, 'wb') as f_out:
-                        while True:
-                            chunk = f_in.read(chunk_size)
-                            if not chunk:
-                                break
-                            # 解密 + 去填充
-                            decrypted_chunk = decryptor.update(chunk)
-                            unpadded_chunk = unpadder.update(decrypted_chunk)
-                            f_out.write(unpadded_chunk)
-                        # 处理最后一块的剩余数据
-                        f_out.write(unpadder.finalize())
-                        f_out.write(decryptor.finalize())
+                    with open(enc_file_abs_path, 'rb') as f_in:
+                        # 读取文件头中的 IV（与密文同一次打开）；旧版文件回退到 .iv 文件
+                        header = read_header(f_in)
+                        if header:
+                            if header.mode != MODE_CBC:
+                                raise ValueError(f"加密模式不匹配：文件为 {MODE_NAMES[header.mode]}，本脚本只解密 AES-256-CBC")
+                            iv = header.nonce
+                        elif os.path.exists(iv_file_path):
+                            with open(iv_file_path, 'rb') as iv_f:
+                                iv = iv_f.read()
+                        else:
+                            raise FileNotFoundError(f"缺少文件头且无配套 IV 文件 {iv_file_path}")
+                        if len(iv) != 16:
+                            raise ValueError(f"IV 文件长度错误，必须为16字节")
+                        key = header_key(password, header, key_cache)
+
+                        # 初始化 AES-256 CBC 解密器
+                        cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
+                        decryptor = cipher.decryptor()
+                        unpadder = padding.PKCS7(128).unpadder()  # 对应加密时的填充方式
+
+                        # 分块解密
+                        with open(output_file_path, 'wb') as f_out:
+                            while True:
+                                chunk = f_in.read(chunk_size)
+                                if not chunk:
+                                    break
+                                # 解密 + 去填充
+                                decrypted_chunk = decryptor.update(chunk)
+                                unpadded_chunk = unpadder.update(decrypted_chunk)
+                                f_out.write(unpadded_chunk)
+                            # 处理最后一块的剩余数据
+                            f_out.write(unpadder.finalize())
+                            f_out.write(decryptor.finalize())
 
                     # 计算解密耗时和速度
                     file_elapsed_time = time.time() - file_start_time
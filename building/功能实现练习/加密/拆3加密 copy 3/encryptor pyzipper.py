@@ -1,13 +1,37 @@
 import os
 import pyzipper
 import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+def _pyzipper_encrypt_one(args):
+    """
+    工作进程：把单个文件加密为独立的 .zip（STORE + WZ_AES），zf.write 流式写入，不把整个文件读进内存
+    :return: 文件大小；加密失败直接抛出异常
+    """
+    file_abs_path, output_zip_path, file_name, password = args
+    with pyzipper.AESZipFile(
+        output_zip_path,
+        'w',
+        compression=pyzipper.ZIP_STORED,
+        encryption=pyzipper.WZ_AES,
+        compresslevel=0
+    ) as zf:
+        zf.setpassword(password.encode('utf-8'))
+        zf.write(file_abs_path, arcname=file_name)
+    return os.path.getsize(file_abs_path)
 
 def pyzipper_recursive_single_file_encrypt(
     source_dir=r"E:\temp",
     encrypt_output_dir=r"E:\encryted",
     password="secp256k1",
-    chunk_size=1024 * 1024 * 2  # 2MB 块
+    chunk_size=1024 * 1024 * 2,  # 2MB 块
+    max_workers=os.cpu_count(),  # 并行加密进程数，1 为顺序加密（带进度条）
+    max_inflight_bytes=1024 * 1024 * 1024  # 并行时同时在加密中的文件总大小上限（避免磁盘来回寻道）
 ):
+    """
+    并行模式：每个文件一个任务交给进程池，同时在途的文件总大小不超过 max_inflight_bytes，
+    任务数不超过进程数的 2 倍；成功/失败统计在主进程汇总
+    """
     total_count = 0
     success_count = 0
     failed_files = []
@@ -25,6 +49,7 @@ def pyzipper_recursive_single_file_encrypt(
     print(f"   输出目录：{os.path.abspath(encrypt_output_dir)}")
     print(f"   压缩模式：STORE（仅打包不压缩）")
     print(f"   块大小：{chunk_size // 1024 // 1024}MB")
+    print(f"   并行进程：{max_workers} | 在途数据上限：{max_inflight_bytes // 1024 // 1024}MB")
     print("=" * 90 + "\n")
 
     def format_size(bytes_size):
@@ -35,6 +60,26 @@ def pyzipper_recursive_single_file_encrypt(
             unit_idx += 1
         return f"{bytes_size:.2f} {units[unit_idx]}"
 
+    executor = ProcessPoolExecutor(max_workers=max_workers) if max_workers and max_workers > 1 else None
+    pending = {}  # future -> (源文件路径, 输出路径, 文件大小, 提交时间)
+    inflight_bytes = 0
+
+    def collect(futures):
+        """汇总已完成（或等待完成）的任务，释放在途额度"""
+        nonlocal success_count, inflight_bytes
+        for future in futures:
+            file_abs_path, output_zip_path, file_total_size, submit_time = pending.pop(future)
+            inflight_bytes -= file_total_size
+            try:
+                future.result()
+                total_time = max(time.time() - submit_time, 0.001)
+                avg_speed = file_total_size / total_time / 1024 / 1024
+                print(f"✅ 加密完成 | 耗时：{total_time:.2f}s | 平均速度：{avg_speed:.2f} MB/s | 保存至：{output_zip_path}")
+                success_count += 1
+            except Exception as e:
+                print(f"❌ 加密失败 | {file_abs_path} → 错误：{str(e)}")
+                failed_files.append((file_abs_path, str(e)))
+
     try:
         for root, dirs, files in os.walk(source_dir):
             for file_name in files:
@@ -50,6 +95,16 @@ def pyzipper_recursive_single_file_encrypt(
                     print(f"⚠️  跳过空文件：{file_abs_path}")
                     continue
 
+                if executor is not None:
+                    # 并行：在途数据或任务数超限时，先等已提交的任务完成（至少保留一个在途任务）
+                    while pending and (inflight_bytes + file_total_size > max_inflight_bytes or len(pending) >= max_workers * 2):
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    future = executor.submit(_pyzipper_encrypt_one, (file_abs_path, output_zip_path, file_name, password))
+                    pending[future] = (file_abs_path, output_zip_path, file_total_size, time.time())
+                    inflight_bytes += file_total_size
+                    continue
+
                 processed_size = 0
                 start_time = time.time()
                 progress_bar_length = 40
@@ -98,8 +153,13 @@ def pyzipper_recursive_single_file_encrypt(
                     failed_files.append((file_abs_path, str(e)))
                     continue
 
+        # 等待剩余任务
+        collect(list(pending))
     except KeyboardInterrupt:
         print("\n\n⚠️  检测到强制退出，任务已中断")
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
 
     print("\n" + "=" * 90)
     print(f"🎉 加密任务结束！")
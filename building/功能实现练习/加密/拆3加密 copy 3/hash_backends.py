@@ -0,0 +1,137 @@
+"""
+哈希算法注册表：calculate_file_hash 的 algorithm 参数除了 hashlib 自带的算法（sha256、md5、blake2b ...），还可以选：
+  sha256-tree —— 多核树哈希（标准库实现）：文件按 4MB 切成叶子，多个线程同时算叶子的 SHA-256，
+                 根哈希 = SHA-256(叶子大小 + 总长度 + 各叶子哈希)；结果不等于普通 SHA-256，只能和同算法的结果比
+  blake3      —— BLAKE3（需 pip install blake3），多线程树哈希，单个大文件也能用满多核
+  xxh3_64 / xxh3_128 / xxh64 —— xxHash（需 pip install xxhash），非加密哈希，只用于检测变化/比对，不能防篡改
+没安装对应库时选择该算法会报错并提示安装命令；吞吐量对比见 hash_benchmark.py
+
+新增算法：register_hasher(名称, 工厂函数, 说明)，工厂函数返回带 update / hexdigest 方法的对象
+"""
+
+import os
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import blake3  # 可选：pip install blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash  # 可选：pip install xxhash
+except ImportError:
+    xxhash = None
+
+_REGISTRY = {}
+
+def register_hasher(name, factory, description="", requires=None):
+    """
+    注册哈希算法
+    :param factory: 无参函数，返回新的哈希对象（update / hexdigest）
+    :param requires: 依赖的第三方包名，未安装时为提示用（factory 传 None）
+    """
+    _REGISTRY[name] = (factory, description, requires)
+
+def new_hasher(algorithm):
+    """按名称创建哈希对象：先查注册表，再交给 hashlib.new；未知或未安装时抛 ValueError"""
+    if algorithm in _REGISTRY:
+        factory, _, requires = _REGISTRY[algorithm]
+        if factory is None:
+            raise ValueError(f"哈希算法 {algorithm} 需要先安装：pip install {requires}")
+        return factory()
+    try:
+        return hashlib.new(algorithm)
+    except ValueError:
+        raise ValueError(f"未知的哈希算法：{algorithm}（可选：{', '.join(available_hashers())}）") from None
+
+def available_hashers():
+    """当前环境可用的算法名（注册表中已安装的 + 常用 hashlib 算法）"""
+    names = [name for name, (factory, _, _) in _REGISTRY.items() if factory is not None]
+    return names + [name for name in ("sha256", "sha1", "md5", "blake2b", "sha512") if name in hashlib.algorithms_available]
+
+def registered_hashers():
+    """注册表中的全部算法名（含未安装的第三方后端）"""
+    return list(_REGISTRY)
+
+def describe_hasher(algorithm):
+    if algorithm in _REGISTRY:
+        return _REGISTRY[algorithm][1]
+    return f"hashlib.{algorithm}（单线程）"
+
+# ========== 多核树哈希（标准库） ==========
+_tree_pool = None
+_tree_pool_lock = threading.Lock()
+
+def _get_tree_pool():
+    """所有树哈希对象共用一个线程池（hashlib 处理大块数据时释放 GIL，线程即可并行）"""
+    global _tree_pool
+    with _tree_pool_lock:
+        if _tree_pool is None:
+            _tree_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+        return _tree_pool
+
+def _leaf_digest(name, data):
+    return hashlib.new(name, data).digest()
+
+class TreeHasher:
+    """
+    叶子并行的树哈希：update 把数据攒成固定大小的叶子，攒满一片就交给线程池计算
+    同时在算的叶子数有上限，内存占用约为 (线程数 × 2) × 叶子大小
+    """
+
+    def __init__(self, name="sha256", leaf_size=1024 * 1024 * 4):
+        self.name = name
+        self.leaf_size = leaf_size
+        self._pool = _get_tree_pool()
+        self._max_pending = (os.cpu_count() or 1) * 2
+        self._leaf = bytearray()
+        self._pending = []   # 按顺序排列的叶子 future
+        self._digests = []   # 已完成的叶子哈希（按顺序）
+        self._length = 0
+
+    def _submit_leaf(self, data):
+        self._pending.append(self._pool.submit(_leaf_digest, self.name, data))
+        while len(self._pending) > self._max_pending:
+            self._digests.append(self._pending.pop(0).result())
+
+    def update(self, data):
+        view = memoryview(data).cast('B')
+        self._length += len(view)
+        while view:
+            take = min(self.leaf_size - len(self._leaf), len(view))
+            if not self._leaf and take == self.leaf_size:
+                self._submit_leaf(bytes(view[:take]))  # 整片直接提交（调用方会复用缓冲，必须复制）
+            else:
+                self._leaf += view[:take]
+                if len(self._leaf) == self.leaf_size:
+                    self._submit_leaf(bytes(self._leaf))
+                    self._leaf = bytearray()
+            view = view[take:]
+
+    def hexdigest(self):
+        if self._leaf or not (self._pending or self._digests):
+            self._submit_leaf(bytes(self._leaf))
+            self._leaf = bytearray()
+        self._digests.extend(future.result() for future in self._pending)
+        self._pending = []
+        root = hashlib.new(self.name)
+        root.update(self.leaf_size.to_bytes(8, 'big') + self._length.to_bytes(8, 'big'))
+        for digest in self._digests:
+            root.update(digest)
+        return root.hexdigest()
+
+register_hasher("sha256-tree", lambda: TreeHasher("sha256"), "SHA-256 树哈希（4MB 叶子，多线程，结果不同于普通 SHA-256）")
+
+# ========== 可选第三方后端 ==========
+if blake3 is not None:
+    register_hasher("blake3", lambda: blake3.blake3(max_threads=blake3.blake3.AUTO), "BLAKE3（多线程树哈希）")
+else:
+    register_hasher("blake3", None, "BLAKE3（未安装）", requires="blake3")
+
+for _name in ("xxh3_64", "xxh3_128", "xxh64"):
+    if xxhash is not None:
+        register_hasher(_name, getattr(xxhash, _name), f"xxHash {_name}（非加密，仅检测变化）")
+    else:
+        register_hasher(_name, None, f"xxHash {_name}（未安装）", requires="xxhash")
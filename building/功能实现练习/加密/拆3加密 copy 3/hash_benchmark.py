@@ -0,0 +1,77 @@
+import os
+import time
+import tempfile
+from hash_backends import new_hasher, describe_hasher, available_hashers, registered_hashers
+
+def hash_file_once(path, algorithm, chunk_size):
+    """与 calculate_file_hash 相同的读取方式：无缓冲 + readinto 复用缓冲"""
+    hash_obj = new_hasher(algorithm)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while n := f.readinto(buffer):
+            hash_obj.update(view[:n])
+    return hash_obj.hexdigest()
+
+def hash_memory_once(data, algorithm, chunk_size):
+    """纯计算吞吐量（数据已在内存，排除磁盘影响）"""
+    hash_obj = new_hasher(algorithm)
+    view = memoryview(data)
+    for pos in range(0, len(view), chunk_size):
+        hash_obj.update(view[pos:pos + chunk_size])
+    return hash_obj.hexdigest()
+
+def best_of(func, repeat):
+    best_time = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return best_time
+
+def run_benchmark(file_size_mb=512, chunk_size=1024 * 1024 * 4, repeat=3, work_dir=None, algorithms=None):
+    """
+    对比各哈希后端的吞吐量：
+      内存 —— 数据已在内存中，只测计算速度（算法本身的上限）
+      文件 —— 按 calculate_file_hash 的方式读文件（测试文件刚写入，通常在页缓存中；
+              想测真实磁盘请用大于内存的文件，或把 work_dir 指向目标磁盘并先清缓存）
+    :param algorithms: 要测的算法列表，默认全部已注册算法 + 常用 hashlib 算法（未安装的会列出并跳过）
+    """
+    algorithms = algorithms or ["md5", "sha1", "sha256", "blake2b"] + registered_hashers()
+    installed = set(available_hashers())
+    data = os.urandom(1024 * 1024) * file_size_mb
+
+    with tempfile.TemporaryDirectory(dir=work_dir) as temp_dir:
+        path = os.path.join(temp_dir, "hash_bench.bin")
+        with open(path, 'wb') as f:
+            f.write(data)
+
+        print("\n" + "=" * 90)
+        print(f"📊 哈希后端吞吐量测试（{file_size_mb}MB，分块 {chunk_size // 1024 // 1024}MB，取 {repeat} 次最优，CPU 核数 {os.cpu_count()}）")
+        print("=" * 90)
+        results = {}
+        for algorithm in algorithms:
+            if algorithm not in installed:
+                print(f"{algorithm:<12} 跳过 —— {describe_hasher(algorithm)}")
+                continue
+            memory_time = best_of(lambda: hash_memory_once(data, algorithm, chunk_size), repeat)
+            file_time = best_of(lambda: hash_file_once(path, algorithm, chunk_size), repeat)
+            # 同一数据两种方式结果必须一致（分块方式不影响哈希值）
+            assert hash_memory_once(data, algorithm, chunk_size) == hash_file_once(path, algorithm, chunk_size), f"{algorithm} 结果不一致"
+            memory_speed = file_size_mb / memory_time
+            file_speed = file_size_mb / file_time
+            results[algorithm] = (memory_speed, file_speed)
+            print(f"{algorithm:<12} 内存 {memory_speed:>9.1f} MB/s | 文件 {file_speed:>9.1f} MB/s | {describe_hasher(algorithm)}")
+        print("=" * 90)
+        return results
+
+if __name__ == "__main__":
+    # -------------------------- 配置区 --------------------------
+    FILE_SIZE_MB = 512             # 测试数据大小（MB）
+    CHUNK_SIZE = 1024 * 1024 * 4   # 与 calculate_file_hash 一致的 4MB 分块
+    REPEAT = 3                     # 每种算法重复次数
+    WORK_DIR = None                # 测试文件目录，None 为系统临时目录
+    ALGORITHMS = None              # None 为全部，或指定如 ["sha256", "sha256-tree", "blake3", "xxh3_64"]
+    # -----------------------------------------------------------
+
+    run_benchmark(FILE_SIZE_MB, CHUNK_SIZE, REPEAT, WORK_DIR, ALGORITHMS)
@@ -1,28 +1,82 @@
 import os
-import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from hash_backends import new_hasher, describe_hasher
+from hash_manifest import HashManifest, manifest_exists, is_manifest_file, diff_manifests
 
-def calculate_file_hash(file_path, algorithm="sha256"):
-    """计算文件哈希值"""
+READ_ALIGN = 4096  # 读缓冲按页/扇区大小对齐
+
+def calculate_file_hash(file_path, algorithm="sha256", chunk_size=1024 * 1024 * 4):
+    """
+    计算文件哈希值
+    无缓冲打开 + 复用一块对齐的大缓冲（readinto），不经过 Python 的 8KB 缓冲层，也不为每块新建 bytes
+    :param algorithm: hashlib 算法名，或 hash_backends 注册的 sha256-tree / blake3 / xxh3_64 等
+    """
     try:
-        hash_obj = hashlib.new(algorithm)
-        with open(file_path, "rb") as f:
-            while chunk := f.read(4096):
-                hash_obj.update(chunk)
+        hash_obj = new_hasher(algorithm)
+        chunk_size = max(READ_ALIGN, chunk_size - chunk_size % READ_ALIGN)
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        with open(file_path, "rb", buffering=0) as f:
+            while n := f.readinto(buffer):
+                hash_obj.update(view[:n])
         return hash_obj.hexdigest()
     except Exception as e:
         print(f"❌ 计算哈希失败 | {file_path} → 错误原因：{str(e)}")
         return None
 
+def calculate_sample_hash(file_path, algorithm="sha256", sample_size=1024 * 64):
+    """
+    抽样哈希：只读文件开头、中间、结尾各 sample_size 字节（连同文件大小一起哈希）
+    用于快速排除不一致的大文件；抽样一致不代表文件一致，还要再做全量哈希
+    """
+    try:
+        hash_obj = new_hasher(algorithm)
+        with open(file_path, "rb", buffering=0) as f:
+            file_size = os.fstat(f.fileno()).st_size
+            hash_obj.update(file_size.to_bytes(8, 'big'))
+            middle = (file_size - sample_size) // 2
+            for offset in (0, middle - middle % READ_ALIGN, file_size - sample_size):
+                f.seek(offset)
+                hash_obj.update(f.read(sample_size))
+        return hash_obj.hexdigest()
+    except Exception as e:
+        print(f"❌ 计算抽样哈希失败 | {file_path} → 错误原因：{str(e)}")
+        return None
+
 def compare_two_dirs_hash(
     dir1,
     dir2,
-    algorithm="sha256"
+    algorithm="sha256",
+    workers_per_device=2,         # 两个目录在不同磁盘时每块磁盘的读取线程数（机械盘 1~2，SSD 可调大）；同一磁盘固定 1 个
+    chunk_size=1024 * 1024 * 4,   # 读缓冲大小（按 4KB 对齐）
+    quick_check=True,             # 全量哈希前先做抽样哈希（开头/中间/结尾），抽样不同直接判不匹配
+    sample_size=1024 * 64,        # 每处抽样字节数；不超过 3 倍抽样大小的小文件直接全量哈希
+    use_manifest=True             # 哈希清单：两个目录各一份（存在用户缓存目录，不写进被对比的目录），未变化的文件直接用上次的哈希
 ):
-    """对比两个目录（结构一致）下所有文件的哈希值"""
+    """
+    对比两个目录（结构一致）下所有文件的哈希值
+    两个目录在不同磁盘上时各用一个线程池，两边同时读取、同时计算（hashlib 计算时释放 GIL）；
+    同一块磁盘则只用一个读取线程，两边文件依次读取，避免多路并发读把机械盘拖成随机读
+    按文件大小从大到小提交，大文件先开始，最后不会剩一个大文件单独拖尾
+
+    分级对比，能提前判定的不读全文件：
+      1. 大小（os.stat）：不同即不匹配，不读任何内容
+      2. 抽样哈希（quick_check）：开头/中间/结尾抽样不同即不匹配
+      3. 全量哈希：前两级都一致的文件才计算（开启清单时，大小/mtime/inode 未变的文件直接取缓存）
+    开启清单时 dir1 的每个文件都会记入清单：前两级判定的、dir2 缺失的、哈希失败的只记大小，
+    之后 compare_two_manifests 会把它们报为不匹配/缺失/未校验，不会误报全部一致
+    """
     total_count = 0
     match_count = 0
     mismatch_files = []
     missing_files = []
+    size_mismatch_count = 0    # 第 1 级判定不匹配
+    sample_mismatch_count = 0  # 第 2 级判定不匹配
+    sampled_count = 0          # 做过抽样哈希的文件对
+    full_hash_count = 0        # 做过全量哈希的文件对
+    full_mismatch_count = 0    # 第 3 级判定不匹配（含哈希计算失败）
+    cached_count = 0           # 全量哈希中直接取自清单的文件数（两边分别计）
 
     # 检查目录是否存在
     for d in [dir1, dir2]:
@@ -30,16 +84,45 @@ def compare_two_dirs_hash(
             print(f"❌ [错误] 目录 {d} 不存在")
             return False
 
+    # 检查算法是否可用（第三方后端可能未安装），避免每个文件都报一次错
+    try:
+        new_hasher(algorithm)
+    except ValueError as e:
+        print(f"❌ [错误] {e}")
+        return False
+
     # 配置提示
     print("=" * 70)
     print(f"📌 目录哈希对比配置")
     print(f"   对比目录1：{os.path.abspath(dir1)}")
     print(f"   对比目录2：{os.path.abspath(dir2)}")
-    print(f"   哈希算法：{algorithm}")
+    print(f"   哈希算法：{algorithm} —— {describe_hasher(algorithm)}")
+
+    # 按目录根所在设备分配线程池
+    same_device = os.stat(dir1).st_dev == os.stat(dir2).st_dev
+    pool_workers = 1 if same_device else workers_per_device
+    print(f"   读取线程：{'同一磁盘，共' if same_device else '两块磁盘，各'} {pool_workers} 个 | 读缓冲：{chunk_size // 1024}KB")
+    print(f"   哈希清单：{'✅ 开启（未变化的文件不重新计算）' if use_manifest else '❌ 关闭'}")
     print("=" * 70 + "\n")
+    start_time = time.time()
+
+    manifest1 = HashManifest(dir1) if use_manifest else None
+    manifest2 = HashManifest(dir2) if use_manifest else None
+
+    def full_hash(manifest, file_path):
+        """全量哈希；开启清单时先查缓存，返回 (哈希值, 是否来自缓存)"""
+        if manifest is None:
+            return calculate_file_hash(file_path, algorithm, chunk_size), False
+        return manifest.get_hash(file_path, algorithm, lambda path, algo: calculate_file_hash(path, algo, chunk_size))
+
+    def both_cached(pair):
+        return use_manifest and manifest1.lookup(pair[2], algorithm) and manifest2.lookup(pair[3], algorithm)
 
-    # 递归对比
+    # 先遍历收集待对比的文件对（缺失的直接记录），再统一调度
+    pairs = []
+    seen_relpaths = set()
     for root, dirs, files in os.walk(dir1):
+        files = [f for f in files if not is_manifest_file(f)]
         rel_dir = os.path.relpath(root, dir1)
         dir2_subdir = os.path.join(dir2, rel_dir)
 
@@ -47,24 +130,90 @@ def compare_two_dirs_hash(
         if not os.path.exists(dir2_subdir):
             print(f"⚠️  目录缺失 | dir2中无对应目录：{dir2_subdir}")
             missing_files.extend([os.path.join(root, f) for f in files])
+            if use_manifest:
+                for file_name in files:
+                    file1_path = os.path.join(root, file_name)
+                    seen_relpaths.add(manifest1.relpath(file1_path))
+                    manifest1.record_size(file1_path, algorithm)
+                    manifest2.forget(os.path.join(dir2_subdir, file_name))  # dir2 清单里的旧记录作废
             continue
 
         for file_name in files:
             total_count += 1
             file1_path = os.path.join(root, file_name)
             file2_path = os.path.join(dir2_subdir, file_name)
+            stat1 = os.stat(file1_path)
+            if use_manifest:
+                # 先记下当前大小（缓存的哈希仍有效则保留），后面全量哈希算出后再补上哈希值
+                seen_relpaths.add(manifest1.relpath(file1_path))
+                manifest1.record_size(file1_path, algorithm, stat1)
 
             # 检查dir2中对应文件是否存在
             if not os.path.exists(file2_path):
                 print(f"❌ 文件缺失 | dir2中无对应文件：{file2_path}")
                 missing_files.append(file1_path)
+                if use_manifest:
+                    manifest2.forget(file2_path)  # dir2 清单里的旧记录作废，清单对比时报为缺失
                 continue
 
-            # 计算哈希并对比
-            hash1 = calculate_file_hash(file1_path, algorithm)
-            hash2 = calculate_file_hash(file2_path, algorithm)
+            # 第 1 级：大小不同，不用读内容
+            stat2 = os.stat(file2_path)
+            if use_manifest:
+                manifest2.record_size(file2_path, algorithm, stat2)
+            size1 = stat1.st_size
+            size2 = stat2.st_size
+            if size1 != size2:
+                print(f"❌ 大小不同 | {file1_path}({size1} 字节) vs {file2_path}({size2} 字节)")
+                mismatch_files.append((file1_path, file2_path))
+                size_mismatch_count += 1
+                continue
+
+            pairs.append((size1, file_name, file1_path, file2_path))
+
+    # 大文件优先
+    pairs.sort(key=lambda pair: pair[0], reverse=True)
+
+    pool1 = ThreadPoolExecutor(max_workers=pool_workers)
+    pool2 = pool1 if same_device else ThreadPoolExecutor(max_workers=pool_workers)
+    try:
+        # 第 2 级：大文件先抽样对比，抽样不同的不再全量哈希（两边都有有效缓存的不必抽样）
+        if quick_check:
+            sample_jobs = [
+                (pair,
+                 pool1.submit(calculate_sample_hash, pair[2], algorithm, sample_size),
+                 pool2.submit(calculate_sample_hash, pair[3], algorithm, sample_size))
+                for pair in pairs if pair[0] > sample_size * 3 and not both_cached(pair)
+            ]
+            sample_failed = set()
+            for (_, _, file1_path, file2_path), future1, future2 in sample_jobs:
+                sample1 = future1.result()
+                sample2 = future2.result()
+                sampled_count += 1
+                if sample1 and sample2 and sample1 != sample2:
+                    print(f"❌ 抽样不同 | {file1_path} vs {file2_path}")
+                    mismatch_files.append((file1_path, file2_path))
+                    sample_mismatch_count += 1
+                    sample_failed.add(file1_path)
+            pairs = [pair for pair in pairs if pair[2] not in sample_failed]
+
+        # 第 3 级：全量哈希，两边的哈希任务分别提交到各自磁盘的线程池
+        # 各级计数都在取到结果时累加：中途 Ctrl+C 时统计只含已完成的文件对
+        jobs = [
+            (file_name, file1_path, file2_path,
+             pool1.submit(full_hash, manifest1, file1_path),
+             pool2.submit(full_hash, manifest2, file2_path))
+            for _, file_name, file1_path, file2_path in pairs
+        ]
+
+        # 按提交顺序取结果并对比
+        for file_name, file1_path, file2_path, future1, future2 in jobs:
+            hash1, cached1 = future1.result()
+            hash2, cached2 = future2.result()
+            full_hash_count += 1
+            cached_count += cached1 + cached2
             if not hash1 or not hash2:
                 mismatch_files.append((file1_path, file2_path))
+                full_mismatch_count += 1
                 continue
 
             if hash1 == hash2:
@@ -73,11 +222,26 @@ def compare_two_dirs_hash(
             else:
                 print(f"❌ 哈希不匹配 | {file1_path}({hash1}) vs {file2_path}({hash2})")
                 mismatch_files.append((file1_path, file2_path))
+                full_mismatch_count += 1
+    except KeyboardInterrupt:
+        print("\n⚠️  检测到强制退出，对比已中断")
+    finally:
+        for pool in {pool1, pool2}:
+            pool.shutdown(wait=False, cancel_futures=True)
+        if use_manifest:
+            manifest1.prune(seen_relpaths)  # dir1 已完整遍历，可以清掉已删除文件的记录
+            manifest1.close()
+            manifest2.close()
 
     # 执行结果
     print("=" * 70)
-    print(f"🎉 目录哈希对比完成！")
+    print(f"🎉 目录哈希对比完成！ | 耗时：{time.time() - start_time:.2f}s")
     print(f"📊 统计：总文件数 = {total_count} | 匹配数 = {match_count} | 不匹配数 = {len(mismatch_files)} | 缺失数 = {len(missing_files)}")
+    print(f"🔎 分级对比：① 大小不同 {size_mismatch_count} 个（未读内容）"
+          f" | ② 抽样 {sampled_count} 对，不同 {sample_mismatch_count} 个"
+          f" | ③ 全量哈希 {full_hash_count} 对，不匹配 {full_mismatch_count} 个")
+    if use_manifest:
+        print(f"🗂️  哈希清单：全量哈希 {full_hash_count * 2} 次中 {cached_count} 次直接取自清单，{full_hash_count * 2 - cached_count} 次重新计算")
     if mismatch_files:
         print("\n❌ 不匹配文件列表：")
         for idx, (f1, f2) in enumerate(mismatch_files, 1):
@@ -89,8 +253,50 @@ def compare_two_dirs_hash(
     print("=" * 70)
     return match_count == total_count and len(missing_files) == 0
 
+def compare_two_manifests(dir1, dir2, algorithm="sha256"):
+    """
+    只对比两个目录的哈希清单，不读取任何文件内容
+    清单反映的是上次计算时的状态（compare_two_dirs_hash 或 fileHash.py 开启清单运行后生成）
+    """
+    for d in [dir1, dir2]:
+        if not manifest_exists(d):
+            print(f"❌ [错误] 目录 {d} 没有哈希清单，请先开启清单运行一次 compare_two_dirs_hash")
+            return False
+
+    print("=" * 70)
+    print(f"📌 哈希清单对比（不读文件内容）")
+    print(f"   清单1：{os.path.abspath(dir1)}")
+    print(f"   清单2：{os.path.abspath(dir2)}")
+    print(f"   哈希算法：{algorithm}")
+    print("=" * 70 + "\n")
+
+    with HashManifest(dir1) as manifest1, HashManifest(dir2) as manifest2:
+        matched, mismatched, missing, extra, unchecked = diff_manifests(manifest1, manifest2, algorithm)
+
+    print("=" * 70)
+    print(f"🎉 哈希清单对比完成！")
+    print(f"📊 统计：清单1文件数 = {len(matched) + len(mismatched) + len(missing) + len(unchecked)} | 匹配数 = {len(matched)} | 不匹配数 = {len(mismatched)} | 缺失数 = {len(missing)} | 未校验 = {len(unchecked)} | 仅清单2有 = {len(extra)}")
+    for title, items in [
+        ("❌ 不匹配文件列表：", mismatched),
+        ("❌ 缺失文件列表（清单2中无对应文件）：", missing),
+        (f"⚠️  未校验文件列表（大小相同，但清单中没有 {algorithm} 全量哈希，无法判定是否一致）：", unchecked),
+        ("⚠️  仅清单2中存在的文件：", extra)
+    ]:
+        if items:
+            print("\n" + title)
+            for idx, relpath in enumerate(items, 1):
+                print(f"   {idx}. {relpath}")
+    print("=" * 70)
+    return not mismatched and not missing and not unchecked
+
 # 主程序（测试用）
 if __name__ == "__main__":
     DIR1 = r"E:\无耻之徒字幕重置"
     DIR2 = r"E:\decrypted"
-    compare_two_dirs_hash(DIR1, DIR2)
\ No newline at end of file
+    compare_two_dirs_hash(DIR1, DIR2)
+
+    # 只做一致性比对时可换更快的算法（需 pip install blake3 / xxhash），各算法吞吐量见 hash_benchmark.py
+    # compare_two_dirs_hash(DIR1, DIR2, algorithm="blake3")
+
+    # 两边都有清单后，日常检查可以只对比清单（秒级完成）
+    # compare_two_manifests(DIR1, DIR2)
\ No newline at end of file
@@ -0,0 +1,190 @@
+"""
+持久化哈希清单：SQLite（Python 标准库自带）
+每个文件一行：相对路径 | 算法 | 大小 | mtime_ns | inode | 哈希值（空字符串表示只记录了大小，没算全量哈希）
+计算哈希前先查清单，大小、mtime_ns、inode 都没变就直接用缓存的哈希，只有新增或修改过的文件才重新读取
+两个目录都有清单时，可以直接对比清单（diff_manifests），不读任何文件内容
+
+清单默认存放在用户缓存目录（MANIFEST_DIR），文件名由目录根的绝对路径决定，不写进被检查的目录：
+只读的源目录也能用，清单也不会混进被对比、被加密的文件里
+旧版清单存放在目录根下（MANIFEST_NAME），遍历目录时仍用 is_manifest_file 跳过
+
+注意：缓存依据文件元数据判断是否变化；磁盘静默损坏（内容变了但 mtime 没变）需要关闭清单重新全量计算
+"""
+
+import os
+import sqlite3
+import hashlib
+import threading
+
+MANIFEST_NAME = ".hash_manifest.sqlite"
+MANIFEST_DIR = os.path.join(
+    os.environ.get("LOCALAPPDATA") or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "hash_manifests"
+)
+
+def is_manifest_file(file_name):
+    """清单文件本身（含 SQLite 临时日志文件）不参与哈希、对比和加密"""
+    return file_name.startswith(MANIFEST_NAME)
+
+def default_manifest_path(root):
+    """目录根对应的清单路径：缓存目录下，按目录根的绝对路径哈希命名（附带目录名方便辨认）"""
+    abs_root = os.path.normcase(os.path.realpath(root))
+    key = hashlib.sha256(abs_root.encode("utf-8")).hexdigest()[:16]
+    # 只保留目录名中的文字、数字和 ._-（盘符根目录如 E:\ 没有目录名）
+    name = "".join(c for c in os.path.basename(abs_root.rstrip("\\/")) if c.isalnum() or c in "._-") or "root"
+    return os.path.join(MANIFEST_DIR, f"{name}-{key}.sqlite")
+
+def manifest_exists(root):
+    return os.path.exists(default_manifest_path(root))
+
+class HashManifest:
+    """
+    单个目录的哈希清单；线程安全（对比工具在多个线程里同时查询/写入）
+    用法：
+        with HashManifest(root) as manifest:
+            digest, cached = manifest.get_hash(file_path, "sha256", calculate_file_hash)
+    """
+
+    def __init__(self, root, manifest_path=None, commit_every=500):
+        self.root = root
+        self.path = manifest_path or default_manifest_path(root)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._commit_every = commit_every  # 每写入这么多条提交一次，中断时最多损失这一批
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " relpath TEXT NOT NULL, algorithm TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL,"
+            " digest TEXT NOT NULL, PRIMARY KEY (relpath, algorithm))"
+        )
+        self._conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def relpath(self, file_path):
+        # 统一用 / 分隔，同一目录在 Windows / Linux 下生成的清单可以互相对比
+        return os.path.relpath(file_path, self.root).replace(os.sep, "/")
+
+    def lookup(self, file_path, algorithm, stat=None):
+        """清单中记录的大小、mtime_ns、inode 与文件当前状态一致时返回缓存的哈希，否则返回 None"""
+        stat = stat or os.stat(file_path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT size, mtime_ns, inode, digest FROM files WHERE relpath = ? AND algorithm = ?",
+                (self.relpath(file_path), algorithm)
+            ).fetchone()
+        if row and row[:3] == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+            return row[3]
+        return None
+
+    def store(self, file_path, algorithm, digest, stat):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (relpath, algorithm, size, mtime_ns, inode, digest) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.relpath(file_path), algorithm, stat.st_size, stat.st_mtime_ns, stat.st_ino, digest)
+            )
+            self._pending += 1
+            if self._pending >= self._commit_every:
+                self._conn.commit()
+                self._pending = 0
+
+    def record_size(self, file_path, algorithm, stat=None):
+        """
+        保证清单里有该文件的当前记录：缓存的哈希仍有效则保留，否则写一行只含大小的记录（哈希为空）
+        用于大小、抽样就已判定不一致、对方缺失或哈希失败的文件，diff_manifests 不会把它们漏掉
+        """
+        stat = stat or os.stat(file_path)
+        if not self.lookup(file_path, algorithm, stat):
+            self.store(file_path, algorithm, "", stat)
+
+    def get_hash(self, file_path, algorithm, compute):
+        """
+        取文件哈希：清单命中直接返回，否则调用 compute(file_path, algorithm) 计算并写入清单
+        计算期间文件被修改（前后状态不一致）时不写入清单
+        :return: (哈希值, 是否来自缓存)；计算失败时哈希值为 None
+        """
+        stat = os.stat(file_path)
+        digest = self.lookup(file_path, algorithm, stat)
+        if digest:
+            return digest, True
+        digest = compute(file_path, algorithm)
+        if digest:
+            after = os.stat(file_path)
+            if (after.st_size, after.st_mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                self.store(file_path, algorithm, digest, stat)
+        return digest, False
+
+    def entries(self, algorithm):
+        """
+        {相对路径: (大小, 哈希值)}，包含清单中的每个文件
+        没有该算法哈希的文件（只记录了大小，或只有其他算法的哈希）哈希值为空字符串
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT relpath, algorithm, size, digest FROM files").fetchall()
+        result = {}
+        for relpath, row_algorithm, size, digest in rows:
+            if row_algorithm == algorithm:
+                result[relpath] = (size, digest)
+            elif relpath not in result:
+                result[relpath] = (size, "")
+        return result
+
+    def forget(self, file_path):
+        """删除某个文件的全部记录（该文件已不存在），避免旧记录在清单对比时被当成仍然存在"""
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE relpath = ?", (self.relpath(file_path),))
+            self._pending += 1
+
+    def prune(self, seen_relpaths):
+        """删除本次遍历中已不存在的文件记录；返回删除条数"""
+        with self._lock:
+            stale = [
+                (relpath,) for (relpath,) in self._conn.execute("SELECT DISTINCT relpath FROM files")
+                if relpath not in seen_relpaths
+            ]
+            self._conn.executemany("DELETE FROM files WHERE relpath = ?", stale)
+            self._conn.commit()
+        return len(stale)
+
+    def export_sha256sum(self, output_path, algorithm="sha256"):
+        """导出为 sha256sum 兼容文本（<哈希>  <相对路径>），可用 sha256sum -c 校验"""
+        with open(output_path, "w", encoding="utf-8", newline="\n") as f:
+            for relpath, (_, digest) in sorted(self.entries(algorithm).items()):
+                if digest:
+                    f.write(f"{digest}  {relpath}\n")
+
+    def close(self):
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+def diff_manifests(manifest1, manifest2, algorithm="sha256"):
+    """
+    只对比两份清单，不读文件内容
+    大小不同直接算不匹配；大小相同但任一边没有该算法的哈希，算「未校验」，不当作匹配
+    :return: (匹配的相对路径列表, 不匹配列表, 清单 2 缺失列表, 清单 1 缺失列表, 未校验列表)
+    """
+    entries1 = manifest1.entries(algorithm)
+    entries2 = manifest2.entries(algorithm)
+    matched, mismatched, missing, unchecked = [], [], [], []
+    for relpath, (size, digest) in sorted(entries1.items()):
+        if relpath not in entries2:
+            missing.append(relpath)
+            continue
+        size2, digest2 = entries2[relpath]
+        if size != size2:
+            mismatched.append(relpath)
+        elif not digest or not digest2:
+            unchecked.append(relpath)
+        elif digest == digest2:
+            matched.append(relpath)
+        else:
+            mismatched.append(relpath)
+    extra = sorted(relpath for relpath in entries2 if relpath not in entries1)
+    return matched, mismatched, missing, extra, unchecked
@@ -0,0 +1,101 @@
+import os
+import shutil
+from enc_container import MODE_CBC, MODE_CTR, MODE_NAMES, build_header, read_header
+
+# 旁路文件后缀 → 加密模式
+SIDECAR_MODES = {".iv": MODE_CBC, ".nonce": MODE_CTR}
+
+def migrate_enc_file(enc_path, sidecar_path, mode, chunk_size=1024 * 1024 * 4):
+    """
+    把一对 .enc + .iv/.nonce 原地转换为带文件头的 .enc
+    先在同目录写临时文件（文件头 + 原密文），再用 os.replace 原子替换，最后删除旁路文件
+    中途失败不会破坏原文件
+    """
+    with open(sidecar_path, 'rb') as f:
+        nonce = f.read()
+    header = build_header(mode, nonce, chunk_size)
+
+    temp_path = enc_path + ".migrating"
+    try:
+        with open(enc_path, 'rb') as f_in, open(temp_path, 'wb') as f_out:
+            f_out.write(header)
+            shutil.copyfileobj(f_in, f_out, chunk_size)
+            f_out.flush()
+            os.fsync(f_out.fileno())
+        shutil.copystat(enc_path, temp_path)
+        os.replace(temp_path, enc_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    os.remove(sidecar_path)
+
+def migrate_sidecar_dir(
+    enc_dir=r"E:\encryted",
+    enc_suffix=".enc",
+    chunk_size=1024 * 1024 * 4
+):
+    """
+    递归转换目录下所有旧版 .enc 文件：把 .iv（CBC）/ .nonce（CTR）旁路文件并入 .enc 文件头
+    已带文件头的文件直接跳过，可重复运行
+    """
+    total_count = 0
+    success_count = 0
+    skipped_count = 0
+    failed_files = []
+
+    print("=" * 90)
+    print(f"📌 .enc 旁路文件迁移配置")
+    print(f"   加密文件目录：{os.path.abspath(enc_dir)}")
+    print(f"   加密文件后缀：{enc_suffix} | 旁路文件：{' / '.join(SIDECAR_MODES)}")
+    print("=" * 90 + "\n")
+
+    try:
+        for root, dirs, files in os.walk(enc_dir):
+            for file_name in files:
+                if not file_name.endswith(enc_suffix):
+                    continue
+
+                total_count += 1
+                enc_file_abs_path = os.path.join(root, file_name)
+
+                try:
+                    with open(enc_file_abs_path, 'rb') as f:
+                        header = read_header(f)
+                    if header:
+                        print(f"⏭️  已是新格式，跳过 | 文件名：{file_name} | 模式：{MODE_NAMES[header.mode]}")
+                        skipped_count += 1
+                        continue
+
+                    sidecars = [
+                        (enc_file_abs_path + suffix, mode) for suffix, mode in SIDECAR_MODES.items()
+                        if os.path.exists(enc_file_abs_path + suffix)
+                    ]
+                    if not sidecars:
+                        raise FileNotFoundError("缺少配套 .iv / .nonce 文件")
+                    if len(sidecars) > 1:
+                        raise ValueError("同时存在 .iv 和 .nonce 文件，无法判断加密模式")
+
+                    sidecar_path, mode = sidecars[0]
+                    migrate_enc_file(enc_file_abs_path, sidecar_path, mode, chunk_size)
+                    print(f"✅ 迁移完成 | 文件名：{file_name} | 模式：{MODE_NAMES[mode]} | 已删除：{os.path.basename(sidecar_path)}")
+                    success_count += 1
+
+                except Exception as e:
+                    print(f"❌ 迁移失败 | 文件名：{file_name} | 错误信息：{str(e)}")
+                    failed_files.append((file_name, str(e)))
+                    continue
+
+    except KeyboardInterrupt:
+        print("\n\n⚠️  检测到强制退出，迁移任务已中断")
+
+    print("\n" + "=" * 90)
+    print(f"🎉 迁移任务结束！ | 总加密文件数：{total_count} | 成功数：{success_count} | 跳过数：{skipped_count} | 失败数：{len(failed_files)}")
+    if failed_files:
+        print("\n❌ 失败文件列表：")
+        for idx, (name, err) in enumerate(failed_files, 1):
+            print(f"   {idx}. {name} | 错误：{err}")
+    print("=" * 90)
+    return not failed_files
+
+if __name__ == "__main__":
+    migrate_sidecar_dir()
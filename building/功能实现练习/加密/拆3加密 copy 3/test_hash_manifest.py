@@ -0,0 +1,60 @@
+"""
+哈希清单回归测试：python test_hash_manifest.py 或 python -m pytest test_hash_manifest.py
+dir2 中删掉的文件，清单对比时必须报为缺失，不能因为清单里的旧记录误报全部一致
+"""
+
+import os
+import sys
+import tempfile
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+import hash_manifest
+
+def load_comparer():
+    # 文件名含中文，按路径加载
+    spec = importlib.util.spec_from_file_location("hash_comparer", os.path.join(HERE, "hash_comparer 正确.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def test_deleted_file_is_missing_in_manifest_diff():
+    comparer = load_comparer()
+    with tempfile.TemporaryDirectory() as tmp:
+        old_dir = hash_manifest.MANIFEST_DIR
+        hash_manifest.MANIFEST_DIR = os.path.join(tmp, "manifests")  # 不碰用户缓存目录
+        try:
+            dir1, dir2 = os.path.join(tmp, "a"), os.path.join(tmp, "b")
+            for root in (dir1, dir2):
+                write(os.path.join(root, "x"), b"x" * 100)
+                write(os.path.join(root, "y"), b"y" * 100)
+                write(os.path.join(root, "sub", "z"), b"z" * 100)
+
+            assert comparer.compare_two_dirs_hash(dir1, dir2)
+            assert comparer.compare_two_manifests(dir1, dir2)
+
+            # 删除单个文件、删除整个子目录后，目录对比和清单对比都必须失败
+            os.remove(os.path.join(dir2, "y"))
+            os.remove(os.path.join(dir2, "sub", "z"))
+            os.rmdir(os.path.join(dir2, "sub"))
+            assert not comparer.compare_two_dirs_hash(dir1, dir2)
+            assert not comparer.compare_two_manifests(dir1, dir2)
+
+            with hash_manifest.HashManifest(dir1) as manifest1, hash_manifest.HashManifest(dir2) as manifest2:
+                matched, mismatched, missing, extra, unchecked = hash_manifest.diff_manifests(manifest1, manifest2)
+            assert matched == ["x"]
+            assert missing == ["sub/z", "y"]
+            assert not mismatched and not extra and not unchecked
+        finally:
+            hash_manifest.MANIFEST_DIR = old_dir
+
+if __name__ == "__main__":
+    test_deleted_file_is_missing_in_manifest_diff()
+    print("✅ 哈希清单回归测试通过")
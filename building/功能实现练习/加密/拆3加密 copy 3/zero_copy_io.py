@@ -0,0 +1,98 @@
+"""
+零拷贝加密 I/O：替代「f_in.read(chunk) → encryptor.update(chunk) → f_out.write」循环
+每块都会新建一个 4MB 的读缓冲和一个 4MB 的密文 bytes，大文件加密时内存分配/回收频繁
+
+这里的做法：
+  输入：mmap 映射源文件，按块切 memoryview（不复制）；无法 mmap 时用 readinto 读入复用缓冲
+  输出：encryptor.update_into 写入预分配的 bytearray，再把 memoryview 切片直接写出
+整个循环只在开始时分配两块缓冲，热循环中没有大块内存分配
+"""
+
+import os
+import mmap
+
+BLOCK_SIZE = 16  # AES 分组大小
+
+def _iter_mmap_chunks(f_in, start, file_size, chunk_size):
+    """
+    mmap 源文件，从 start 开始逐块产出 (文件偏移, memoryview)；每块用完即释放，保证 mmap 能正常关闭
+    支持 madvise 的系统上：声明顺序读取（内核加大预读），处理完的块立即解除映射页，
+    否则整个文件读完后映射页都算进进程 RSS
+    """
+    with mmap.mmap(f_in.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        can_advise = hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_DONTNEED')
+        if can_advise and hasattr(mmap, 'MADV_SEQUENTIAL'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        with memoryview(mm) as view:
+            for pos in range(start, file_size, chunk_size):
+                with view[pos:pos + chunk_size] as chunk:
+                    yield pos, chunk
+                if can_advise:
+                    # madvise 起点必须按页对齐；只读映射丢弃已处理的页是安全的
+                    page_start = pos - pos % mmap.PAGESIZE
+                    mm.madvise(mmap.MADV_DONTNEED, page_start, min(pos + chunk_size, file_size) - page_start)
+    f_in.seek(file_size)  # 与 read 循环一致：处理完后文件位置在末尾
+
+def _iter_readinto_chunks(f_in, start, chunk_size):
+    """readinto 读入复用缓冲，逐块产出 (文件偏移, memoryview)；下一次读取会覆盖上一块"""
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    pos = start
+    while True:
+        n = f_in.readinto(buffer)
+        if not n:
+            break
+        yield pos, view[:n]
+        pos += n
+
+def encrypt_stream_zero_copy(
+    f_in, f_out, encryptor, chunk_size=1024 * 1024 * 4, padder=None, use_mmap=True, progress=None
+):
+    """
+    把 f_in 从当前位置到文件末尾的内容加密写入 f_out
+    :param f_in: 以 'rb' 打开的源文件（可先 seek 到起始位置，如续传偏移）
+    :param f_out: 以 'wb' 打开的目标文件（文件头等可提前写入）
+    :param encryptor: cryptography 的加密上下文（CBC/CTR）
+    :param chunk_size: 每块大小，向上取整为 16 字节的倍数
+    :param padder: CBC 用的 PKCS7 填充器；只有最后一块经过填充器，其余块直接加密
+    :param use_mmap: True 用 mmap 读取，False 用 readinto 复用缓冲
+    :param progress: 回调 progress(已处理到的源文件偏移)，每块写出后调用（如断点续传记录检查点）
+    :return: 写入的密文字节数
+    """
+    file_size = os.fstat(f_in.fileno()).st_size
+    start = f_in.tell()
+    # 除最后一块外每块都直接加密，必须是分组大小的倍数：
+    # 这样最后一块的长度与总长度同余，填充器按最后一块算出的填充才正确
+    chunk_size = -(-chunk_size // BLOCK_SIZE) * BLOCK_SIZE
+
+    # update_into 要求输出缓冲 ≥ 输入长度 + 分组大小 - 1；最后一块填充后最多再多一个分组
+    out_buffer = bytearray(chunk_size + BLOCK_SIZE * 2)
+    out_view = memoryview(out_buffer)
+    written = 0
+
+    if use_mmap and file_size > start:
+        chunks = _iter_mmap_chunks(f_in, start, file_size, chunk_size)
+    else:
+        chunks = _iter_readinto_chunks(f_in, start, chunk_size)
+
+    padded = False
+    for pos, chunk in chunks:
+        if padder is not None and pos + len(chunk) >= file_size:
+            # 最后一块：填充后再加密（只有这一块会产生一次小的复制）
+            chunk = b"".join((padder.update(chunk), padder.finalize()))
+            padded = True
+        n = encryptor.update_into(chunk, out_buffer)
+        f_out.write(out_view[:n])
+        written += n
+        if progress is not None:
+            progress(pos + len(chunk))
+
+    if padder is not None and not padded:
+        # 空文件（或起始位置已在末尾）：只输出一个完整的填充分组
+        n = encryptor.update_into(padder.finalize(), out_buffer)
+        f_out.write(out_view[:n])
+        written += n
+
+    tail = encryptor.finalize()
+    f_out.write(tail)
+    return written + len(tail)
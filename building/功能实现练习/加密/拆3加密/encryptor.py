@@ -1,13 +1,37 @@
 import os
 import py7zr
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+def _py7zr_encrypt_one(args):
+    """
+    加密单个文件为独立的 .7z（并行模式下在工作进程中执行）
+    :return: 提示信息（不支持文件名加密时），无提示返回 None；加密失败直接抛出异常
+    """
+    file_abs_path, output_7z_path, file_name, password, encrypt_filename = args
+    notice = None
+    with py7zr.SevenZipFile(output_7z_path, 'w', password=password) as archive:
+        # 根据开关决定是否加密文件名（核心逻辑保留）
+        if encrypt_filename:
+            try:
+                archive.set_encrypted_header(True)  # 加密文件名（头部信息）
+            except Exception:
+                notice = f"⚠️  提示 | {file_name} - 当前py7zr版本不支持文件名加密，仅加密内容"
+        archive.write(file_abs_path, arcname=file_name)  # 写入文件
+    return notice
 
 def py7zr_recursive_single_file_encrypt(
     source_dir,
     encrypt_output_dir,
     password,
-    encrypt_filename=True  # 保留文件名加密开关
+    encrypt_filename=True,  # 保留文件名加密开关
+    max_workers=os.cpu_count(),  # 并行加密进程数，1 为顺序加密
+    max_inflight_bytes=1024 * 1024 * 1024  # 并行时同时在加密中的文件总大小上限（避免磁盘来回寻道）
 ):
-    """递归单文件加密，支持选择是否加密文件名"""
+    """
+    递归单文件加密，支持选择是否加密文件名
+    并行模式：每个文件一个任务交给进程池，同时在途的文件总大小不超过 max_inflight_bytes，
+    任务数不超过进程数的 2 倍；结果在主进程统一统计
+    """
     total_count = 0
     success_count = 0
     failed_files = []
@@ -27,35 +51,75 @@ def py7zr_recursive_single_file_encrypt(
     print(f"   源文件目录：{os.path.abspath(source_dir)}")
     print(f"   加密包目录：{os.path.abspath(encrypt_output_dir)}")
     print(f"   文件名加密：{'✅ 开启' if encrypt_filename else '❌ 关闭'}")  # 显示开关状态
+    print(f"   并行进程：{max_workers} | 在途数据上限：{max_inflight_bytes // 1024 // 1024}MB")
     print("=" * 70 + "\n")
 
-    # 递归加密
-    for root, dirs, files in os.walk(source_dir):
-        for file_name in files:
-            total_count += 1
-            file_abs_path = os.path.join(root, file_name)
-            rel_dir = os.path.relpath(root, source_dir)
+    executor = ProcessPoolExecutor(max_workers=max_workers) if max_workers and max_workers > 1 else None
+    pending = {}  # future -> (源文件路径, 输出路径, 文件大小)
+    inflight_bytes = 0
 
-            # 构建输出路径
-            encrypt_subdir = os.path.join(encrypt_output_dir, rel_dir)
-            os.makedirs(encrypt_subdir, exist_ok=True)
-            output_7z_path = os.path.join(encrypt_subdir, f"{file_name}.7z")
+    def record_result(file_abs_path, output_7z_path, notice=None, error=None):
+        nonlocal success_count
+        if error is not None:
+            print(f"❌ 加密失败 | {file_abs_path} → 错误原因：{str(error)}")
+            failed_files.append(file_abs_path)
+            return
+        if notice:
+            print(notice)
+        print(f"✅ 加密完成 | {file_abs_path} → {output_7z_path}")
+        success_count += 1
 
+    def collect(futures):
+        """汇总已完成（或等待完成）的任务，释放在途额度"""
+        nonlocal inflight_bytes
+        for future in futures:
+            file_abs_path, output_7z_path, file_size = pending.pop(future)
+            inflight_bytes -= file_size
             try:
-                with py7zr.SevenZipFile(output_7z_path, 'w', password=password) as archive:
-                    # 根据开关决定是否加密文件名（核心逻辑保留）
-                    if encrypt_filename:
-                        try:
-                            archive.set_encrypted_header(True)  # 加密文件名（头部信息）
-                        except Exception:
-                            print(f"⚠️  提示 | {file_name} - 当前py7zr版本不支持文件名加密，仅加密内容")
-                    archive.write(file_abs_path, arcname=file_name)  # 写入文件
-                print(f"✅ 加密完成 | {file_abs_path} → {output_7z_path}")
-                success_count += 1
+                record_result(file_abs_path, output_7z_path, notice=future.result())
             except Exception as e:
-                print(f"❌ 加密失败 | {file_abs_path} → 错误原因：{str(e)}")
-                failed_files.append(file_abs_path)
-                continue
+                record_result(file_abs_path, output_7z_path, error=e)
+
+    try:
+        # 递归加密
+        for root, dirs, files in os.walk(source_dir):
+            for file_name in files:
+                total_count += 1
+                file_abs_path = os.path.join(root, file_name)
+                rel_dir = os.path.relpath(root, source_dir)
+
+                # 构建输出路径
+                encrypt_subdir = os.path.join(encrypt_output_dir, rel_dir)
+                os.makedirs(encrypt_subdir, exist_ok=True)
+                output_7z_path = os.path.join(encrypt_subdir, f"{file_name}.7z")
+                task_args = (file_abs_path, output_7z_path, file_name, password, encrypt_filename)
+
+                if executor is None:
+                    try:
+                        record_result(file_abs_path, output_7z_path, notice=_py7zr_encrypt_one(task_args))
+                    except Exception as e:
+                        record_result(file_abs_path, output_7z_path, error=e)
+                    continue
+
+                # 并行：在途数据或任务数超限时，先等已提交的任务完成（至少保留一个在途任务）
+                try:
+                    file_size = os.path.getsize(file_abs_path)
+                except OSError:
+                    file_size = 0
+                while pending and (inflight_bytes + file_size > max_inflight_bytes or len(pending) >= max_workers * 2):
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = executor.submit(_py7zr_encrypt_one, task_args)
+                pending[future] = (file_abs_path, output_7z_path, file_size)
+                inflight_bytes += file_size
+
+        # 等待剩余任务
+        collect(list(pending))
+    except KeyboardInterrupt:
+        print("\n⚠️ 检测到强制退出，任务已中断")
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
 
     # 执行结果
     print("=" * 70)
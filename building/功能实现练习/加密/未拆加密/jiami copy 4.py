@@ -1,6 +1,9 @@
+import io
 import os
 import py7zr
+import pathlib
 import hashlib
+from py7zr.io import Py7zIO, WriterFactory
 
 def calculate_file_hash(file_path, algorithm="sha256"):
     """
@@ -15,13 +18,110 @@ def calculate_file_hash(file_path, algorithm="sha256"):
             hash_obj.update(chunk)
     return hash_obj.hexdigest()
 
+class HashingReader(io.BufferedIOBase):
+    """
+    包装源文件：py7zr 压缩时每读一块，顺带更新哈希
+    加密读取的同时得到原文件哈希，不必再单独读一遍原文件
+    """
+    def __init__(self, f, hash_obj):
+        self._f = f
+        self.hash_obj = hash_obj
+
+    def read(self, size=-1):
+        data = self._f.read(size)
+        self.hash_obj.update(data)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # py7zr 只用 seek/tell 计算文件大小，不会回退重读
+        return self._f.seek(offset, whence)
+
+    def tell(self):
+        return self._f.tell()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+class HashWriter(Py7zIO):
+    """解压输出只进哈希、不落盘"""
+    def __init__(self, algorithm):
+        self.hash_obj = hashlib.new(algorithm)
+        self._size = 0
+
+    def write(self, s):
+        self.hash_obj.update(s)
+        self._size += len(s)
+        return len(s)
+
+    def read(self, size=None):
+        return b""
+
+    def seek(self, offset, whence=0):
+        return 0
+
+    def flush(self):
+        pass
+
+    def size(self):
+        return self._size
+
+class HashWriterFactory(WriterFactory):
+    """py7zr extract 的 factory：每个包内文件对应一个 HashWriter"""
+    def __init__(self, algorithm="sha256"):
+        self.algorithm = algorithm
+        self.products = {}
+
+    def create(self, filename):
+        product = HashWriter(self.algorithm)
+        self.products[filename] = product
+        return product
+
+def encrypt_and_hash(file_abs_path, output_7z_path, arcname, password, encrypt_filename, algorithm="sha256"):
+    """
+    单遍加密：源文件只读一次，边压缩加密边计算原文件哈希
+    writef 按内存数据生成文件信息（时间为加密时间、权限 0600），写入后换成 archive.write 对原文件生成的属性和时间
+    :return: (原文件哈希, 是否成功启用文件名加密)
+    """
+    hash_obj = hashlib.new(algorithm)
+    header_encrypted = True
+    with py7zr.SevenZipFile(output_7z_path, 'w', password=password) as archive:
+        if encrypt_filename:
+            try:
+                archive.set_encrypted_header(True)
+            except Exception:
+                header_encrypted = False
+        with open(file_abs_path, "rb") as f:
+            archive.writef(HashingReader(f, hash_obj), arcname)
+            # 文件信息在关闭归档时才写入文件头，此时修改即可生效
+            # 权限位和修改/访问时间取自原文件（py7zr 不写创建时间，st_ctime 在 Unix 上也不是创建时间，不处理）
+            source_info = archive._make_file_info(pathlib.Path(file_abs_path), arcname, dereference=True)
+            file_info = archive.header.files_info.files[-1]
+            for key in ("attributes", "lastwritetime", "lastaccesstime"):
+                file_info[key] = source_info[key]
+    return hash_obj.hexdigest(), header_encrypted
+
+def archive_member_hash(archive_path, arcname, password, algorithm="sha256"):
+    """
+    流式解密校验：解压数据直接进哈希，不写出解压文件
+    :return: 包内文件哈希（找不到该文件时返回 None）
+    """
+    factory = HashWriterFactory(algorithm)
+    with py7zr.SevenZipFile(archive_path, 'r', password=password) as archive:
+        archive.extract(targets=[arcname], factory=factory)
+    product = factory.products.get(arcname)
+    return product.hash_obj.hexdigest() if product else None
+
 def py7zr_recursive_single_file_encrypt(
     source_dir,
     encrypt_output_dir,
     check_temp_dir,
     password,
     encrypt_filename=True,
-    enable_hash_check=True
+    enable_hash_check=True,
+    single_pass=True
 ):
     """
     递归单文件加密 + 可选哈希校验 + 统计与失败文件列表
@@ -31,6 +131,7 @@ def py7zr_recursive_single_file_encrypt(
     :param password: 加密密码
     :param encrypt_filename: 是否加密文件名开关
     :param enable_hash_check: 是否启用哈希校验开关
+    :param single_pass: 单遍模式：加密时顺带计算原文件哈希，校验时解密数据直接进哈希（不写临时解压文件）
     :return: 执行结果布尔值
     """
     # ========== 新增：初始化统计变量 ==========
@@ -41,8 +142,8 @@ def py7zr_recursive_single_file_encrypt(
     # 基础目录校验与创建
     for dir_path in [source_dir, encrypt_output_dir]:
         os.makedirs(dir_path, exist_ok=True)
-    # 仅当校验开关开启时，创建校验目录
-    if enable_hash_check:
+    # 仅当校验开关开启且使用解压到临时目录的方式时，创建校验目录
+    if enable_hash_check and not single_pass:
         os.makedirs(check_temp_dir, exist_ok=True)
     
     if not os.listdir(source_dir):
@@ -57,7 +158,9 @@ def py7zr_recursive_single_file_encrypt(
     print(f"   加密包目录：{os.path.abspath(encrypt_output_dir)}")
     print(f"   文件名加密：{'✅ 开启' if encrypt_filename else '❌ 关闭'}")
     print(f"   哈希校验：{'✅ 开启' if enable_hash_check else '❌ 关闭'}")
-    if enable_hash_check:
+    if enable_hash_check and single_pass:
+        print(f"   校验方式：单遍（加密时计算原文件哈希，流式解密校验，不写临时文件）")
+    elif enable_hash_check:
         print(f"   校验临时目录：{os.path.abspath(check_temp_dir)}")
     print("=" * 70 + "\n")
 
@@ -74,6 +177,25 @@ def py7zr_recursive_single_file_encrypt(
             output_7z_path = os.path.join(encrypt_subdir, f"{file_name}.7z")
 
             try:
+                if single_pass:
+                    # ---------- 单遍模式：加密 + 原文件哈希一次读完 ----------
+                    original_hash, header_encrypted = encrypt_and_hash(
+                        file_abs_path, output_7z_path, file_name, password, encrypt_filename
+                    )
+                    if not header_encrypted:
+                        print(f"⚠️  提示 | {file_name} - 当前版本不支持文件名加密，仅加密内容")
+                    print(f"✅ 加密完成 | {file_abs_path} → {output_7z_path}")
+                    success_count += 1
+
+                    if enable_hash_check:
+                        print(f"📝 原文件哈希 | {file_name} → {original_hash}")
+                        extracted_hash = archive_member_hash(output_7z_path, file_name, password)
+                        if original_hash == extracted_hash:
+                            print(f"   ✅ 校验通过 | 解密数据哈希 → {extracted_hash}\n")
+                        else:
+                            print(f"   ❌ 校验失败 | 原哈希 {original_hash} vs 解密哈希 {extracted_hash}\n")
+                    continue
+
                 # ---------- 1. 加密逻辑 ----------
                 with py7zr.SevenZipFile(output_7z_path, 'w', password=password) as archive:
                     # 仅当文件名加密开关开启时，尝试启用该功能
@@ -130,7 +252,7 @@ def py7zr_recursive_single_file_encrypt(
     # 核心统计信息
     print(f"📊 执行统计：总文件数 = {total_count} | 成功数 = {success_count} | 失败数 = {len(failed_files)}")
     print(f"💡 加密包位置：{os.path.abspath(encrypt_output_dir)}")
-    if enable_hash_check:
+    if enable_hash_check and not single_pass:
         print(f"💡 校验文件位置：{os.path.abspath(check_temp_dir)}（可手动删除）")
     # 输出失败文件列表
     if failed_files:
@@ -150,6 +272,7 @@ if __name__ == "__main__":
     PASSWORD = "secp256k1"                           # 测试用加密密码
     ENCRYPT_FILENAME = True                   # 文件名加密开关（False=关闭）
     ENABLE_HASH_CHECK = False                  # 哈希校验开关（False=关闭）
+    SINGLE_PASS = True                         # 单遍模式（False=旧流程：加密后重读原文件，解压到校验目录再哈希）
 
     # 调用加密函数
     py7zr_recursive_single_file_encrypt(
@@ -158,5 +281,6 @@ if __name__ == "__main__":
         check_temp_dir=CHECK_TEMP_DIR,
         password=PASSWORD,
         encrypt_filename=ENCRYPT_FILENAME,
-        enable_hash_check=ENABLE_HASH_CHECK
+        enable_hash_check=ENABLE_HASH_CHECK,
+        single_pass=SINGLE_PASS
     )
\ No newline at end of file
@@ -1,7 +1,7 @@
 import subprocess
-import re
 import os
 import gc
+from probe_cache import probe_streams, get_ffprobe_path
 
 def get_ffmpeg_path():
     """获取FFmpeg路径（Debian系统默认已安装可直接调用）"""
@@ -14,22 +14,13 @@ def get_all_subtitle_tracks(video_path, ffmpeg_path):
     :param ffmpeg_path: FFmpeg路径
     :return: list[dict] 字幕轨信息，含index/format/language
     """
-    cmd = [ffmpeg_path, '-i', video_path]
-    result = subprocess.run(
-        cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE,
-        encoding='utf-8', errors='ignore'
-    )
-    output = result.stderr
     sub_tracks = []
 
-    # 正则匹配字幕轨信息，精准识别ASS/SSA/SRT格式
-    pattern = re.compile(
-        r'Stream #0:(\d+)(?:\[.*?\])?.*?Subtitle: (\w+)(?:\s*\(\w+\))?.*?(?:\((\w+)\))?',
-        re.IGNORECASE
-    )
-    matches = pattern.findall(output)
-
-    for idx, fmt, lang in matches:
+    # ffprobe JSON探测，只保留字幕流
+    for stream in probe_streams(video_path, get_ffprobe_path()):
+        if stream.codec_type != "subtitle":
+            continue
+        idx, fmt, lang = stream.index, stream.codec_name, stream.language
         fmt_lower = fmt.lower()
         # 统一格式标识，区分核心两类格式
         if fmt_lower in ["ass", "ssa"]:
@@ -41,7 +32,7 @@ def get_all_subtitle_tracks(video_path, ffmpeg_path):
         else:
             sub_format = "unknown"
             suffix = "srt"  # 未知格式默认转SRT
-        
+
         sub_tracks.append({
             "index": idx,
             "format": sub_format,
@@ -50,6 +41,22 @@ def get_all_subtitle_tracks(video_path, ffmpeg_path):
         })
     return sub_tracks
 
+def build_track_output_path(video_path, sub_track, output_dir):
+    """按 视频名_track索引_格式.后缀 生成字幕轨输出路径"""
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    return os.path.join(
+        output_dir,
+        f"{video_name}_track{sub_track['index']}_{sub_track['format']}.{sub_track['suffix']}"
+    )
+
+def remove_stale_output(output_file):
+    """删除上次运行留下的输出，避免FFmpeg失败时旧文件被当成本次结果"""
+    if os.path.exists(output_file):
+        os.remove(output_file)
+
+def is_valid_output(output_file):
+    return os.path.exists(output_file) and os.path.getsize(output_file) >= 10
+
 def extract_single_subtitle_track(video_path, sub_track, output_dir, ffmpeg_path):
     """
     无损提取单个字幕轨，按格式命名
@@ -60,14 +67,8 @@ def extract_single_subtitle_track(video_path, sub_track, output_dir, ffmpeg_path
     :return: 提取的字幕文件路径
     """
     track_idx = sub_track["index"]
-    track_format = sub_track["format"]
-    track_suffix = sub_track["suffix"]
-    video_name = os.path.splitext(os.path.basename(video_path))[0]
-
-    output_file = os.path.join(
-        output_dir,
-        f"{video_name}_track{track_idx}_{track_format}.{track_suffix}"
-    )
+    output_file = build_track_output_path(video_path, sub_track, output_dir)
+    remove_stale_output(output_file)
 
     # FFmpeg提取命令：无损复制字幕流
     cmd = [
@@ -82,19 +83,65 @@ def extract_single_subtitle_track(video_path, sub_track, output_dir, ffmpeg_path
         encoding='utf-8', errors='ignore'
     )
 
-    # 校验提取结果
-    if not os.path.exists(output_file) or os.path.getsize(output_file) < 10:
+    # 校验提取结果：FFmpeg返回码 + 输出文件
+    if result.returncode != 0 or not is_valid_output(output_file):
         raise Exception(f"字幕轨{track_idx}提取失败！FFmpeg日志：{result.stderr}")
-    
+
     print(f"  ✅ 提取成功：{os.path.basename(output_file)}")
     return output_file
 
-def process_single_video_subtitles(video_path, root_output_dir, ffmpeg_path):
+def extract_subtitle_tracks_single_pass(video_path, sub_tracks, output_dir, ffmpeg_path):
+    """
+    单次FFmpeg调用提取多个字幕轨：每个轨道一组 -map/输出文件，视频容器只解复用一次
+    FFmpeg返回失败时，本次生成的文件可能只有文件头或被截断，全部删除后逐轨重新提取
+    :param video_path: 视频路径
+    :param sub_tracks: 字幕轨信息dict列表
+    :param output_dir: 输出目录
+    :param ffmpeg_path: FFmpeg路径
+    :return: list 提取的字幕文件路径
+    """
+    output_files = [build_track_output_path(video_path, track, output_dir) for track in sub_tracks]
+    for output_file in output_files:
+        remove_stale_output(output_file)
+
+    cmd = [ffmpeg_path, '-i', video_path, '-y']
+    for track, output_file in zip(sub_tracks, output_files):
+        cmd.extend([
+            '-map', f'0:{track["index"]}',  # 指定字幕轨索引
+            '-c:s', 'copy',                 # 无损复制，不转码
+            output_file
+        ])
+
+    result = subprocess.run(
+        cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE,
+        encoding='utf-8', errors='ignore'
+    )
+
+    if result.returncode != 0:
+        # 与逐轨提取一致：返回码非0即视为失败，不信任已生成的任何输出
+        print(f"  ⚠️ 单次提取FFmpeg返回错误（{result.returncode}），改为逐轨提取：{result.stderr.strip()[-300:]}")
+        for output_file in output_files:
+            remove_stale_output(output_file)
+        return [extract_single_subtitle_track(video_path, track, output_dir, ffmpeg_path) for track in sub_tracks]
+
+    # 逐轨校验提取结果（旧文件已删除，存在即为本次生成），缺失的轨道单独重试
+    extracted = []
+    for track, output_file in zip(sub_tracks, output_files):
+        if is_valid_output(output_file):
+            print(f"  ✅ 提取成功：{os.path.basename(output_file)}")
+            extracted.append(output_file)
+        else:
+            print(f"  ⚠️ 字幕轨{track['index']}单次提取未成功，改为单独提取")
+            extracted.append(extract_single_subtitle_track(video_path, track, output_dir, ffmpeg_path))
+    return extracted
+
+def process_single_video_subtitles(video_path, root_output_dir, ffmpeg_path, single_pass=True):
     """
     处理单个视频：识别+提取所有字幕轨
     :param video_path: 输入视频路径
     :param root_output_dir: 根输出目录
     :param ffmpeg_path: FFmpeg路径
+    :param single_pass: True时一次FFmpeg调用提取全部轨道，False时逐轨提取
     """
     video_name = os.path.splitext(os.path.basename(video_path))[0]
     # 为每个视频创建字幕专属文件夹
@@ -115,9 +162,12 @@ def process_single_video_subtitles(video_path, root_output_dir, ffmpeg_path):
         for track in sub_tracks:
             print(f"    - 轨道{track['index']} | 格式：{track['format']} | 语言：{track['language']}")
         
-        # 3. 逐个提取字幕轨
-        for track in sub_tracks:
-            extract_single_subtitle_track(video_path, track, sub_output_dir, ffmpeg_path)
+        # 3. 提取字幕轨（单次调用提取全部轨道，或逐个提取）
+        if single_pass:
+            extract_subtitle_tracks_single_pass(video_path, sub_tracks, sub_output_dir, ffmpeg_path)
+        else:
+            for track in sub_tracks:
+                extract_single_subtitle_track(video_path, track, sub_output_dir, ffmpeg_path)
         
         print(f"  📁 字幕保存路径：{sub_output_dir}")
     
@@ -126,11 +176,12 @@ def process_single_video_subtitles(video_path, root_output_dir, ffmpeg_path):
     finally:
         gc.collect()
 
-def batch_process_subtitle_tracks(input_root_dir, output_root_dir):
+def batch_process_subtitle_tracks(input_root_dir, output_root_dir, single_pass=True):
     """
     批量处理所有视频的字幕轨识别与提取
     :param input_root_dir: 输入视频根目录（videos_new）
     :param output_root_dir: 输出根目录（processed_videos_new）
+    :param single_pass: 是否单次FFmpeg调用提取全部字幕轨
     """
     ffmpeg_path = get_ffmpeg_path()
     if not os.path.exists(output_root_dir):
@@ -141,7 +192,7 @@ def batch_process_subtitle_tracks(input_root_dir, output_root_dir):
         for filename in files:
             if filename.lower().endswith('.mkv'):
                 video_path = os.path.join(root, filename)
-                process_single_video_subtitles(video_path, output_root_dir, ffmpeg_path)
+                process_single_video_subtitles(video_path, output_root_dir, ffmpeg_path, single_pass)
 
     print("\n" + "="*60)
     print(f"🎉 字幕轨批量提取完成！所有文件已保存至：{output_root_dir}")
@@ -151,7 +202,8 @@ if __name__ == "__main__":
     # -------------------------- 配置区 --------------------------
     INPUT_ROOT_DIR = "./videos_new"        # 输入视频根目录
     OUTPUT_ROOT_DIR = "./processed_videos_new"  # 输出字幕根目录
+    SINGLE_PASS = True                     # 单次FFmpeg调用提取全部字幕轨
     # -----------------------------------------------------------
 
     # 执行批量处理
-    batch_process_subtitle_tracks(INPUT_ROOT_DIR, OUTPUT_ROOT_DIR)
\ No newline at end of file
+    batch_process_subtitle_tracks(INPUT_ROOT_DIR, OUTPUT_ROOT_DIR, SINGLE_PASS)
\ No newline at end of file
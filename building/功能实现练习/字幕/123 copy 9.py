@@ -1,10 +1,17 @@
 import subprocess
 import re
-import pysrt
 import os
 import sys
 import tempfile
 import gc
+import threading
+from array import array
+import json
+import io
+import time
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from probe_cache import probe_streams, get_ffprobe_path
 
 def get_ffmpeg_path():
     """获取FFmpeg路径，未配置环境变量则填写绝对路径"""
@@ -12,15 +19,11 @@ def get_ffmpeg_path():
     return "ffmpeg"
 
 def get_video_info(video_path, ffmpeg_path):
-    """获取视频内字幕轨的索引、格式、语言信息"""
-    cmd = [ffmpeg_path, '-i', video_path]
-    result = subprocess.run(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, encoding='utf-8', errors='ignore')
-    output = result.stderr
+    """获取视频内字幕轨的索引、格式、语言信息（基于ffprobe JSON探测，带缓存）"""
     sub_info = []
-    pattern = re.compile(r'Stream #0:(\d+).*?Subtitle: (\w+).*?\((\w+)\)')
-    matches = pattern.findall(output)
-    for idx, fmt, lang in matches:
-        sub_info.append({"index": idx, "format": fmt, "language": lang})
+    for stream in probe_streams(video_path, get_ffprobe_path()):
+        if stream.codec_type == "subtitle":
+            sub_info.append({"index": stream.index, "format": stream.codec_name, "language": stream.language})
     return sub_info
 
 def extract_subtitle_to_temp(video_path, sub_index, sub_fmt, ffmpeg_path):
@@ -47,109 +50,267 @@ def extract_subtitle_to_temp(video_path, sub_index, sub_fmt, ffmpeg_path):
     print(f"  ✅ 提取轨道{sub_index}成功（{sub_fmt}格式，内存临时文件）")
     return temp_path
 
-def convert_ass_to_srt_temp(ass_temp_path, ffmpeg_path):
-    """ASS临时文件转SRT临时文件，确保生成有效SRT"""
-    srt_temp = tempfile.NamedTemporaryFile(mode='wb', suffix='.srt', delete=False)
-    srt_temp_path = srt_temp.name
-    srt_temp.close()
-
+def extract_subtitle_to_memory(video_path, sub_index, ffmpeg_path):
+    """
+    管道模式：字幕流经FFmpeg标准输出（-f ass pipe:1）直接读入内存，不创建临时文件
+    :return: str ASS全文
+    """
     cmd = [
-        ffmpeg_path, '-i', ass_temp_path,
-        '-c:s', 'srt',
-        srt_temp_path,
-        '-y'
+        ffmpeg_path, '-i', video_path,
+        '-map', f'0:{sub_index}',
+        '-c:s', 'copy',
+        '-f', 'ass', 'pipe:1'
     ]
-    result = subprocess.run(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, encoding='utf-8', errors='ignore')
-    
-    if not os.path.exists(srt_temp_path) or os.path.getsize(srt_temp_path) == 0:
-        if os.path.exists(srt_temp_path):
-            os.unlink(srt_temp_path)
-        raise Exception(f"ASS转SRT失败！日志：{result.stderr}")
-    print(f"  ✅ ASS转SRT成功（内存临时文件）")
-    return srt_temp_path
-
-def create_sub_rip_item_copy(original_sub):
+    result = subprocess.run(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE)
+    if result.returncode != 0 or not result.stdout:
+        raise Exception(f"轨道{sub_index}提取失败！日志：{result.stderr.decode('utf-8', errors='ignore')}")
+    print(f"  ✅ 提取轨道{sub_index}成功（ass格式，管道读入内存）")
+    return result.stdout.decode('utf-8-sig', errors='ignore')
+
+# ASS解析用的预编译正则：{\pos(...)}等覆盖标签、<i>等HTML标签、绘图模式
+ASS_OVERRIDE_TAG_RE = re.compile(r'\{[^}]*\}')
+ASS_HTML_TAG_RE = re.compile(r'<[^>]+>')
+ASS_DRAWING_RE = re.compile(r'\{[^}]*\\p[1-9]')
+
+def ass_time_to_ms(ass_time):
+    """ASS时间戳 H:MM:SS.cc 转毫秒"""
+    hours, minutes, seconds = ass_time.strip().split(':')
+    sec, _, frac = seconds.partition('.')
+    return ((int(hours) * 60 + int(minutes)) * 60 + int(sec)) * 1000 + int(frac.ljust(3, '0')[:3] or 0)
+
+def clean_ass_text(text):
+    """去除ASS覆盖标签和HTML标签，转换 \\N / \\n 换行和 \\h 硬空格"""
+    text = ASS_OVERRIDE_TAG_RE.sub('', text)
+    text = ASS_HTML_TAG_RE.sub('', text)
+    text = text.replace('\\N', '\n').replace('\\n', '\n').replace('\\h', ' ')
+    return '\n'.join(line.strip() for line in text.split('\n') if line.strip())
+
+def iter_ass_dialogues(ass_path):
     """
-    兼容低版本pysrt：手动创建SubRipItem副本，替代copy()方法
-    :param original_sub: 原始SubRipItem对象
-    :return: 复制后的SubRipItem对象
+    流式读取ASS文件的 [Events] 段，逐条产出对话
+    :param ass_path: ASS文件路径
+    :return: 生成器，产出 (开始毫秒, 结束毫秒, 纯文本)
     """
-    new_sub = pysrt.SubRipItem()
-    # 复制字幕核心属性
-    new_sub.index = original_sub.index
-    new_sub.start = original_sub.start
-    new_sub.end = original_sub.end
-    new_sub.text = original_sub.text
-    new_sub.position = original_sub.position
-    return new_sub
+    with open(ass_path, 'r', encoding='utf-8-sig', errors='ignore') as f:
+        yield from iter_ass_dialogue_lines(f)
 
-def split_bilingual_to_cn_en_temp(bilingual_srt_temp):
+def iter_ass_dialogue_lines(lines):
     """
-    优化拆分逻辑：兼容多种双语格式，避免生成空字幕，兼容低版本pysrt
-    :param bilingual_srt_temp: 双语SRT临时文件路径
-    :return: (纯中文SRT临时路径, 纯英文SRT临时路径)
+    逐行解析ASS文本的 [Events] 段（文件对象、管道输出的行列表均可）
+    :param lines: 可迭代的ASS文本行
+    :return: 生成器，产出 (开始毫秒, 结束毫秒, 纯文本)
     """
-    # 创建两个临时文件
-    cn_srt_temp = tempfile.NamedTemporaryFile(mode='wb', suffix='.srt', delete=False)
-    en_srt_temp = tempfile.NamedTemporaryFile(mode='wb', suffix='.srt', delete=False)
-    cn_temp_path = cn_srt_temp.name
-    en_temp_path = en_srt_temp.name
-    cn_srt_temp.close()
-    en_srt_temp.close()
-
-    # 读取SRT文件，兼容多种编码
-    try:
-        subs = pysrt.open(bilingual_srt_temp, encoding='utf-8')
-    except (UnicodeDecodeError, FileNotFoundError):
-        try:
-            subs = pysrt.open(bilingual_srt_temp, encoding='gbk')
-        except:
-            subs = pysrt.open(bilingual_srt_temp, encoding='utf-16')
+    in_events = False
+    fields = ["layer", "start", "end", "style", "name", "marginl", "marginr", "marginv", "effect", "text"]
+    for line in lines:
+        line = line.strip()
+        if line.startswith('['):
+            in_events = line.lower() == '[events]'
+            continue
+        if not in_events:
+            continue
+        key, _, value = line.partition(':')
+        key = key.strip().lower()
+        if key == 'format':
+            fields = [field.strip().lower() for field in value.split(',')]
+        elif key == 'dialogue':
+            # Text是最后一个字段，内部可能含逗号，只拆分前 N-1 个
+            parts = value.strip().split(',', len(fields) - 1)
+            if len(parts) < len(fields):
+                continue
+            row = dict(zip(fields, parts))
+            if ASS_DRAWING_RE.search(row["text"]):
+                continue  # 跳过矢量绘图，不是字幕文本
+            text = clean_ass_text(row["text"])
+            if text:
+                yield ass_time_to_ms(row["start"]), ass_time_to_ms(row["end"]), text
+
+SRT_TIME_RE = re.compile(
+    r'(\d+):(\d{2}):(\d{2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{2}):(\d{2})[,.](\d{1,3})'
+)
+
+def ms_to_srt_time(ms):
+    """毫秒转SRT时间戳 HH:MM:SS,mmm"""
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+def ms_to_ass_time(ms):
+    """毫秒转ASS时间戳 H:MM:SS.cc"""
+    cs = ms // 10
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+class CueStore:
+    """
+    紧凑的字幕条目容器，替代 pysrt.SubRipFile：
+    开始/结束毫秒存于两个 array('i') 列，文本存于一个列表，不为每条字幕创建对象
+    """
+    __slots__ = ("starts", "ends", "texts")
+
+    def __init__(self, starts=None, ends=None, texts=None):
+        self.starts = starts if starts is not None else array('i')
+        self.ends = ends if ends is not None else array('i')
+        self.texts = texts if texts is not None else []
+
+    def __len__(self):
+        return len(self.texts)
+
+    def __iter__(self):
+        """逐条产出 (开始毫秒, 结束毫秒, 文本)"""
+        return zip(self.starts, self.ends, self.texts)
+
+    def __getitem__(self, key):
+        """整数下标返回单条 (开始, 结束, 文本)；切片返回新的 CueStore"""
+        if isinstance(key, slice):
+            return CueStore(self.starts[key], self.ends[key], self.texts[key])
+        return self.starts[key], self.ends[key], self.texts[key]
+
+    def append(self, start_ms, end_ms, text):
+        self.starts.append(start_ms)
+        self.ends.append(end_ms)
+        self.texts.append(text)
+
+    def shift(self, offset_ms):
+        """整体平移时间轴（原地修改），平移后小于0的时间截断为0"""
+        self.starts = array('i', (max(0, t + offset_ms) for t in self.starts))
+        self.ends = array('i', (max(0, t + offset_ms) for t in self.ends))
+        return self
+
+    def to_srt(self):
+        """序列化为SRT文本，序号从1重新编号"""
+        blocks = []
+        for i, (start_ms, end_ms, text) in enumerate(self, 1):
+            blocks.append(f"{i}\n{ms_to_srt_time(start_ms)} --> {ms_to_srt_time(end_ms)}\n{text}\n")
+        return "\n".join(blocks)
+
+    def to_ass(self, style="Default"):
+        """序列化为最简ASS文本（默认样式，换行转为 \\N）"""
+        lines = [
+            "[Script Info]", "ScriptType: v4.00+", "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+            "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, "
+            "Shadow, Alignment, MarginL, MarginR, MarginV, Encoding",
+            f"Style: {style},Arial,20,&H00FFFFFF,&H000000FF,&H00000000,&H00000000,"
+            "0,0,0,0,100,100,0,0,1,2,0,2,10,10,10,1",
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]
+        for start_ms, end_ms, text in self:
+            lines.append(
+                f"Dialogue: 0,{ms_to_ass_time(start_ms)},{ms_to_ass_time(end_ms)},{style},,0,0,0,,"
+                + text.replace("\n", "\\N")
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_into(self, output_file):
+        """以SRT格式写入文件对象（与 pysrt.SubRipFile.write_into 用法一致）"""
+        output_file.write(self.to_srt())
+
+    def save(self, path, encoding='utf-8'):
+        """保存为SRT文件"""
+        with open(path, 'w', encoding=encoding) as f:
+            self.write_into(f)
+
+    @classmethod
+    def from_srt_text(cls, srt_text):
+        """解析SRT文本：每个空行分隔的块取时间行及其后的文本行"""
+        store = cls()
+        for block in re.split(r'\n\s*\n', srt_text.replace('\r\n', '\n').strip()):
+            lines = block.split('\n')
+            for i, line in enumerate(lines):
+                match = SRT_TIME_RE.search(line)
+                if match:
+                    h1, m1, s1, f1, h2, m2, s2, f2 = match.groups()
+                    store.append(
+                        ((int(h1) * 60 + int(m1)) * 60 + int(s1)) * 1000 + int(f1.ljust(3, '0')),
+                        ((int(h2) * 60 + int(m2)) * 60 + int(s2)) * 1000 + int(f2.ljust(3, '0')),
+                        '\n'.join(lines[i + 1:]).strip()
+                    )
+                    break
+        return store
+
+    @classmethod
+    def open(cls, path, encoding='utf-8'):
+        """读取SRT文件（编码错误时抛出 UnicodeDecodeError，由调用方换编码重试）"""
+        with open(path, 'r', encoding=encoding) as f:
+            return cls.from_srt_text(f.read().lstrip('\ufeff'))
+
+def convert_ass_to_srt_cues(ass_temp_path):
+    """
+    进程内将ASS转为SRT字幕条目（不再调用FFmpeg，也不落盘）
+    :param ass_temp_path: ASS临时文件路径
+    :return: CueStore 按开始时间排序的字幕
+    """
+    return build_srt_cues(iter_ass_dialogues(ass_temp_path))
 
-    cn_subs = pysrt.SubRipFile()
-    en_subs = pysrt.SubRipFile()
-    total_subs = len(subs)
-    cn_empty = 0
-    en_empty = 0
-
-    for sub in subs:
-        # 清理样式标签和空白字符
-        clean_text = re.sub(r'<[^>]+>', '', sub.text).strip()
-        if not clean_text:
-            cn_empty += 1
-            en_empty += 1
+def convert_ass_text_to_srt_cues(ass_text):
+    """
+    管道模式：直接解析内存中的ASS文本为SRT字幕条目
+    :param ass_text: ASS全文字符串
+    :return: CueStore 按开始时间排序的字幕
+    """
+    return build_srt_cues(iter_ass_dialogue_lines(ass_text.splitlines()))
+
+def build_srt_cues(dialogues):
+    """将 (开始毫秒, 结束毫秒, 文本) 序列按时间排序，构建 CueStore"""
+    dialogues = sorted(dialogues, key=lambda d: (d[0], d[1]))
+    if not dialogues:
+        raise Exception("ASS转SRT失败：未解析到任何对话行")
+
+    subs = CueStore()
+    for start_ms, end_ms, text in dialogues:
+        subs.append(start_ms, end_ms, text)
+    print(f"  ✅ ASS转SRT成功（进程内解析，共{len(subs)}条）")
+    return subs
+
+# 双语拆分用的预编译正则：样式标签、中文（汉字及全角标点）、英文字母
+SRT_TAG_RE = re.compile(r'<[^>]+>')
+CJK_RE = re.compile(r'[\u4e00-\u9fa5\u3000-\u303f\uff00-\uffef]')
+LATIN_RE = re.compile(r'[a-zA-Z]')
+
+def classify_bilingual_text(text):
+    """
+    单次遍历字幕文本的各行，取第一行中文和第一行英文
+    含中文字符的行归为中文，否则含字母的行归为英文，两种都找到即提前结束
+    :param text: 单条字幕文本（可含换行和样式标签）
+    :return: (中文行, 英文行)，缺失的一方为空字符串
+    """
+    if '<' in text:
+        text = SRT_TAG_RE.sub('', text)
+    cn_text = ""
+    en_text = ""
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
             continue
-        
-        # 按换行拆分，兼容「中上英下」「英上中下」「多换行」场景
-        lines = [line.strip() for line in clean_text.split('\n') if line.strip()]
-        cn_text = ""
-        en_text = ""
-
-        # 识别中文（含汉字）和英文（含字母）
-        for line in lines:
-            if re.search(r'[\u4e00-\u9fa5\u3000-\u303f\uff00-\uffef]', line):
-                if not cn_text:
-                    cn_text = line
-            elif re.search(r'[a-zA-Z]', line):
-                if not en_text:
-                    en_text = line
-
-        # 仅添加有效字幕（使用手动复制方法，兼容低版本pysrt）
-        if cn_text:
-            # sub_cn = sub.copy()  # 注释掉原copy方法
-            sub_cn = create_sub_rip_item_copy(sub)  # 使用兼容方法
-            sub_cn.text = cn_text
-            cn_subs.append(sub_cn)
-        else:
-            cn_empty += 1
+        if CJK_RE.search(line):
+            if not cn_text:
+                cn_text = line
+        elif not en_text and LATIN_RE.search(line):
+            en_text = line
+        if cn_text and en_text:
+            break
+    return cn_text, en_text
+
+def split_bilingual_to_cn_en(subs):
+    """
+    拆分逻辑（纯内存）：兼容多种双语格式，避免生成空字幕
+    :param subs: 双语字幕 CueStore
+    :return: (纯中文 CueStore, 纯英文 CueStore)
+    """
+    cn_subs = CueStore()
+    en_subs = CueStore()
+    total_subs = len(subs)
 
+    for start_ms, end_ms, text in subs:
+        # 兼容「中上英下」「英上中下」「多换行」场景
+        cn_text, en_text = classify_bilingual_text(text)
+
+        # 只追加时间和文本，不创建字幕对象
+        if cn_text:
+            cn_subs.append(start_ms, end_ms, cn_text)
         if en_text:
-            # sub_en = sub.copy()  # 注释掉原copy方法
-            sub_en = create_sub_rip_item_copy(sub)  # 使用兼容方法
-            sub_en.text = en_text
-            en_subs.append(sub_en)
-        else:
-            en_empty += 1
+            en_subs.append(start_ms, end_ms, en_text)
 
     # 校验是否生成有效字幕，避免空文件
     if len(cn_subs) == 0:
@@ -157,11 +318,40 @@ def split_bilingual_to_cn_en_temp(bilingual_srt_temp):
     if len(en_subs) == 0:
         raise Exception(f"拆分纯英文失败：未识别到有效英文字幕条目")
 
+    print(f"  ✅ 双语拆分成功：纯中文（有效{len(cn_subs)}/{total_subs}）、纯英文（有效{len(en_subs)}/{total_subs}）")
+    return cn_subs, en_subs
+
+def split_bilingual_to_cn_en_temp(bilingual_srt_temp):
+    """
+    拆分双语字幕并保存为纯中文、纯英文两个SRT临时文件
+    :param bilingual_srt_temp: 双语SRT临时文件路径，或内存中的CueStore
+    :return: (纯中文SRT临时路径, 纯英文SRT临时路径)
+    """
+    # 已在内存中的字幕直接使用；否则读取SRT文件，兼容多种编码
+    if isinstance(bilingual_srt_temp, CueStore):
+        subs = bilingual_srt_temp
+    else:
+        try:
+            subs = CueStore.open(bilingual_srt_temp, encoding='utf-8')
+        except UnicodeDecodeError:
+            try:
+                subs = CueStore.open(bilingual_srt_temp, encoding='gbk')
+            except UnicodeDecodeError:
+                subs = CueStore.open(bilingual_srt_temp, encoding='utf-16')
+
+    cn_subs, en_subs = split_bilingual_to_cn_en(subs)
+
+    # 创建两个临时文件
+    cn_srt_temp = tempfile.NamedTemporaryFile(mode='wb', suffix='.srt', delete=False)
+    en_srt_temp = tempfile.NamedTemporaryFile(mode='wb', suffix='.srt', delete=False)
+    cn_temp_path = cn_srt_temp.name
+    en_temp_path = en_srt_temp.name
+    cn_srt_temp.close()
+    en_srt_temp.close()
+
     # 保存字幕
     cn_subs.save(cn_temp_path, encoding='utf-8')
     en_subs.save(en_temp_path, encoding='utf-8')
-
-    print(f"  ✅ 双语拆分成功：纯中文（有效{len(cn_subs)}/{total_subs}）、纯英文（有效{len(en_subs)}/{total_subs}）")
     return cn_temp_path, en_temp_path
 
 def merge_subtitles_to_mkv(video_path, output_video_path, subtitle_temp_paths, ffmpeg_path):
@@ -213,12 +403,87 @@ def merge_subtitles_to_mkv(video_path, output_video_path, subtitle_temp_paths, f
     print(f"  ✅ 合并完成：{os.path.basename(output_video_path)}（大小：{os.path.getsize(output_video_path)//1024//1024}MB）")
     return output_video_path
 
-def process_single_video(video_file_path, output_video_path, target_ass_track_idx="2"):
+def _feed_pipe(write_fd, data):
+    """后台线程：把字幕数据写入管道写端，写完关闭以发送EOF"""
+    try:
+        with os.fdopen(write_fd, 'wb') as pipe:
+            pipe.write(data)
+    except BrokenPipeError:
+        pass  # FFmpeg提前退出，错误由主流程根据返回码处理
+
+def merge_subtitles_to_mkv_piped(video_path, output_video_path, ass_track_idx, srt_subs_list, ffmpeg_path):
+    """
+    管道模式合并（仅POSIX）：ASS轨直接从原视频映射，纯中文/纯英文SRT经匿名管道（pipe:fd）输入
+    除最终MKV外不产生任何磁盘文件
+    :param ass_track_idx: 原视频中的ASS双语轨道索引
+    :param srt_subs_list: [纯中文 CueStore, 纯英文 CueStore]
     """
-    处理单个视频：兼容你的视频格式，避免空字幕和格式错误，兼容低版本pysrt
+    cmd = [ffmpeg_path, '-i', video_path, '-y']
+    pipes = []
+    for subs in srt_subs_list:
+        read_fd, write_fd = os.pipe()
+        pipes.append((read_fd, write_fd, subs.to_srt().encode('utf-8')))
+        cmd.extend(['-f', 'srt', '-i', f'pipe:{read_fd}'])
+
+    # 映射视频和音频流，保持原格式；ASS双语轨直接从原视频复制
+    cmd.extend(['-map', '0:v:0', '-map', '0:a:0', '-c:v', 'copy', '-c:a', 'copy'])
+    cmd.extend([
+        '-map', f'0:{ass_track_idx}',
+        '-c:s:0', 'copy',
+        '-disposition:s:0', 'default',
+        '-metadata:s:s:0', 'title=原始中英双语(ASS)',
+        '-metadata:s:s:0', 'encoder=ass'
+    ])
+    srt_names = ["纯中文(SRT)", "纯英文(SRT)"]
+    for i in range(len(srt_subs_list)):
+        sub_track_idx = str(i + 1)
+        cmd.extend([
+            '-map', f'{i + 1}:s:0',
+            '-c:s:' + sub_track_idx, 'srt',
+            '-metadata:s:s:' + sub_track_idx, f'title={srt_names[i]}'
+        ])
+    cmd.append(output_video_path)
+
+    read_fds = [read_fd for read_fd, _, _ in pipes]
+    try:
+        process = subprocess.Popen(
+            cmd, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, pass_fds=read_fds
+        )
+    except Exception:
+        for read_fd, write_fd, _ in pipes:
+            os.close(read_fd)
+            os.close(write_fd)
+        raise
+    # 读端已交给FFmpeg子进程，父进程关闭自己的副本
+    for read_fd in read_fds:
+        os.close(read_fd)
+
+    # 每个管道一个写线程：FFmpeg按顺序读取输入，单线程写入会因管道缓冲区写满而死锁
+    feeders = [threading.Thread(target=_feed_pipe, args=(write_fd, data)) for _, write_fd, data in pipes]
+    for feeder in feeders:
+        feeder.start()
+    _, stderr = process.communicate()
+    for feeder in feeders:
+        feeder.join()
+    stderr = stderr.decode('utf-8', errors='ignore')
+
+    # 校验输出文件
+    if process.returncode != 0 or not os.path.exists(output_video_path):
+        raise Exception(f"合并失败：未生成输出文件！FFmpeg日志：{stderr}")
+    if os.path.getsize(output_video_path) < 1024 * 1024:  # 小于1MB视为无效
+        os.remove(output_video_path)
+        raise Exception(f"合并失败：文件体积过小！FFmpeg日志：{stderr}")
+
+    print(f"  ✅ 合并完成（管道模式）：{os.path.basename(output_video_path)}（大小：{os.path.getsize(output_video_path)//1024//1024}MB）")
+    return output_video_path
+
+def process_single_video(video_file_path, output_video_path, target_ass_track_idx="2", use_pipes=False):
+    """
+    处理单个视频：兼容你的视频格式，避免空字幕和格式错误
     :param video_file_path: 输入视频路径
     :param output_video_path: 输出视频路径
     :param target_ass_track_idx: 目标ASS双语轨道索引
+    :param use_pipes: True时走管道模式，全程不创建临时文件（仅POSIX）
     """
     ffmpeg_path = get_ffmpeg_path()
     temp_files = []
@@ -236,16 +501,24 @@ def process_single_video(video_file_path, output_video_path, target_ass_track_id
             return None
         print(f"  检测到目标轨道：{target_ass_track_idx}（{target_track['format']}格式）")
 
+        if use_pipes:
+            # 管道模式：提取→解析→拆分全在内存，合并时经管道输入
+            ass_text = extract_subtitle_to_memory(video_file_path, target_ass_track_idx, ffmpeg_path)
+            cn_subs, en_subs = split_bilingual_to_cn_en(convert_ass_text_to_srt_cues(ass_text))
+            merge_subtitles_to_mkv_piped(
+                video_file_path, output_video_path, target_ass_track_idx, [cn_subs, en_subs], ffmpeg_path
+            )
+            return output_video_path
+
         # 2. 提取ASS双语临时文件
         ass_temp = extract_subtitle_to_temp(video_file_path, target_ass_track_idx, "ass", ffmpeg_path)
         temp_files.append(ass_temp)
 
-        # 3. ASS转SRT（先转SRT再拆分，提高兼容性）
-        bilingual_srt_temp = convert_ass_to_srt_temp(ass_temp, ffmpeg_path)
-        temp_files.append(bilingual_srt_temp)
+        # 3. ASS转SRT（进程内解析，结果保留在内存中）
+        bilingual_subs = convert_ass_to_srt_cues(ass_temp)
 
         # 4. 拆分纯中文、纯英文SRT
-        cn_srt_temp, en_srt_temp = split_bilingual_to_cn_en_temp(bilingual_srt_temp)
+        cn_srt_temp, en_srt_temp = split_bilingual_to_cn_en_temp(bilingual_subs)
         temp_files.extend([cn_srt_temp, en_srt_temp])
 
         # 5. 合并3个字幕轨（ASS+纯中文SRT+纯英文SRT）
@@ -266,12 +539,16 @@ def process_single_video(video_file_path, output_video_path, target_ass_track_id
     
     return output_video_path
 
-def batch_process_recursive(input_root_dir, output_root_dir, target_ass_track_idx="2"):
-    """递归遍历输入目录所有子文件夹，保持目录结构批量处理MKV视频"""
+def collect_video_jobs(input_root_dir, output_root_dir, target_ass_track_idx="2", use_pipes=False):
+    """
+    递归遍历输入目录，收集待处理的MKV任务，并按原目录结构创建输出目录
+    :return: list[tuple] (输入视频路径, 输出视频路径, 目标ASS轨道索引, 是否管道模式)，按遍历顺序排列
+    """
     # 确保输出根目录存在
     if not os.path.exists(output_root_dir):
         os.makedirs(output_root_dir)
 
+    jobs = []
     # 递归遍历所有文件和子文件夹
     for root, dirs, files in os.walk(input_root_dir):
         # 计算当前目录相对于输入根目录的相对路径
@@ -281,25 +558,186 @@ def batch_process_recursive(input_root_dir, output_root_dir, target_ass_track_id
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        # 处理当前目录下的所有MKV文件
+        # 收集当前目录下的所有MKV文件
         for filename in files:
             if filename.lower().endswith('.mkv'):
                 input_video_path = os.path.join(root, filename)
                 output_video_path = os.path.join(output_dir, filename)
+                jobs.append((input_video_path, output_video_path, target_ass_track_idx, use_pipes))
+    return jobs
+
+# 任务清单：记录每个输入的指纹、流水线版本和处理状态，中断后重跑只处理未完成/失败的文件
+# 处理逻辑有改动时递增版本号，旧版本产出的文件会被重新处理
+PIPELINE_VERSION = "9.3"  # 9.3：单遍预编译双语分类 + CueStore 输出
+JOB_MANIFEST_NAME = ".subtitle_jobs.jsonl"
+
+def load_job_manifest(manifest_path):
+    """读取任务清单，同一输入以最后一条记录为准"""
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    manifest[entry["input"]] = entry
+                except (ValueError, KeyError):
+                    continue  # 跳过中断写入产生的残缺行
+    return manifest
+
+def job_fingerprint(input_video_path, target_ass_track_idx):
+    """输入文件指纹：大小 + 修改时间 + 目标轨道 + 流水线版本"""
+    stat = os.stat(input_video_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "track": target_ass_track_idx,
+        "version": PIPELINE_VERSION
+    }
+
+def record_job_result(manifest_path, input_root_dir, job, success):
+    """追加一条处理结果到任务清单（每个文件处理完立即写入，中断也不丢进度）"""
+    input_video_path, output_video_path, target_ass_track_idx, _ = job
+    entry = {
+        "input": os.path.relpath(input_video_path, input_root_dir),
+        "output": os.path.basename(output_video_path),
+        "status": "done" if success else "failed",
+        "fingerprint": job_fingerprint(input_video_path, target_ass_track_idx)
+    }
+    with open(manifest_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def filter_pending_jobs(jobs, input_root_dir, manifest):
+    """
+    过滤已完成的任务：状态为done、指纹一致且输出文件仍存在才跳过
+    :return: (待处理任务列表, 跳过数量)
+    """
+    pending = []
+    for job in jobs:
+        input_video_path, output_video_path, target_ass_track_idx, _ = job
+        entry = manifest.get(os.path.relpath(input_video_path, input_root_dir))
+        if (entry and entry["status"] == "done"
+                and entry["fingerprint"] == job_fingerprint(input_video_path, target_ass_track_idx)
+                and os.path.exists(output_video_path)):
+            continue
+        pending.append(job)
+    return pending, len(jobs) - len(pending)
+
+def batch_process_recursive(input_root_dir, output_root_dir, target_ass_track_idx="2", use_pipes=False, resume=True):
+    """递归遍历输入目录所有子文件夹，保持目录结构批量处理MKV视频"""
+    jobs = collect_video_jobs(input_root_dir, output_root_dir, target_ass_track_idx, use_pipes)
+    manifest_path = os.path.join(output_root_dir, JOB_MANIFEST_NAME)
+    if resume:
+        jobs, skipped = filter_pending_jobs(jobs, input_root_dir, load_job_manifest(manifest_path))
+        print(f"♻️ 断点续跑：跳过已完成 {skipped} 个，待处理 {len(jobs)} 个")
+
+    for job in jobs:
+        input_video_path, output_video_path, track_idx, pipe_mode = job
+        print(f"\n📌 处理文件：{input_video_path}")
+        output = process_single_video(input_video_path, output_video_path, track_idx, pipe_mode)
+        record_job_result(manifest_path, input_root_dir, job, output is not None)
+
+    print("\n" + "="*50)
+    print("🎉 全部批量处理完成！输出目录：" + output_root_dir)
+    print("="*50)
 
-                print(f"\n📌 处理文件：{input_video_path}")
-                process_single_video(input_video_path, output_video_path, target_ass_track_idx)
+def _process_video_job(job):
+    """
+    进程池工作函数：处理单个视频，捕获该视频的全部打印日志
+    日志随结果一起返回，由主进程按提交顺序输出，避免多进程日志交错
+    :param job: (输入视频路径, 输出视频路径, 目标ASS轨道索引, 是否管道模式)
+    :return: dict 处理结果，含input/output/success/elapsed/log
+    """
+    input_video_path, output_video_path, target_ass_track_idx, use_pipes = job
+    log_buffer = io.StringIO()
+    start_time = time.time()
+    output = None
 
+    with contextlib.redirect_stdout(log_buffer):
+        print(f"\n📌 处理文件：{input_video_path}")
+        try:
+            output = process_single_video(input_video_path, output_video_path, target_ass_track_idx, use_pipes)
+        except Exception as e:
+            # 单个文件的异常不影响其他任务
+            print(f"  ❌ 处理失败：{str(e)}")
+
+    return {
+        "input": input_video_path,
+        "output": output,
+        "success": output is not None,
+        "elapsed": time.time() - start_time,
+        "log": log_buffer.getvalue()
+    }
+
+def print_batch_summary(results, total_elapsed):
+    """打印批量处理汇总表：每个文件的状态、耗时，以及成功/失败统计"""
     print("\n" + "="*50)
+    print("📊 批量处理汇总")
+    print("="*50)
+    print(f"{'序号':<6}{'状态':<6}{'耗时(秒)':<10}文件")
+    for i, res in enumerate(results, 1):
+        status = "✅" if res["success"] else "❌"
+        print(f"{i:<6}{status:<6}{res['elapsed']:<10.1f}{os.path.basename(res['input'])}")
+
+    success_count = sum(1 for res in results if res["success"])
+    print("-"*50)
+    print(f"总计：{len(results)} 个 | 成功：{success_count} 个 | 失败：{len(results) - success_count} 个 | 总耗时：{total_elapsed:.1f} 秒")
+
+def batch_process_parallel(input_root_dir, output_root_dir, target_ass_track_idx="2", max_workers=None, use_pipes=False,
+                           resume=True):
+    """
+    并行批量处理：用有界进程池同时运行多个视频的FFmpeg任务
+    :param input_root_dir: 输入视频根目录
+    :param output_root_dir: 输出视频根目录
+    :param target_ass_track_idx: 目标ASS双语轨道索引
+    :param max_workers: 并行进程数，None时使用CPU核心数
+    :param use_pipes: 是否使用管道模式（不创建临时文件）
+    :param resume: 是否按任务清单跳过已完成的文件
+    :return: list[dict] 按输入顺序排列的处理结果
+    """
+    jobs = collect_video_jobs(input_root_dir, output_root_dir, target_ass_track_idx, use_pipes)
+    manifest_path = os.path.join(output_root_dir, JOB_MANIFEST_NAME)
+    if resume:
+        jobs, skipped = filter_pending_jobs(jobs, input_root_dir, load_job_manifest(manifest_path))
+        print(f"♻️ 断点续跑：跳过已完成 {skipped} 个，待处理 {len(jobs)} 个")
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(jobs) or 1))
+    print(f"🚀 并行模式：共 {len(jobs)} 个视频，{max_workers} 个进程")
+
+    start_time = time.time()
+    results = [None] * len(jobs)
+    next_to_print = 0
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(_process_video_job, job): i for i, job in enumerate(jobs)}
+        for future in as_completed(futures):
+            i = futures[future]
+            res = future.result()
+            # 每个任务一完成就写清单（只在主进程写，避免多进程并发写同一文件），
+            # 不被排在前面的慢任务拖住，中断时已完成的任务都已记录
+            record_job_result(manifest_path, input_root_dir, jobs[i], res["success"])
+            results[i] = res
+            # 日志按提交顺序输出，与串行模式一致
+            while next_to_print < len(results) and results[next_to_print] is not None:
+                print(results[next_to_print]["log"], end="")
+                next_to_print += 1
+
+    print_batch_summary(results, time.time() - start_time)
     print("🎉 全部批量处理完成！输出目录：" + output_root_dir)
     print("="*50)
+    return results
 
 if __name__ == "__main__":
     # -------------------------- 配置区 --------------------------
     INPUT_ROOT_DIR = "./videos_new"       # 新视频组的输入根目录
     OUTPUT_ROOT_DIR = "./processed_videos_new"  # 新视频组的输出目录
     TARGET_ASS_TRACK_INDEX = "2"          # 待处理的ASS双语轨道索引
+    MAX_WORKERS = os.cpu_count()          # 并行进程数，设为1则使用串行模式
+    USE_PIPES = os.name == "posix"        # 管道模式：除最终MKV外不落盘（Windows不支持，自动关闭）
+    RESUME = True                         # 断点续跑：跳过任务清单中已完成的文件
     # -----------------------------------------------------------
 
     # 执行递归批量处理
-    batch_process_recursive(INPUT_ROOT_DIR, OUTPUT_ROOT_DIR, TARGET_ASS_TRACK_INDEX)
\ No newline at end of file
+    if MAX_WORKERS and MAX_WORKERS > 1:
+        batch_process_parallel(INPUT_ROOT_DIR, OUTPUT_ROOT_DIR, TARGET_ASS_TRACK_INDEX, MAX_WORKERS, USE_PIPES, RESUME)
+    else:
+        batch_process_recursive(INPUT_ROOT_DIR, OUTPUT_ROOT_DIR, TARGET_ASS_TRACK_INDEX, USE_PIPES, RESUME)
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+ffprobe 流探测 + 持久化缓存（123 copy 9.py、123 copy 10提取字幕.py 共用）
+
+缓存为 JSONL 文件，每行一条记录，按 (路径, 大小, 修改时间) 判断是否有效
+  · 内存中按缓存文件路径分别保存，传入不同 cache_path 互不影响
+  · 每次新探测只追加一行（多进程同时写也不会互相覆盖）；同一视频重新探测会留下旧行，
+    读取时若发现重复/残缺行就压缩重写一次，文件不会无限增长
+"""
+
+import os
+import json
+import tempfile
+import subprocess
+from collections import namedtuple
+
+# 默认缓存位置：脚本所在目录
+PROBE_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ffprobe_cache.jsonl")
+StreamRecord = namedtuple("StreamRecord", ["index", "codec_type", "codec_name", "language", "title"])
+_probe_caches = {}  # {缓存文件绝对路径: {视频绝对路径: 记录}}
+
+def get_ffprobe_path():
+    """获取FFprobe路径，一般与FFmpeg位于同一目录"""
+    return "ffprobe"
+
+def _resolve_cache_path(cache_path):
+    # 调用时才取默认值：修改模块的 PROBE_CACHE_PATH 对之后的调用生效
+    return os.path.abspath(cache_path or PROBE_CACHE_PATH)
+
+def compact_probe_cache(cache_path, entries):
+    """
+    把内存中的记录重写为每个视频一行（先写临时文件再原子替换）
+    临时文件名每个进程各不相同（mkstemp）：并行的批处理进程同时压缩时不会写进同一个临时文件；
+    替换期间其他进程刚追加的行可能丢失，只会让那个视频下次重新探测
+    """
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(cache_path), prefix=os.path.basename(cache_path) + ".", suffix=".tmp"
+    )
+    try:
+        with open(fd, 'w', encoding='utf-8') as f:
+            for entry in entries.values():
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+def load_probe_cache(cache_path=None):
+    """读取探测缓存到内存（每个进程每个缓存文件只读一次），同一路径以最后一条记录为准"""
+    cache_path = _resolve_cache_path(cache_path)
+    if cache_path in _probe_caches:
+        return _probe_caches[cache_path]
+    entries = {}
+    line_count = 0
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line_count += 1
+                try:
+                    entry = json.loads(line)
+                    entries[entry["path"]] = entry
+                except (ValueError, KeyError):
+                    continue  # 跳过写入中断产生的残缺行
+        if line_count > len(entries):
+            try:
+                compact_probe_cache(cache_path, entries)
+            except OSError:
+                pass  # 压缩失败不影响使用，下次再试
+    _probe_caches[cache_path] = entries
+    return entries
+
+def append_probe_cache(entry, cache_path=None):
+    """追加一条探测记录（追加写入单行，多进程同时写也不会互相覆盖）"""
+    cache_path = _resolve_cache_path(cache_path)
+    load_probe_cache(cache_path)[entry["path"]] = entry
+    with open(cache_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def probe_streams(video_path, ffprobe_path=None, cache_path=None):
+    """
+    单次调用 ffprobe 获取全部流信息（JSON输出），命中缓存时不启动子进程
+    :param video_path: 视频文件路径
+    :param ffprobe_path: FFprobe路径，默认 get_ffprobe_path()
+    :param cache_path: 探测缓存文件路径，默认 PROBE_CACHE_PATH
+    :return: list[StreamRecord] 所有流的记录
+    """
+    abs_path = os.path.abspath(video_path)
+    stat = os.stat(abs_path)
+    entry = load_probe_cache(cache_path).get(abs_path)
+    if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+        return [StreamRecord(**s) for s in entry["streams"]]
+
+    cmd = [ffprobe_path or get_ffprobe_path(), '-v', 'error', '-print_format', 'json', '-show_streams', abs_path]
+    result = subprocess.run(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, encoding='utf-8', errors='ignore')
+    if result.returncode != 0:
+        raise Exception(f"ffprobe探测失败！日志：{result.stderr}")
+
+    streams = []
+    for s in json.loads(result.stdout).get("streams", []):
+        tags = s.get("tags", {})
+        streams.append(StreamRecord(
+            index=str(s["index"]),
+            codec_type=s.get("codec_type", ""),
+            codec_name=s.get("codec_name", ""),
+            language=tags.get("language", "unknown"),
+            title=tags.get("title", "")
+        ))
+
+    append_probe_cache({
+        "path": abs_path,
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "streams": [s._asdict() for s in streams]
+    }, cache_path)
+    return streams
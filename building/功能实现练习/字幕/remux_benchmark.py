@@ -0,0 +1,363 @@
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import inspect
+import contextlib
+import importlib.util
+
+def load_pipeline_module(script_name):
+    """按文件路径加载字幕流水线脚本（文件名含空格，无法直接import）"""
+    module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), script_name)
+    spec = importlib.util.spec_from_file_location("subtitle_pipeline", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def detect_pipeline_api(pipeline):
+    """
+    识别被测脚本属于哪一代接口（各版本 123 copy N.py 的函数名和参数不同，按接口分别驱动）：
+      cues —— copy 9：CueStore 内存字幕，支持管道模式
+      temp —— copy 6/7/8：临时文件 + pysrt 拆分英文 + 标准化SRT
+      file —— copy 2/3/5：每一步写到指定的输出文件
+    copy 1（无合并步骤）、copy 4（只清理SRT）、copy 10（只提取字幕）没有完整的五个阶段，不支持
+    """
+    if hasattr(pipeline, "CueStore") and hasattr(pipeline, "extract_subtitle_to_memory"):
+        return "cues"
+    if hasattr(pipeline, "extract_subtitle_to_temp") and hasattr(pipeline, "split_bilingual_to_english_temp"):
+        return "temp"
+    if hasattr(pipeline, "extract_subtitle") and hasattr(pipeline, "merge_subtitles_to_mkv"):
+        return "file"
+    raise ValueError("该脚本缺少 探测/提取/转换/拆分/合并 完整流程，无法做分阶段基准测试")
+
+def find_track(sub_info, formats, default):
+    """在探测结果中找指定格式的第一个字幕轨，找不到时用旧脚本写死的轨道号"""
+    return next((sub["index"] for sub in sub_info if sub["format"] in formats), default)
+
+class CountingSubprocess:
+    """替换流水线模块里的 subprocess：转发全部属性，同时统计 run/Popen 启动的子进程数"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __getattr__(self, name):
+        return getattr(subprocess, name)
+
+    def run(self, *args, **kwargs):
+        self.count += 1
+        return subprocess.run(*args, **kwargs)
+
+    def Popen(self, *args, **kwargs):
+        self.count += 1
+        return subprocess.Popen(*args, **kwargs)
+
+def read_io_counters():
+    """
+    读取 /proc/self/io（仅Linux）：rchar 为 read() 调用读取的总字节数，read_bytes 为实际从存储设备读取的字节数
+    已回收的子进程（FFmpeg）的读取量也会累加到父进程，因此可以统计整个阶段的读取量
+    """
+    try:
+        with open('/proc/self/io', 'r') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters["rchar"]), int(counters["read_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+@contextlib.contextmanager
+def measure_stage(stages, name, counter):
+    """记录一个阶段的耗时、读取字节数和子进程数，结果写入 stages[name]"""
+    rchar_before, storage_before = read_io_counters()
+    count_before = counter.count
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall_time = time.perf_counter() - start_time
+        rchar_after, storage_after = read_io_counters()
+        stages[name] = {
+            "wall_time": round(wall_time, 4),
+            "bytes_read": rchar_after - rchar_before if rchar_before is not None else None,
+            "storage_bytes_read": storage_after - storage_before if storage_before is not None else None,
+            "subprocess_count": counter.count - count_before
+        }
+
+def format_cue_time(ms, srt=False):
+    """毫秒 → ASS时间 H:MM:SS.cc，或SRT时间 HH:MM:SS,mmm"""
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    if srt:
+        return f"{hours:02d}:{minutes:02d}:{seconds:02d},{ms:03d}"
+    return f"{hours}:{minutes:02d}:{seconds:02d}.{ms // 10:02d}"
+
+def generate_bilingual_ass(ass_path, cue_count):
+    """生成指定条数的中英双语ASS字幕（不依赖被测脚本，各版本用同一份输入）"""
+    lines = [
+        "[Script Info]", "ScriptType: v4.00+", "",
+        "[V4+ Styles]",
+        "Format: Name, Fontname, Fontsize, PrimaryColour, Bold, Italic, Alignment, MarginL, MarginR, MarginV",
+        "Style: Default,Arial,20,&H00FFFFFF,0,0,2,10,10,10", "",
+        "[Events]",
+        "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text"
+    ]
+    for i in range(cue_count):
+        start_ms = i * 2000
+        lines.append(f"Dialogue: 0,{format_cue_time(start_ms)},{format_cue_time(start_ms + 1500)},Default,,0,0,0,,"
+                     f"这是第{i + 1}句台词\\NThis is line number {i + 1}")
+    with open(ass_path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+
+def generate_chinese_srt(srt_path, cue_count):
+    """生成纯中文SRT字幕（旧版本脚本固定读取3号中文SRT轨）"""
+    with open(srt_path, 'w', encoding='utf-8') as f:
+        for i in range(cue_count):
+            start_ms = i * 2000
+            f.write(f"{i + 1}\n{format_cue_time(start_ms, True)} --> {format_cue_time(start_ms + 1500, True)}\n"
+                    f"这是第{i + 1}句台词\n\n")
+
+def generate_synthetic_mkv(ffmpeg_path, ass_path, srt_path, mkv_path, duration, resolution):
+    """
+    用 lavfi 测试源生成合成MKV：0号视频流、1号音频流、2号ASS双语字幕流、3号SRT中文字幕流
+    视频用内置 mpeg4 编码器，不依赖 libx264
+    """
+    cmd = [
+        ffmpeg_path, '-y',
+        '-f', 'lavfi', '-i', f'testsrc2=size={resolution}:rate=24:duration={duration}',
+        '-f', 'lavfi', '-i', f'sine=frequency=440:duration={duration}',
+        '-i', ass_path,
+        '-i', srt_path,
+        '-map', '0:v', '-map', '1:a', '-map', '2:s', '-map', '3:s',
+        '-c:v', 'mpeg4', '-q:v', '3',
+        '-c:a', 'aac',
+        '-c:s:0', 'ass', '-c:s:1', 'srt',
+        '-metadata:s:s:0', 'language=chi',
+        '-metadata:s:s:1', 'language=chi',
+        mkv_path
+    ]
+    result = subprocess.run(cmd, stderr=subprocess.PIPE, stdout=subprocess.PIPE, encoding='utf-8', errors='ignore')
+    if not os.path.exists(mkv_path):
+        raise Exception(f"合成MKV生成失败！FFmpeg日志：{result.stderr}")
+
+def get_probe_module(pipeline):
+    """copy 9 起探测逻辑在共用的 probe_cache 模块里；旧版本在脚本自身内"""
+    probe_streams = getattr(pipeline, "probe_streams", None)
+    return sys.modules.get(probe_streams.__module__) if probe_streams else None
+
+@contextlib.contextmanager
+def isolated_probe_cache(pipeline, cache_path):
+    """探测缓存临时指向空文件（保证测到真实探测开销，也不污染正式缓存），结束后恢复"""
+    probe_module = get_probe_module(pipeline)
+    if probe_module is None:
+        yield
+        return
+    original = probe_module.PROBE_CACHE_PATH
+    probe_module.PROBE_CACHE_PATH = cache_path
+    try:
+        yield
+    finally:
+        probe_module.PROBE_CACHE_PATH = original
+
+def run_cue_stages(pipeline, counter, stages, video_path, output_path, temp_files, use_pipes):
+    """copy 9：CueStore 流水线，管道模式或临时文件模式"""
+    ffmpeg_path = pipeline.get_ffmpeg_path()
+    with measure_stage(stages, "probe", counter):
+        sub_info = pipeline.get_video_info(video_path, ffmpeg_path)
+    track_idx = find_track(sub_info, ["ass", "ssa"], "2")
+
+    if use_pipes:
+        with measure_stage(stages, "extract", counter):
+            ass_text = pipeline.extract_subtitle_to_memory(video_path, track_idx, ffmpeg_path)
+        with measure_stage(stages, "convert", counter):
+            bilingual_subs = pipeline.convert_ass_text_to_srt_cues(ass_text)
+        with measure_stage(stages, "split", counter):
+            cn_subs, en_subs = pipeline.split_bilingual_to_cn_en(bilingual_subs)
+        with measure_stage(stages, "merge", counter):
+            pipeline.merge_subtitles_to_mkv_piped(video_path, output_path, track_idx, [cn_subs, en_subs], ffmpeg_path)
+    else:
+        with measure_stage(stages, "extract", counter):
+            ass_temp = pipeline.extract_subtitle_to_temp(video_path, track_idx, "ass", ffmpeg_path)
+            temp_files.append(ass_temp)
+        with measure_stage(stages, "convert", counter):
+            bilingual_subs = pipeline.convert_ass_to_srt_cues(ass_temp)
+        with measure_stage(stages, "split", counter):
+            cn_srt_temp, en_srt_temp = pipeline.split_bilingual_to_cn_en_temp(bilingual_subs)
+            temp_files.extend([cn_srt_temp, en_srt_temp])
+        with measure_stage(stages, "merge", counter):
+            pipeline.merge_subtitles_to_mkv(video_path, output_path, [ass_temp, cn_srt_temp, en_srt_temp], ffmpeg_path)
+
+def run_temp_file_stages(pipeline, counter, stages, video_path, output_path, temp_files):
+    """copy 6/7/8：提取ASS+中文SRT到临时文件，FFmpeg转SRT，pysrt拆分英文并标准化"""
+    ffmpeg_path = pipeline.get_ffmpeg_path()
+    with measure_stage(stages, "probe", counter):
+        sub_info = pipeline.get_video_info(video_path, ffmpeg_path)
+    ass_idx = find_track(sub_info, ["ass", "ssa"], "2")
+    srt_idx = find_track(sub_info, ["subrip", "srt"], "3")
+
+    with measure_stage(stages, "extract", counter):
+        ass_temp = pipeline.extract_subtitle_to_temp(video_path, ass_idx, "ass", ffmpeg_path)
+        temp_files.append(ass_temp)
+        srt_cn_temp = pipeline.extract_subtitle_to_temp(video_path, srt_idx, "srt", ffmpeg_path)
+        temp_files.append(srt_cn_temp)
+    with measure_stage(stages, "convert", counter):
+        bilingual_srt_temp = pipeline.convert_ass_to_srt_temp(ass_temp, ffmpeg_path)
+        temp_files.append(bilingual_srt_temp)
+    with measure_stage(stages, "split", counter):
+        # copy 6 的拆分函数多一个 ffmpeg_path 参数
+        if len(inspect.signature(pipeline.split_bilingual_to_english_temp).parameters) > 1:
+            raw_en_temp = pipeline.split_bilingual_to_english_temp(bilingual_srt_temp, ffmpeg_path)
+        else:
+            raw_en_temp = pipeline.split_bilingual_to_english_temp(bilingual_srt_temp)
+        temp_files.append(raw_en_temp)
+        clean_en_temp = pipeline.clean_non_standard_srt_temp(raw_en_temp)
+        temp_files.append(clean_en_temp)
+    with measure_stage(stages, "merge", counter):
+        pipeline.merge_subtitles_to_mkv(video_path, output_path, [ass_temp, srt_cn_temp, clean_en_temp], ffmpeg_path)
+
+def run_output_file_stages(pipeline, counter, stages, video_path, output_path, temp_files, work_dir):
+    """copy 2/3/5：每一步写到 work_dir 下的指定文件"""
+    ffmpeg_path = pipeline.get_ffmpeg_path()
+    prefix = os.path.join(work_dir, os.path.splitext(os.path.basename(video_path))[0])
+    with measure_stage(stages, "probe", counter):
+        sub_info = pipeline.get_video_info(video_path, ffmpeg_path)
+    ass_idx = find_track(sub_info, ["ass", "ssa"], "2")
+    srt_idx = find_track(sub_info, ["subrip", "srt"], "3")
+
+    with measure_stage(stages, "extract", counter):
+        # ASS轨道会被脚本自动改为 .ass 后缀，以返回值为准
+        ass_file = pipeline.extract_subtitle(video_path, ass_idx, "ass", prefix + "_bilingual.srt", ffmpeg_path)
+        temp_files.append(ass_file)
+        srt_cn_file = pipeline.extract_subtitle(video_path, srt_idx, "srt", prefix + "_cn.srt", ffmpeg_path)
+        temp_files.append(srt_cn_file)
+    with measure_stage(stages, "convert", counter):
+        bilingual_srt = pipeline.convert_ass_to_srt(ass_file, prefix + "_bilingual_converted.srt", ffmpeg_path)
+        temp_files.append(bilingual_srt)
+    with measure_stage(stages, "split", counter):
+        en_srt = pipeline.split_bilingual_to_english(bilingual_srt, prefix + "_en_raw.srt")
+        temp_files.append(en_srt)
+        # copy 5 起多一步标准化英文SRT
+        if hasattr(pipeline, "clean_non_standard_srt"):
+            en_srt = pipeline.clean_non_standard_srt(en_srt, prefix + "_en.srt")
+            temp_files.append(en_srt)
+    with measure_stage(stages, "merge", counter):
+        pipeline.merge_subtitles_to_mkv(video_path, output_path, [ass_file, srt_cn_file, en_srt], ffmpeg_path)
+
+def benchmark_single_video(pipeline, counter, video_path, work_dir, use_pipes):
+    """按 probe/extract/convert/split/merge 五个阶段处理一个视频，返回各阶段指标"""
+    output_path = os.path.join(work_dir, "out_" + os.path.basename(video_path))
+    stages = {}
+    temp_files = []
+    api = detect_pipeline_api(pipeline)
+
+    try:
+        with isolated_probe_cache(pipeline, os.path.join(work_dir, "probe_cache.jsonl")):
+            if api == "cues":
+                run_cue_stages(pipeline, counter, stages, video_path, output_path, temp_files, use_pipes)
+            elif api == "temp":
+                run_temp_file_stages(pipeline, counter, stages, video_path, output_path, temp_files)
+            else:
+                run_output_file_stages(pipeline, counter, stages, video_path, output_path, temp_files, work_dir)
+    finally:
+        for temp in temp_files:
+            if os.path.exists(temp):
+                os.unlink(temp)
+        if os.path.exists(output_path):
+            os.remove(output_path)
+    return stages
+
+def run_benchmark(script_name, result_path, video_count=2, cue_count=2000, duration=30,
+                  resolution="1280x720", use_pipes=True):
+    """
+    生成合成视频并逐阶段测量，结果写入JSON，便于不同版本间对比
+    :param script_name: 被测流水线脚本文件名（同目录），支持 copy 2/3/5/6/7/8/9
+    :param result_path: 结果JSON路径
+    :param video_count: 合成视频数量
+    :param cue_count: 每个视频的双语字幕条数
+    :param duration: 每个视频时长（秒）
+    :param resolution: 视频分辨率
+    :param use_pipes: 是否测管道模式（否则测临时文件模式；只对 copy 9 有效）
+    :return: dict 基准测试结果
+    """
+    pipeline = load_pipeline_module(script_name)
+    api = detect_pipeline_api(pipeline)
+    use_pipes = use_pipes and api == "cues"  # 只有 copy 9 有管道模式
+    counter = CountingSubprocess()
+    # 流水线脚本和共用探测模块里的子进程都要计数
+    patched_modules = [module for module in (pipeline, get_probe_module(pipeline)) if module is not None]
+    for module in patched_modules:
+        module.subprocess = counter
+    ffmpeg_path = pipeline.get_ffmpeg_path()
+
+    work_dir = tempfile.mkdtemp(prefix="remux_bench_")
+    videos = []
+    try:
+        ass_path = os.path.join(work_dir, "bilingual.ass")
+        srt_path = os.path.join(work_dir, "chinese.srt")
+        generate_bilingual_ass(ass_path, cue_count)
+        generate_chinese_srt(srt_path, cue_count)
+        for i in range(video_count):
+            video_path = os.path.join(work_dir, f"synthetic_{i + 1:02d}.mkv")
+            generate_synthetic_mkv(ffmpeg_path, ass_path, srt_path, video_path, duration, resolution)
+            print(f"\n📌 基准测试（{api}）：{os.path.basename(video_path)}（{os.path.getsize(video_path) // 1024 // 1024}MB）")
+            # 流水线自身的逐步日志不输出，只打印阶段指标
+            with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+                stages = benchmark_single_video(pipeline, counter, video_path, work_dir, use_pipes)
+            videos.append({
+                "name": os.path.basename(video_path),
+                "size": os.path.getsize(video_path),
+                "stages": stages
+            })
+            for name, stage in stages.items():
+                print(f"  {name:<8} {stage['wall_time']:>8.3f} 秒 | 读取 {stage['bytes_read']} 字节 | 子进程 {stage['subprocess_count']} 个")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        for module in patched_modules:
+            module.subprocess = subprocess
+
+    # 汇总各阶段总计
+    totals = {}
+    for video in videos:
+        for name, stage in video["stages"].items():
+            total = totals.setdefault(name, {"wall_time": 0.0, "bytes_read": 0, "subprocess_count": 0})
+            total["wall_time"] = round(total["wall_time"] + stage["wall_time"], 4)
+            total["bytes_read"] += stage["bytes_read"] or 0
+            total["subprocess_count"] += stage["subprocess_count"]
+
+    result = {
+        "script": script_name,
+        "pipeline_version": getattr(pipeline, "PIPELINE_VERSION", None),
+        "api": api,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": sys.version.split()[0],
+        "config": {
+            "video_count": video_count,
+            "cue_count": cue_count,
+            "duration": duration,
+            "resolution": resolution,
+            "use_pipes": use_pipes
+        },
+        "videos": videos,
+        "totals": totals
+    }
+    with open(result_path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print("\n" + "="*50)
+    print(f"🎉 基准测试完成！结果已保存至：{result_path}")
+    print("="*50)
+    return result
+
+if __name__ == "__main__":
+    # -------------------------- 配置区 --------------------------
+    SCRIPT_NAME = "123 copy 9.py"          # 被测流水线脚本（可换成 123 copy 8shijian.py 等旧版本对比）
+    RESULT_PATH = "./remux_benchmark.json"  # 结果JSON
+    VIDEO_COUNT = 2                         # 合成视频数量
+    CUE_COUNT = 2000                        # 每个视频的双语字幕条数
+    DURATION = 30                           # 每个视频时长（秒）
+    RESOLUTION = "1280x720"                 # 视频分辨率
+    USE_PIPES = os.name == "posix"          # 测管道模式还是临时文件模式
+    # -----------------------------------------------------------
+
+    run_benchmark(SCRIPT_NAME, RESULT_PATH, VIDEO_COUNT, CUE_COUNT, DURATION, RESOLUTION, USE_PIPES)
@@ -0,0 +1,113 @@
+import os
+import re
+import time
+import tempfile
+import tracemalloc
+import importlib.util
+import pysrt
+
+def load_pipeline_module():
+    """按文件路径加载「123 copy 9.py」（文件名含空格，无法直接import）"""
+    module_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "123 copy 9.py")
+    spec = importlib.util.spec_from_file_location("subtitle_pipeline", module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def generate_bilingual_srt(srt_path, cue_count=10000):
+    """生成指定条数的中英双语SRT文件，混合「中上英下」「英上中下」和带样式标签的条目"""
+    with open(srt_path, 'w', encoding='utf-8') as f:
+        for i in range(1, cue_count + 1):
+            start_ms = i * 2000
+            end_ms = start_ms + 1500
+            start = f"{start_ms // 3600000:02d}:{start_ms // 60000 % 60:02d}:{start_ms // 1000 % 60:02d},{start_ms % 1000:03d}"
+            end = f"{end_ms // 3600000:02d}:{end_ms // 60000 % 60:02d}:{end_ms // 1000 % 60:02d},{end_ms % 1000:03d}"
+            if i % 3 == 0:
+                text = f"<i>This is line number {i}, isn't it?</i>\n这是第{i}句台词，对吧？"
+            else:
+                text = f"这是第{i}句台词，对吧？\nThis is line number {i}, isn't it?"
+            f.write(f"{i}\n{start} --> {end}\n{text}\n\n")
+
+def legacy_split(subs):
+    """旧版拆分逻辑（未预编译正则 + 逐条复制SubRipItem），作为对比基准"""
+    cn_subs = pysrt.SubRipFile()
+    en_subs = pysrt.SubRipFile()
+    for sub in subs:
+        clean_text = re.sub(r'<[^>]+>', '', sub.text).strip()
+        if not clean_text:
+            continue
+        lines = [line.strip() for line in clean_text.split('\n') if line.strip()]
+        cn_text = ""
+        en_text = ""
+        for line in lines:
+            if re.search(r'[\u4e00-\u9fa5\u3000-\u303f\uff00-\uffef]', line):
+                if not cn_text:
+                    cn_text = line
+            elif re.search(r'[a-zA-Z]', line):
+                if not en_text:
+                    en_text = line
+        for text, target in ((cn_text, cn_subs), (en_text, en_subs)):
+            if text:
+                new_sub = pysrt.SubRipItem()
+                new_sub.index = sub.index
+                new_sub.start = sub.start
+                new_sub.end = sub.end
+                new_sub.text = sub.text
+                new_sub.position = sub.position
+                new_sub.text = text
+                target.append(new_sub)
+    return cn_subs, en_subs
+
+def measure_load_memory(load_func, srt_path):
+    """测量把SRT文件加载为内存字幕结构后，该结构常驻占用的内存（字节）"""
+    tracemalloc.start()
+    subs = load_func(srt_path)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del subs
+    return current
+
+def best_of(func, subs, repeat):
+    """重复运行取最短耗时，减少系统抖动的影响"""
+    best = float("inf")
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func(subs)
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+def run_benchmark(cue_count=10000, repeat=5):
+    """对比旧版（pysrt）与新版（CueStore）双语拆分在 cue_count 条字幕上的耗时和内存"""
+    pipeline = load_pipeline_module()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        srt_path = os.path.join(temp_dir, "bilingual.srt")
+        generate_bilingual_srt(srt_path, cue_count)
+        old_subs = pysrt.open(srt_path, encoding='utf-8')
+        new_subs = pipeline.CueStore.open(srt_path, encoding='utf-8')
+        old_memory = measure_load_memory(lambda path: pysrt.open(path, encoding='utf-8'), srt_path)
+        new_memory = measure_load_memory(pipeline.CueStore.open, srt_path)
+
+    # 两种实现的拆分结果必须一致
+    old_cn, old_en = legacy_split(old_subs)
+    new_cn, new_en = pipeline.split_bilingual_to_cn_en(new_subs)
+    assert [s.text for s in old_cn] == new_cn.texts
+    assert [s.text for s in old_en] == new_en.texts
+
+    old_time = best_of(legacy_split, old_subs, repeat)
+    new_time = best_of(pipeline.split_bilingual_to_cn_en, new_subs, repeat)
+
+    print("\n" + "="*50)
+    print(f"📊 双语拆分基准测试（{cue_count} 条字幕，取 {repeat} 次最优）")
+    print("="*50)
+    print(f"旧版（pysrt + 未编译正则 + 逐条复制）：{old_time * 1000:.1f} ms，加载内存 {old_memory / 1024 / 1024:.1f} MB")
+    print(f"新版（CueStore + 预编译分类）：{new_time * 1000:.1f} ms，加载内存 {new_memory / 1024 / 1024:.1f} MB")
+    print(f"加速比：{old_time / new_time:.2f}x，内存占用比：{old_memory / new_memory:.1f}x")
+    return old_time, new_time
+
+if __name__ == "__main__":
+    # -------------------------- 配置区 --------------------------
+    CUE_COUNT = 10000     # 生成的字幕条数
+    REPEAT = 5            # 每种实现重复次数
+    # -----------------------------------------------------------
+
+    run_benchmark(CUE_COUNT, REPEAT)